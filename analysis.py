@@ -4,20 +4,14 @@ from z3 import *
 from z3.z3util import *
 from vargenerator import *
 from utils import *
+from query_cache import make_solver
+from deadline import Timeout
 from subprocess import Popen
-import global_params
 import logging
 log = logging.getLogger(__name__)
 
 # THIS IS TO DEFINE A SKELETON FOR ANALYSIS
 # FOR NEW TYPE OF ANALYSIS: add necessary details to the skeleton functions
-cur_file = ""
-reported = False
-reentrancy_report_file = "re_report.report"
-
-def set_cur_file(c_file):
-    global cur_file
-    cur_file = c_file
 
 def init_analysis():
     analysis = {
@@ -36,10 +30,68 @@ def init_analysis():
 def display_analysis(analysis):
     logging.debug("Money flow: " + str(analysis["money_flow"]))
 
+# The taint of a value is the set of the sources it was computed from, the
+# names of the variables of the block header (IH_s is the timestamp and
+# IH_blockhash a blockhash) and of the storage (Ia_store_<address>). The taint
+# of a path is that of the constraints of its path condition, gathered as they
+# are added so that the detectors need not go through the path conditions.
+TAINT_SOURCES = ("IH_", "Ia_store_")
+TIMESTAMP_TAINT = "IH_s"
+# the number of expressions whose taint is kept, past which it is forgotten
+TAINT_TABLE_SIZE = 100000
+
+
+# Tracks the taint of the paths of an exploration. The taint of an expression
+# is computed once for all the constraints it is part of, as long as the
+# table holds no more than `size` expressions. It is emptied when it gets
+# larger, so that it does not keep every expression of a long exploration.
+class TaintTracker(object):
+    def __init__(self, size=TAINT_TABLE_SIZE):
+        self.size = size
+        # id of an expression -> the expression and its taint
+        self.taints = {}
+
+    def labels(self, expr):
+        if not is_expr(expr):
+            return frozenset()
+        taints = self.taints
+        if len(taints) > self.size:
+            taints.clear()
+        todo = [expr]
+        while todo:
+            node = todo[-1]
+            key = node.get_id()
+            if key in taints:
+                todo.pop()
+                continue
+            if is_const(node):
+                name = node.decl().name()
+                taint = frozenset([name]) if name.startswith(TAINT_SOURCES) else frozenset()
+            else:
+                children = node.children()
+                missing = [child for child in children if child.get_id() not in taints]
+                if missing:
+                    todo.extend(missing)
+                    continue
+                taint = frozenset().union(*[taints[child.get_id()][1] for child in children])
+            taints[key] = (node, taint)
+            todo.pop()
+        return taints[expr.get_id()][1]
+
+    # Add a constraint to the path condition of a path and its taint, when it
+    # is known already, to the taint of the path
+    def add_constraint(self, path_conditions_and_vars, constraint, taint=None):
+        path_conditions_and_vars["path_condition"].append(constraint)
+        if taint is None:
+            taint = self.labels(constraint)
+        if not taint <= path_conditions_and_vars.taint:
+            path_conditions_and_vars.taint = path_conditions_and_vars.taint | taint
+
+
 # Check if this call has the Reentrancy bug
 # Return true if it does, false otherwise
-def check_reentrancy_bug(path_conditions_and_vars, global_state):
-    path_condition = path_conditions_and_vars["path_condition"]
+def check_reentrancy_bug(path_conditions_and_vars, global_state, deadline=None, profile=None):
+    path_condition = list(path_conditions_and_vars["path_condition"])
     new_path_condition = []
     for expr in path_condition:
         if not is_expr(expr):
@@ -50,61 +102,121 @@ def check_reentrancy_bug(path_conditions_and_vars, global_state):
             # check if a var is global
             if var_name.startswith("Ia_store_"):
                 storage_key = var_name.split("Ia_store_")[1]
-                if storage_key in global_state["Ia"]:
+                if storage_key in global_state["Ia"] and is_current_storage(global_state, storage_key):
                     new_path_condition.append(var == global_state["Ia"][storage_key])
-    log.info("=>>>>>> New PC: " + str(new_path_condition))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("=>>>>>> New PC: " + str(new_path_condition))
 
-    solver = Solver()
+    solver = make_solver(deadline=deadline, profile=profile, site="reentrancy")
     solver.push()
     solver.add(path_condition)
     solver.add(new_path_condition)
     # if it is not feasible to re-execute the call, its not a bug
     ret_val = not (solver.check() == unsat)
     solver.pop()
-    log.info("Reentrancy_bug? " + str(ret_val))
-    global reported
-    if not reported:
-        with open(reentrancy_report_file, 'a') as r_report:
-            r_report.write('\n'+cur_file)
-        reported = True
+    log.debug("Reentrancy_bug? %s", ret_val)
     return ret_val
 
-def calculate_gas(opcode, stack, mem, global_state, analysis, solver):
+
+# Checks calls for the reentrancy bug as check_reentrancy_bug does, in the
+# solver of the exploration. At a call, that solver holds the path condition
+# but for the constraints in `held_out`, which are added with those on the
+# storage in a scope of their own. The storage variables of a constraint are
+# looked for once, and the result of a check is remembered for the path
+# condition and storage constraints it was made for.
+class ReentrancyChecker(object):
+    def __init__(self, solver, held_out=(), profile=None):
+        self.solver = solver
+        self.held_out = list(held_out)
+        self.profile = profile
+        # id of a constraint -> the constraint, and its storage variables with their keys
+        self.constraints = {}
+        self.storage_vars = {}
+        # key of a check -> the path condition and storage constraints it was made for, and its result
+        self.results = {}
+
+    def get_storage_vars(self, expr):
+        key = expr.get_id()
+        if key not in self.storage_vars:
+            found = []
+            for var in get_vars(expr):
+                var_name = var.decl().name()
+                # check if a var is global
+                if var_name.startswith("Ia_store_"):
+                    found.append((var, var_name.split("Ia_store_")[1]))
+            self.storage_vars[key] = found
+            self.constraints[key] = expr
+        return self.storage_vars[key]
+
+    def check(self, path_conditions_and_vars, global_state):
+        path_condition = path_conditions_and_vars["path_condition"]
+        new_path_condition = []
+        for expr in path_condition:
+            if not is_expr(expr):
+                continue
+            for var, storage_key in self.get_storage_vars(expr):
+                if storage_key in global_state["Ia"] and is_current_storage(global_state, storage_key):
+                    new_path_condition.append(var == global_state["Ia"][storage_key])
+
+        key = (id(path_condition.tail), path_condition.size, tuple(c.get_id() for c in new_path_condition))
+        checked = self.results.get(key)
+        if checked is None:
+            if self.profile is not None:
+                site, self.profile.site = self.profile.site, "reentrancy"
+            self.solver.push()
+            try:
+                self.solver.add(self.held_out)
+                self.solver.add(new_path_condition)
+                # if it is not feasible to re-execute the call, its not a bug
+                result = not (self.solver.check() == unsat)
+            finally:
+                self.solver.pop()
+                if self.profile is not None:
+                    self.profile.site = site
+            # the path condition and constraints are kept, so that their ids
+            # are not given to others
+            checked = self.results[key] = [path_condition.tail, new_path_condition, result]
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("=>>>>>> New PC: " + str(new_path_condition))
+            log.debug("Reentrancy_bug? %s", checked[2])
+        return checked[2]
+
+def calculate_gas(opcode, stack, mem, global_state, analysis, solver, key=str):
     gas_increment = get_ins_cost(opcode) # base cost
     gas_memory = analysis["gas_mem"]
     # In some opcodes, gas cost is not only depend on opcode itself but also current state of evm
     # For symbolic variables, we only add base cost part for simplicity
     if opcode in ("LOG0", "LOG1", "LOG2", "LOG3", "LOG4") and len(stack) > 1:
-        if isinstance(stack[1], (int, long)):
-            gas_increment += GCOST["Glogdata"] * stack[1]
+        if isinstance(stack[-2], (int, long)):
+            gas_increment += GCOST["Glogdata"] * stack[-2]
     elif opcode == "EXP" and len(stack) > 1:
-        if isinstance(stack[1], (int, long)) and stack[1] > 0:
-            gas_increment += GCOST["Gexpbyte"] * (1 + math.floor(math.log(stack[1], 256)))
-    elif opcode == "EXTCODECOPY" and len(stack) > 2:
-        if isinstance(stack[2], (int, long)):
-            gas_increment += GCOST["Gcopy"] * math.ceil(stack[2] / 32)
-    elif opcode in ("CALLDATACOPY", "CODECOPY") and len(stack) > 3:
-        if isinstance(stack[3], (int, long)):
-            gas_increment += GCOST["Gcopy"] * math.ceil(stack[3] / 32)
+        if isinstance(stack[-2], (int, long)) and stack[-2] > 0:
+            gas_increment += GCOST["Gexpbyte"] * (1 + math.floor(math.log(stack[-2], 256)))
+    elif opcode == "EXTCODECOPY" and len(stack) > 3:
+        if isinstance(stack[-4], (int, long)):
+            gas_increment += GCOST["Gcopy"] * ((stack[-4] + 31) // 32)
+    elif opcode in ("CALLDATACOPY", "CODECOPY") and len(stack) > 2:
+        if isinstance(stack[-3], (int, long)):
+            gas_increment += GCOST["Gcopy"] * ((stack[-3] + 31) // 32)
     elif opcode == "SSTORE" and len(stack) > 1:
-        if isinstance(stack[1], (int, long)):
+        if isinstance(stack[-2], (int, long)):
             try:
-                storage_value = global_state['Ia'][str(stack[0])]
+                storage_value = global_state['Ia'][key(stack[-1])]
                 # when we change storage value from zero to non-zero
-                if storage_value == 0 and stack[1] != 0:
+                if storage_value == 0 and stack[-2] != 0:
                     gas_increment += GCOST["Gsset"]
                 else:
                     gas_increment += GCOST["Gsreset"]
             except: # when storage address at considered key is empty
-                if stack[1] != 0:
+                if stack[-2] != 0:
                     gas_increment += GCOST["Gsset"]
-                elif stack[1] == 0:
+                elif stack[-2] == 0:
                     gas_increment += GCOST["Gsreset"]
         else:
             try:
-                storage_value = global_state['Ia'][str(stack[0])]
+                storage_value = global_state['Ia'][key(stack[-1])]
                 solver.push()
-                solver.add(Not( And(storage_value == 0, stack[1] != 0) ))
+                solver.add(Not( And(storage_value == 0, stack[-2] != 0) ))
                 if solver.check() == unsat:
                     gas_increment += GCOST["Gsset"]
                 else:
@@ -112,53 +224,62 @@ def calculate_gas(opcode, stack, mem, global_state, analysis, solver):
                 solver.pop()
             except:
                 solver.push()
-                solver.add(Not( stack[1] != 0 ))
+                solver.add(Not( stack[-2] != 0 ))
                 if solver.check() == unsat:
                     gas_increment += GCOST["Gsset"]
                 else:
                     gas_increment += GCOST["Gsreset"]
                 solver.pop()
     elif opcode == "SUICIDE" and len(stack) > 1:
-        if isinstance(stack[1], (int, long)):
-            address = stack[1] % 2**160
+        if isinstance(stack[-2], (int, long)):
+            address = stack[-2] % 2**160
             if address not in global_state:
                 gas_increment += GCOST["Gnewaccount"]
         else:
-            address = str(stack[1])
+            address = key(stack[-2])
             if address not in global_state:
                 gas_increment += GCOST["Gnewaccount"]
     elif opcode in ("CALL", "CALLCODE", "DELEGATECALL") and len(stack) > 2:
         # Not fully correct yet
         gas_increment += GCOST["Gcall"]
-        if isinstance(stack[2], (int, long)):
-            if stack[2] != 0:
+        if isinstance(stack[-3], (int, long)):
+            if stack[-3] != 0:
                 gas_increment += GCOST["Gcallvalue"]
         else:
             solver.push()
-            solver.add(Not (stack[2] != 0))
+            solver.add(Not (stack[-3] != 0))
             if solver.check() == unsat:
                 gas_increment += GCOST["Gcallvalue"]
             solver.pop()
-    elif opcode == "SHA3" and isinstance(stack[1], (int, long)):
-        pass # Not handle
+    elif opcode == "SHA3" and len(stack) > 1:
+        if isinstance(stack[-2], (int, long)):
+            gas_increment += GCOST["Gsha3word"] * ((stack[-2] + 31) // 32)
 
 
     #Calculate gas memory, add it to total gas used
-    length = len(mem.keys()) # number of memory words
+    length = len(mem) # number of memory words
     new_gas_memory = GCOST["Gmemory"] * length + (length ** 2) // 512
     gas_increment += new_gas_memory - gas_memory
 
     return (gas_increment, new_gas_memory)
 
-def update_analysis(analysis, opcode, stack, mem, global_state, path_conditions_and_vars, solver):
-    gas_increment, gas_memory = calculate_gas(opcode, stack, mem, global_state, analysis, solver)
+# `reentrancy` is the ReentrancyChecker of the calls, check_reentrancy_bug is
+# used when there is none. `keys` are the ExprKeys of the symbolic addresses,
+# which are keyed by their string when there are none.
+def update_analysis(analysis, opcode, stack, mem, global_state, path_conditions_and_vars, solver, data_flow=False,
+                    reentrancy=None, keys=None):
+    key = keys.key if keys is not None else str
+    gas_increment, gas_memory = calculate_gas(opcode, stack, mem, global_state, analysis, solver, key)
     analysis["gas"] += gas_increment
     analysis["gas_mem"] = gas_memory
 
     if opcode == "CALL":
-        recipient = stack[1]
-        transfer_amount = stack[2]
-        reentrancy_result = check_reentrancy_bug(path_conditions_and_vars, global_state)
+        recipient = stack[-2]
+        transfer_amount = stack[-3]
+        if reentrancy is not None:
+            reentrancy_result = reentrancy.check(path_conditions_and_vars, global_state)
+        else:
+            reentrancy_result = check_reentrancy_bug(path_conditions_and_vars, global_state)
         analysis["reentrancy_bug"].append(reentrancy_result)
         if isinstance(transfer_amount, (int, long)) and transfer_amount == 0:
             return
@@ -166,31 +287,31 @@ def update_analysis(analysis, opcode, stack, mem, global_state, path_conditions_
             recipient = simplify(recipient)
         analysis["money_flow"].append(("Ia", str(recipient), transfer_amount))
     elif opcode == "SUICIDE":
-        recipient = stack[0]
+        recipient = stack[-1]
         if not isinstance(recipient, (int, long)):
             recipient = simplify(recipient)
         analysis["money_flow"].append(("Ia", str(recipient), "all_remaining"))
     # this is for data flow
-    elif global_params.DATA_FLOW:
+    elif data_flow:
         if opcode == "SLOAD":
             if len(stack) > 0:
-                address = stack[0]
+                address = stack[-1]
                 if not isinstance(address, (int, long)):
-                    address = str(address)
+                    address = key(address)
                 if address not in analysis["sload"]:
                     analysis["sload"].append(address)
             else:
                 raise ValueError('STACK underflow')
         elif opcode == "SSTORE":
             if len(stack) > 1:
-                stored_address = stack[0]
-                stored_value = stack[1]
+                stored_address = stack[-1]
+                stored_value = stack[-2]
                 log.debug(type(stored_address))
                 # a temporary fix, not a good one.
                 # TODO move to z3 4.4.2 in which BitVecRef is hashable
                 if not isinstance(stored_address, (int, long)):
-                    stored_address = str(stored_address)
-                log.debug("storing value " + str(stored_value) + " to address " + str(stored_address))
+                    stored_address = key(stored_address)
+                log.debug("storing value %s to address %s", stored_value, stored_address)
                 if stored_address in analysis["sstore"]:
                     # recording the new values of the item in storage
                     analysis["sstore"][stored_address].append(stored_value)
@@ -203,7 +324,7 @@ def update_analysis(analysis, opcode, stack, mem, global_state, path_conditions_
 # Check if it is possible to execute a path after a previous path
 # Previous path has prev_pc (previous path condition) and set global state variables as in gstate (only storage values)
 # Current path has curr_pc
-def is_feasible(prev_pc, gstate, curr_pc):
+def is_feasible(prev_pc, gstate, curr_pc, deadline=None, profile=None, solver=None):
     vars_mapping = {}
     new_pc = list(curr_pc)
     for expr in new_pc:
@@ -216,7 +337,8 @@ def is_feasible(prev_pc, gstate, curr_pc):
         var = gen.gen_owner_store_var(storage_address)
         if var in vars_mapping:
             new_pc.append(vars_mapping[var] == gstate[storage_address])
-    solver = Solver()
+    if solver is None:
+        solver = make_solver(deadline=deadline, profile=profile, site="concurrency false positive")
     solver.push()
     solver.add(new_pc)
     if solver.check() == unsat:
@@ -234,7 +356,7 @@ def is_feasible(prev_pc, gstate, curr_pc):
 # 2. We then check if two paths cannot be executed next to each other, for example they
 # are two paths yielded from this branch condition ``if (locked)"
 # 3. More checks are to come
-def is_false_positive(i, j, all_gs, path_conditions):
+def is_false_positive(i, j, all_gs, path_conditions, deadline=None, profile=None):
     pathi = path_conditions[i]
     pathj = path_conditions[j]
     statei = all_gs[i]
@@ -243,14 +365,14 @@ def is_false_positive(i, j, all_gs, path_conditions):
     set_of_pcs, statei = rename_vars(pathi, statei)
     log.debug("Set of PCs after renaming global vars" + str(set_of_pcs))
     log.debug("Global state values in path " + str(i) + " after renaming: " + str(statei))
-    if is_feasible(set_of_pcs, statei, pathj):
+    if is_feasible(set_of_pcs, statei, pathj, deadline, profile):
         return 0
     else:
         return 1
 
 
 # Simple check if two flows of money are different
-def is_diff(flow1, flow2):
+def is_diff(flow1, flow2, deadline=None, profile=None):
     if len(flow1) != len(flow2):
         return 1
     n = len(flow1)
@@ -261,7 +383,7 @@ def is_diff(flow1, flow2):
             tx_cd = Or(Not(flow1[i][0] == flow2[i][0]),
                        Not(flow1[i][1] == flow2[i][1]),
                        Not(flow1[i][2] == flow2[i][2]))
-            solver = Solver()
+            solver = make_solver(deadline=deadline, profile=profile, site="money concurrency")
             solver.push()
             solver.add(tx_cd)
 
@@ -269,6 +391,75 @@ def is_diff(flow1, flow2):
                 solver.pop()
                 return 1
             solver.pop()
+        except Timeout:
+            raise
         except Exception as e:
             return 1
     return 0
+
+
+# The sources and destinations of the transfers of a money flow. is_diff
+# finds two flows with different signatures different whatever their amounts.
+def flow_signature(flow):
+    return tuple((transfer[0], transfer[1]) for transfer in flow)
+
+
+# Compares the money flows of the paths of a contract as is_diff and
+# is_false_positive do, with a solver kept for all the pairs. Of two flows
+# with the same signature, only the amounts that differ and are not both
+# concrete are given to the solver, and its answer for two transfers is
+# remembered. The path conditions renamed by is_false_positive are kept too.
+class FlowComparator(object):
+    def __init__(self, deadline=None, profile=None):
+        self.flow_solver = make_solver(deadline=deadline, profile=profile, site="money concurrency")
+        self.path_solver = make_solver(deadline=deadline, profile=profile, site="concurrency false positive")
+        # id of the query on two transfers -> the query, and whether they may differ
+        self.queries = {}
+        self.differ = {}
+        # path -> its path condition and storage with the variables renamed
+        self.renamed_pcs = {}
+        self.renamed_gs = {}
+
+    # is_diff of two flows with the same signature
+    def is_diff(self, flow1, flow2):
+        for transfer1, transfer2 in zip(flow1, flow2):
+            try:
+                if transfer1 == transfer2:
+                    continue
+            except Z3Exception:
+                # a symbolic amount and "all_remaining"
+                return 1
+            if not is_expr(transfer1[2]) and not is_expr(transfer2[2]):
+                return 1
+            if self.may_differ(transfer1, transfer2):
+                return 1
+        return 0
+
+    def may_differ(self, transfer1, transfer2):
+        try:
+            tx_cd = Or(Not(transfer1[0] == transfer2[0]),
+                       Not(transfer1[1] == transfer2[1]),
+                       Not(transfer1[2] == transfer2[2]))
+            key = tx_cd.get_id()
+            if key not in self.differ:
+                self.flow_solver.push()
+                self.flow_solver.add(tx_cd)
+                try:
+                    self.differ[key] = self.flow_solver.check() == sat
+                finally:
+                    self.flow_solver.pop()
+                # the query is kept so that its id is not given to another
+                self.queries[key] = tx_cd
+            return self.differ[key]
+        except Timeout:
+            raise
+        except Exception:
+            return True
+
+    def is_false_positive(self, i, j, all_gs, path_conditions):
+        if i not in self.renamed_pcs:
+            self.renamed_pcs[i], self.renamed_gs[i] = rename_vars(path_conditions[i], all_gs[i])
+        if is_feasible(self.renamed_pcs[i], self.renamed_gs[i], path_conditions[j], solver=self.path_solver):
+            return 0
+        else:
+            return 1
@@ -2,53 +2,215 @@ import json
 import glob
 from tqdm import tqdm
 import os
-import sys
-import urllib2
+import time
+import argparse
+import resource
+import traceback
+import multiprocessing
+from Queue import Empty
+
+import global_params
+from result_cache import ResultCache, result_key
 
 contract_dir = 'contract_data'
 
-cfiles = glob.glob(contract_dir+'/contract1.json')
 
-cjson = {}
+# A worker analyzes the contracts it takes from `tasks` one after the other.
+# It exits after `recycle` contracts or when it runs out of memory, and is
+# replaced by a fresh one.
+def analyze_contracts(tasks, done, args):
+	import oyente
+	import symExec
 
-print "Loading contracts..."
+	if args.memory:
+		limit = args.memory * 1024 * 1024
+		resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
 
-for cfile in tqdm(cfiles):
-	cjson.update(json.loads(open(cfile).read()))
+	for _ in xrange(args.recycle):
+		task = tasks.get()
+		if task is None:
+			break
+		contract, evm = task
+		done.put(('start', os.getpid(), contract, None, False))
+		complete = False
+		analyzer = symExec.Analyzer(oyente.removeSwarmHash(evm))
+		try:
+			# the results of an analysis that timed out are not complete
+			complete = analyzer.run()['complete']
+		except MemoryError:
+			done.put(('failed', os.getpid(), contract, None, False))
+			break
+		except Exception:
+			# a crash of the analysis, the results found so far are kept
+			traceback.print_exc()
+		done.put(('done', os.getpid(), contract, dict(analyzer.results), complete))
 
-results = {}
-missed = []
 
-print "Running analysis..."
+def write_results(results, missed):
+	with open('results.json', 'w') as of:
+		of.write(json.dumps(results,indent=1))
+	with open('missed.json', 'w') as of:
+		of.write(json.dumps(missed,indent=1))
 
-contracts = cjson.keys()
 
-if os.path.isfile('results.json'):
-	old_res = json.loads(open('results.json').read())
-	old_res = old_res.keys()
-	contracts = [c for c in contracts if c not in old_res]
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-j", "--jobs", type=int, default=multiprocessing.cpu_count(),
+						help="Number of contracts analyzed at the same time")
+	parser.add_argument("-t", "--timeout", type=int, default=global_params.GLOBAL_TIMEOUT,
+						help="Timeout of the symbolic execution of a contract, in seconds")
+	parser.add_argument("-m", "--memory", type=int,
+						help="Memory limit of a worker, in MB")
+	parser.add_argument("-r", "--recycle", type=int, default=100,
+						help="Number of contracts a worker analyzes before it is replaced")
+	parser.add_argument("-ll", "--looplimit", type=int, default=30,
+						help="Limit a number of loop")
+	parser.add_argument("-qd", "--querycachedir", default='query_cache',
+						help="Directory where the workers share solver query results")
+	parser.add_argument("-rc", "--resultcache", default='result_cache',
+						help="Directory where the results are stored by bytecode, empty to analyze every contract")
+	args = parser.parse_args()
 
-cores=0
-job=0
+	# the workers are forked from this process and inherit the parameters
+	global_params.LOOP_LIMIT = args.looplimit
+	global_params.GLOBAL_TIMEOUT = args.timeout
+	global_params.QUERY_CACHE_DIR = os.path.abspath(args.querycachedir)
+	result_cache = ResultCache(args.resultcache) if args.resultcache else None
 
-if len(sys.argv)>=3:
-	cores = int(sys.argv[1])
-	job = int(sys.argv[2])
-	contracts = contracts[(len(contracts)/cores)*job:(len(contracts)/cores)*(job+1)]
-	print "Job %d: Running on %d contracts..." % (job, len(contracts))
+	# a contract whose analysis does not end by itself, detectors included,
+	# is given up
+	hard_timeout = args.timeout + 30
+
+	cfiles = glob.glob(contract_dir+'/contract1.json')
+
+	cjson = {}
+
+	print "Loading contracts..."
+
+	for cfile in tqdm(cfiles):
+		cjson.update(json.loads(open(cfile).read()))
+
+	results = {}
+	missed = []
+
+	print "Running analysis..."
+
+	contracts = cjson.keys()
+
+	if os.path.isfile('results.json'):
+		old_res = json.loads(open('results.json').read())
+		old_res = old_res.keys()
+		contracts = [c for c in contracts if c not in old_res]
+
+	print "Running on %d contracts with %d workers..." % (len(contracts), args.jobs)
+
+	tasks = multiprocessing.Queue()
+	done = multiprocessing.Queue()
+	workers = {}  # pid -> [process, contract being analyzed, start time]
+
+	def start_worker():
+		process = multiprocessing.Process(target=analyze_contracts, args=(tasks, done, args))
+		process.start()
+		workers[process.pid] = [process, None, None]
+
+	# contracts with the same code as a contract being analyzed wait for
+	# its result, indexed by the key of the result
+	waiting = {}
+	keys = {}
+
+	def finish(contract, result, complete=False):
+		if contract in results or contract in missed:
+			return
+		key = keys.pop(contract, None)
+		if result is not None and complete and result_cache is not None:
+			result_cache.put(key, result)
+		for same in [contract] + waiting.pop(key, []):
+			if result is None:
+				missed.append(same)
+			else:
+				results[same] = result
+			progress.update(1)
+			if (len(results) + len(missed)) % 100 == 0:
+				write_results(results, missed)
+
+	def handle(message):
+		state, pid, contract, result, complete = message
+		if state == 'start':
+			queued[0] -= 1
+			if pid in workers:
+				workers[pid][1:] = [contract, time.time()]
+		else:
+			if pid in workers:
+				workers[pid][1:] = [None, None]
+			finish(contract, result, complete)
+
+	# only a few contracts wait in the queue, so that the bytecode of the
+	# whole corpus is not held in the pipe
+	pending = iter(contracts)
+	queued = [0]  # contracts in the queue, not taken by a worker yet
+	for _ in range(args.jobs):
+		start_worker()
+
+	progress = tqdm(total=len(contracts))
+	while len(results) + len(missed) < len(contracts):
+		while queued[0] < 2 * args.jobs:
+			contract = next(pending, None)
+			if contract is None:
+				break
+			evm = cjson[contract][1][2:]
+			if result_cache is not None:
+				key = result_key(evm)
+				if key in waiting:
+					waiting[key].append(contract)
+					continue
+				result = result_cache.get(key)
+				if result is not None:
+					finish(contract, result)
+					continue
+				keys[contract] = key
+				waiting[key] = []
+			tasks.put((contract, evm))
+			queued[0] += 1
+
+		# workers are checked before the queue is drained, so that the
+		# result a worker sent before it exited is never missed
+		stopped = []
+		for pid, (process, contract, start) in workers.items():
+			if contract is not None and time.time() - start > hard_timeout:
+				process.terminate()
+				process.join()
+				stopped.append(pid)
+			elif not process.is_alive():
+				stopped.append(pid)
+
+		try:
+			message = done.get(timeout=1)
+			while True:
+				handle(message)
+				message = done.get_nowait()
+		except Empty:
+			pass
+
+		# the worker was recycled, ran out of memory or was stopped
+		for pid in stopped:
+			contract = workers.pop(pid)[1]
+			if contract is not None:
+				finish(contract, None)
+			if len(results) + len(missed) < len(contracts):
+				start_worker()
+	progress.close()
+
+	for _ in workers:
+		tasks.put(None)
+	for process, _, _ in workers.values():
+		process.join()
+
+	write_results(results, missed)
+
+	if result_cache is not None:
+		print "%d results were found in the result cache." % result_cache.hits
+	print "Completed."
 
-for c in tqdm(contracts):
-	with open('tmp.evm','w') as of:
-		of.write(cjson[c][1][2:])
-	os.system('python oyente.py -ll 30 -s tmp.evm -j -b')
-	try:
-		results[c] = json.loads(open('tmp.evm.json').read())
-	except:
-		missed.append(c)
-	with open('results.json', 'w') as of:
-		of.write(json.dumps(results,indent=1))
-	with open('missed.json', 'w') as of:
-		of.write(json.dumps(missed,indent=1))
-	# urllib2.urlopen('https://dweet.io/dweet/for/oyente-%d-%d?completed=%d&missed=%d&remaining=%d' % (job,cores,len(results),len(missed),len(contracts)-len(results)-len(missed)))
 
-print "Completed."
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,265 @@
+import argparse
+import glob
+import json
+import logging
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import global_params
+import query_cache
+import symExec
+from oyente import removeSwarmHash
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTORS_DIR = os.path.join(BASE_DIR, "test_evm", "test_data")
+CONTRACTS_DIR = os.path.join(BASE_DIR, "benchmark_contracts")
+
+# the numbers compared with the baseline, and whether a higher one is better
+METRICS = (
+    ("instructions_per_sec", True),
+    ("blocks_per_sec", True),
+    ("paths_per_sec", True),
+    ("queries_per_sec", True),
+    ("latency_p50", False),
+    ("latency_p90", False),
+    ("latency_p99", False),
+    ("peak_rss_mb", False),
+)
+
+
+# The bytecode of the EVM test vectors, by test name
+def load_vectors(directory):
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path) as f:
+            tests = json.load(f)
+        for name in sorted(tests):
+            cases.append((name, tests[name]["exec"]["code"]))
+    return cases
+
+
+# The runtime bytecode of the contracts, by file name
+def load_contracts(directory):
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.evm"))):
+        with open(path) as f:
+            cases.append((os.path.basename(path), f.read()))
+    return cases
+
+
+# Analyze a bytecode from a cold query cache and return what it took
+def run_case(bytecode, params):
+    query_cache.clear_shared_cache()
+    analyzer = None
+    error = None
+    start = time.time()
+    try:
+        analyzer = symExec.Analyzer(removeSwarmHash(bytecode.strip()), params)
+        analyzer.run()
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    latency = time.time() - start
+
+    case = {"latency": latency, "error": error, "instructions": 0, "blocks": 0, "paths": 0, "queries": 0,
+            "complete": False, "results": None}
+    if analyzer is not None:
+        profile = analyzer.profile.to_json()
+        case.update({
+            "instructions": sum(opcode["count"] for opcode in profile["opcodes"].values()),
+            "blocks": profile["blocks"],
+            "paths": analyzer.total_no_of_paths,
+            "queries": sum(query["count"] for query in profile["solver"].values()),
+            "complete": error is None and analyzer.complete,
+            # the results as they are read back from a baseline
+            "results": json.loads(json.dumps(analyzer.results)),
+        })
+    return case
+
+
+# The value below which p percent of the values are
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+
+# The peak memory of the process, which runs a single suite
+def peak_rss_mb():
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+# Analyze every case `repeat` times, the cases are named "<name>#<run>"
+# when they are repeated
+def run_suite(cases, params, repeat=1):
+    runs = {}
+    for name, bytecode in cases:
+        for i in range(repeat):
+            run_name = name if repeat == 1 else "%s#%d" % (name, i + 1)
+            case = run_case(bytecode, params)
+            log.info("%-60s %8.3fs %8d instructions%s", run_name, case["latency"], case["instructions"],
+                     "" if case["error"] is None else " error: " + case["error"])
+            runs[run_name] = case
+
+    total = sum(run["latency"] for run in runs.values()) or 1e-9
+    latencies = [run["latency"] for run in runs.values()]
+    summary = {
+        "cases": len(runs),
+        "errors": sum(1 for run in runs.values() if run["error"] is not None),
+        "incomplete": sum(1 for run in runs.values() if not run["complete"]),
+        "time": total,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    for measure in ("instructions", "blocks", "paths", "queries"):
+        count = sum(run[measure] for run in runs.values())
+        summary[measure] = count
+        summary[measure + "_per_sec"] = count / total
+    return {"summary": summary, "cases": runs}
+
+
+def load_and_run_suite(suite, directory, params, repeat):
+    cases = load_vectors(directory) if suite == "vectors" else load_contracts(directory)
+    return run_suite(cases, params, repeat)
+
+
+# Run the suite received on `connection` and send back its results
+def suite_process(connection):
+    suite, directory, params, repeat = connection.recv()
+    connection.send(load_and_run_suite(suite, directory, params, repeat))
+
+
+# Run every suite of `suites`, pairs of a suite and its directory, in a
+# process of its own. The processes are all started before any suite is run,
+# so that the peak memory each one measures is that of its suite.
+def run_suites(suites, params, repeat=1):
+    connections = []
+    for _ in suites:
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=suite_process, args=(child_connection,))
+        process.start()
+        connections.append((connection, process))
+    results = {}
+    try:
+        for (suite, directory), (connection, process) in zip(suites, connections):
+            connection.send((suite, directory, params, repeat))
+            results[suite] = connection.recv()
+            process.join()
+    finally:
+        for _, process in connections:
+            if process.is_alive():
+                process.terminate()
+    return results
+
+
+def print_summary(report):
+    for suite, result in sorted(report["suites"].items()):
+        summary = result["summary"]
+        print "%s: %d cases, %d errors, %d incomplete, %.2fs" % (
+            suite, summary["cases"], summary["errors"], summary["incomplete"], summary["time"])
+        for metric, _ in METRICS:
+            print "  %-22s %14.3f" % (metric, summary[metric])
+
+
+# Print the metrics next to those of the baseline and return the ones that
+# got worse by more than `tolerance`, a fraction. The cases whose results
+# changed although both analyses completed are printed as well.
+def compare(report, baseline, tolerance):
+    regressions = []
+    for suite, result in sorted(report["suites"].items()):
+        if suite not in baseline["suites"]:
+            print "%s: not in the baseline" % suite
+            continue
+        old_result = baseline["suites"][suite]
+        print "%s:" % suite
+        print "  %-22s %14s %14s %8s" % ("metric", "baseline", "current", "change")
+        for metric, higher_is_better in METRICS:
+            old = old_result["summary"].get(metric)
+            new = result["summary"][metric]
+            if not old:
+                continue
+            change = (new - old) / float(old)
+            worse = -change if higher_is_better else change
+            regressed = worse > tolerance
+            if regressed:
+                regressions.append((suite, metric))
+            print "  %-22s %14.3f %14.3f %+7.1f%%%s" % (metric, old, new, 100 * change,
+                                                       "  REGRESSION" if regressed else "")
+        for name, case in sorted(result["cases"].items()):
+            old_case = old_result["cases"].get(name)
+            if old_case and old_case["complete"] and case["complete"] and old_case["results"] != case["results"]:
+                print "  results of %s changed: %s -> %s" % (name, old_case["results"], case["results"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput of the analysis on the EVM test vectors and a set of contracts")
+    parser.add_argument("-s", "--suite", choices=["vectors", "contracts"], action="append",
+                        help="Suite to run, both by default")
+    parser.add_argument("--vectors", default=VECTORS_DIR,
+                        help="Directory of the EVM test vectors")
+    parser.add_argument("--contracts", default=CONTRACTS_DIR,
+                        help="Directory of the runtime bytecode of the contracts, one .evm file each")
+    parser.add_argument("-t", "--timeout", type=int, default=10,
+                        help="Timeout of the analysis of a contract, in seconds")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="Number of times each case is analyzed")
+    parser.add_argument("-o", "--save", metavar="FILE",
+                        help="Save the measures as a baseline to this JSON file")
+    parser.add_argument("-c", "--compare", metavar="FILE",
+                        help="Compare with the baseline in this JSON file, exit with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Change of a metric for the worse that is a regression, as a fraction")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print the measures of every case")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    # the logs of the analysis would be part of the measures
+    logging.getLogger("symExec").setLevel(logging.WARNING)
+    logging.getLogger("analysis").setLevel(logging.WARNING)
+
+    # the counts of instructions, blocks and queries are taken from the
+    # profile, its cost is in the measures of the baseline as well
+    params = symExec.Params(GLOBAL_TIMEOUT=args.timeout, PROFILE=1, UNIT_TEST=0, REPORT_MODE=0)
+
+    suites = args.suite or ["vectors", "contracts"]
+    report = {
+        "parameters": {"timeout": args.timeout, "repeat": args.repeat, "jobs": params.JOBS,
+                       "search_strategy": params.SEARCH_STRATEGY,
+                       "query_cache_size": global_params.QUERY_CACHE_SIZE},
+        "suites": {},
+    }
+    directories = {"vectors": args.vectors, "contracts": args.contracts}
+    report["suites"] = run_suites([(suite, directories[suite]) for suite in suites], params, args.repeat)
+
+    print_summary(report)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print "Saved the baseline to %s" % args.save
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["parameters"] != json.loads(json.dumps(report["parameters"])):
+            print "The parameters differ from those of the baseline: %s" % baseline["parameters"]
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print "%d metrics regressed" % len(regressions)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
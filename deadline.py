@@ -0,0 +1,87 @@
+import time
+
+
+# Raised when the time given to an analysis is over
+class Timeout(Exception):
+    def __init__(self):
+        Exception.__init__(self, "timeout")
+
+
+# The time given to an analysis. The loops of the analysis check it between
+# steps and stop by raising Timeout, so that no signal is needed and every
+# analysis of a process can have a deadline of its own. The time counts from
+# start(), a deadline that is not started or has no time never expires.
+class Deadline(object):
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.end = None
+        self.reserved = 0
+
+    def start(self):
+        if self.seconds:
+            self.end = time.time() + self.seconds
+
+    # Hold back the `share` of the time that is kept for what comes last, the
+    # deadline expires that much earlier until release() gives it back
+    def reserve(self, share):
+        if self.end is not None:
+            self.reserved = self.seconds * share
+            self.end -= self.reserved
+
+    def release(self):
+        if self.end is not None:
+            self.end += self.reserved
+            self.reserved = 0
+
+    # the seconds left, None if there is no end
+    def remaining(self):
+        if self.end is None:
+            return None
+        return max(0, self.end - time.time())
+
+    def expired(self):
+        return self.end is not None and time.time() >= self.end
+
+    def check(self):
+        if self.expired():
+            raise Timeout()
+
+    # The z3 timeout in ms of a query that starts now: `timeout`, or the time
+    # left if it is shorter. None means no timeout.
+    def query_timeout(self, timeout=None):
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        remaining = max(1, int(remaining * 1000))
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+# A solver whose queries end at a deadline: no query starts once it has
+# passed, and a query is given the time left when that is shorter than the
+# timeout of the solver
+class DeadlineSolver(object):
+    def __init__(self, solver, deadline, timeout=None):
+        self.solver = solver
+        self.deadline = deadline
+        self.timeout = timeout
+        self.current = timeout
+
+    def push(self):
+        self.solver.push()
+
+    def pop(self, num=1):
+        self.solver.pop(num)
+
+    def add(self, *constraints):
+        self.solver.add(*constraints)
+
+    def check(self):
+        self.deadline.check()
+        timeout = self.deadline.query_timeout(self.timeout)
+        if timeout != self.current:
+            self.solver.set("timeout", timeout)
+            self.current = timeout
+        return self.solver.check()
+
+    def model(self):
+        return self.solver.model()
@@ -0,0 +1,35 @@
+import logging
+from instruction import Instruction
+from opcodes import PUSH1, PUSH32
+
+log = logging.getLogger(__name__)
+
+
+# Decode the hex string of a runtime bytecode into a list of instructions.
+# A PUSHi whose immediate is cut short by the end of the code is dropped,
+# the same way `evm disasm` used to stop there.
+def disassemble(bytecode):
+    bytecode = bytecode.strip()
+    if bytecode.startswith("0x"):
+        bytecode = bytecode[2:]
+    code = bytearray.fromhex(bytecode)
+    code_size = len(code)
+
+    disasm = []
+    pc = 0
+    while pc < code_size:
+        opcode = code[pc]
+        if PUSH1 <= opcode <= PUSH32:
+            size = opcode - PUSH1 + 1
+            if pc + size >= code_size:
+                log.debug("Incomplete push instruction at %d", pc)
+                break
+            push_value = 0
+            for byte in code[pc + 1:pc + 1 + size]:
+                push_value = (push_value << 8) | byte
+            disasm.append(Instruction(pc, opcode, push_value))
+            pc += 1 + size
+        else:
+            disasm.append(Instruction(pc, opcode))
+            pc += 1
+    return disasm
@@ -0,0 +1,280 @@
+import heapq
+import random
+from collections import deque
+
+
+# A group of paths forked off one conditional jump. Every pending state
+# holds a reference on its group, and a group holds one on its parent. Once
+# all the paths of a group have terminated, finish() runs and the reference
+# on the parent is given back.
+class PathGroup(object):
+    __slots__ = ("parent", "finish", "pending")
+
+    def __init__(self, parent=None, finish=None):
+        self.parent = parent
+        self.finish = finish
+        self.pending = 1
+
+    def release(self):
+        group = self
+        while group is not None:
+            group.pending -= 1
+            if group.pending:
+                return
+            if group.finish is not None:
+                group.finish()
+            group = group.parent
+
+
+# Counts the states that still share the same containers
+class Share(object):
+    __slots__ = ("count",)
+
+    def __init__(self, count):
+        self.count = count
+
+
+# A path waiting to be explored from the start of a basic block. The trail
+# of a state, when it has one, tells how it was reached from a state of a
+# frontier copied into other processes, see trail_steps.
+class State(object):
+    __slots__ = ("block", "pre_block", "depth", "visited", "stack", "mem",
+                 "global_state", "path_conditions_and_vars", "analysis", "group", "share", "trail")
+
+    def __init__(self, block, pre_block, depth, visited, stack, mem, global_state,
+                 path_conditions_and_vars, analysis, group=None):
+        self.block = block
+        self.pre_block = pre_block
+        self.depth = depth
+        self.visited = visited
+        self.stack = stack
+        self.mem = mem
+        self.global_state = global_state
+        self.path_conditions_and_vars = path_conditions_and_vars
+        self.analysis = analysis
+        self.group = group if group is not None else PathGroup()
+        self.share = None
+        self.trail = None
+
+    # the successor of this state at the start of `block`, which takes over
+    # the given containers
+    def successor(self, block, stack, mem, global_state, path_conditions_and_vars, analysis, visited):
+        self.group.pending += 1
+        return State(block, self.block, self.depth, visited, stack, mem, global_state,
+                     path_conditions_and_vars, analysis, self.group)
+
+    # start a new group for the successors of this state; `finish` is called
+    # when all of them have terminated
+    def fork(self, finish):
+        self.group = PathGroup(self.group, finish)
+
+    # called once the state has been explored
+    def release(self):
+        self.group.release()
+        if self.share is not None:
+            self.share.count -= 1
+            self.share = None
+
+
+# Depth first search, the order in which the recursive executor used to
+# explore paths: the first successor of a block is explored completely
+# before the second one
+class DFSFrontier(object):
+    def __init__(self):
+        self.states = []
+
+    def __len__(self):
+        return len(self.states)
+
+    def add(self, states):
+        self.states.extend(reversed(states))
+
+    def pop(self):
+        return self.states.pop()
+
+    # the state that is explored last, the one closest to the start
+    def steal(self):
+        return self.states.pop(0)
+
+    def visit(self, state):
+        pass
+
+
+# Breadth first search: shorter paths are explored first
+class BFSFrontier(object):
+    def __init__(self):
+        self.states = deque()
+
+    def __len__(self):
+        return len(self.states)
+
+    def add(self, states):
+        self.states.extend(states)
+
+    def pop(self):
+        return self.states.popleft()
+
+    def steal(self):
+        return self.states.pop()
+
+    def visit(self, state):
+        pass
+
+
+# Pick the next state uniformly at random among the pending ones
+class RandomPathFrontier(object):
+    def __init__(self, seed=None):
+        self.states = []
+        self.random = random.Random(seed)
+
+    def __len__(self):
+        return len(self.states)
+
+    def add(self, states):
+        self.states.extend(states)
+
+    def pop(self):
+        i = self.random.randrange(len(self.states))
+        self.states[i], self.states[-1] = self.states[-1], self.states[i]
+        return self.states.pop()
+
+    def steal(self):
+        return self.pop()
+
+    def visit(self, state):
+        pass
+
+
+# Prefer the states whose block has been executed the least number of times,
+# so blocks that are not covered yet are reached first. Ties are broken depth
+# first.
+class CoverageFrontier(object):
+    def __init__(self):
+        self.heap = []
+        self.block_visits = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, states):
+        for state in reversed(states):
+            self.counter += 1
+            visits = self.block_visits.get(state.block, 0)
+            heapq.heappush(self.heap, (visits, -self.counter, state))
+
+    def pop(self):
+        # visit counts only grow, so an entry whose count is stale is pushed
+        # back with the current one until the smallest entry is up to date
+        while True:
+            visits, order, state = heapq.heappop(self.heap)
+            current = self.block_visits.get(state.block, 0)
+            if current == visits:
+                return state
+            heapq.heappush(self.heap, (current, order, state))
+
+    # the last entry of a heap can be removed without reordering it
+    def steal(self):
+        return self.heap.pop()[2]
+
+    def visit(self, state):
+        self.block_visits[state.block] = self.block_visits.get(state.block, 0) + 1
+
+
+SEARCH_STRATEGIES = {
+    "dfs": DFSFrontier,
+    "bfs": BFSFrontier,
+    "random": RandomPathFrontier,
+    "coverage": CoverageFrontier,
+}
+
+
+# The trail of a state is a linked list, from its block back, of which
+# successor was taken at every block since a state of the copied frontier,
+# ending with the index of that state. The steps go the other way: the index,
+# then the successors in the order they were taken.
+def trail_steps(trail):
+    steps = []
+    while trail is not None:
+        step, trail = trail
+        steps.append(step)
+    steps.reverse()
+    return steps
+
+
+def make_frontier(strategy):
+    try:
+        return SEARCH_STRATEGIES[strategy]()
+    except KeyError:
+        raise ValueError("Unknown search strategy: %s" % strategy)
+
+
+# Worklist explorer. execute(state) runs the block of a state and returns its
+# successor states, which are added to the frontier of the chosen strategy.
+class Explorer(object):
+    def __init__(self, execute, strategy="dfs", deadline=None):
+        self.execute = execute
+        self.frontier = make_frontier(strategy)
+        self.deadline = deadline
+        self.executed_blocks = 0
+
+    def add(self, state):
+        self.frontier.add([state])
+
+    def is_done(self):
+        return len(self.frontier) == 0
+
+    # Explore until the frontier is empty or `budget` blocks have been
+    # executed by this call. Returns False if the budget ran out first, in
+    # which case calling run again resumes where the exploration stopped.
+    # Raises Timeout between two blocks once the deadline has passed.
+    def run(self, budget=None):
+        executed = 0
+        while self.frontier:
+            if budget is not None and executed >= budget:
+                return False
+            if self.deadline is not None:
+                self.deadline.check()
+            state = self.frontier.pop()
+            self.frontier.visit(state)
+            executed += 1
+            self.executed_blocks += 1
+            try:
+                successors = self.execute(state)
+            finally:
+                state.release()
+            if successors:
+                if state.trail is not None:
+                    for i, successor in enumerate(successors):
+                        successor.trail = (i, state.trail)
+                self.frontier.add(successors)
+        return True
+
+    # Execute the blocks from `state` again, taking at each one the successor
+    # given by `steps`, and add the state reached to the frontier. Returns
+    # False when a block no longer has the successor to take.
+    def replay(self, state, steps):
+        for step in steps:
+            if self.deadline is not None:
+                self.deadline.check()
+            self.executed_blocks += 1
+            try:
+                successors = self.execute(state)
+            finally:
+                state.release()
+            for i, successor in enumerate(successors):
+                successor.trail = (i, state.trail)
+                if i != step:
+                    successor.release()
+            if step >= len(successors):
+                return False
+            state = successors[step]
+        self.frontier.add([state])
+        return True
+
+    # Take a pending state out of the frontier for another process, which
+    # gets to it from its trail, and return the steps of the trail
+    def give_away(self):
+        state = self.frontier.steal()
+        state.release()
+        return trail_steps(state.trail)
@@ -27,6 +27,10 @@ UNIT_TEST = 0
 # timeout to run symbolic execution (in secs)
 GLOBAL_TIMEOUT = 2
 
+# share of GLOBAL_TIMEOUT kept for the bug detectors, which also get the
+# time the symbolic execution leaves
+DETECTION_SHARE = 0.2
+
 # print path conditions
 PRINT_PATHS = 0
 
@@ -36,6 +40,9 @@ WEB = 0
 # Redirect results to a json file.
 STORE_RESULT = 0
 
+# write where the time of the analysis goes to a json file
+PROFILE = 0
+
 # depth limit for DFS
 DEPTH_LIMIT = 100000
 
@@ -43,6 +50,19 @@ GAS_LIMIT = 4000000
 
 LOOP_LIMIT = 1000
 
+# order in which paths are explored: dfs, bfs, random or coverage
+SEARCH_STRATEGY = "dfs"
+
+# number of processes exploring the paths of a contract
+JOBS = 1
+
+# number of solver query results kept in memory, 0 disables the cache
+QUERY_CACHE_SIZE = 10000
+
+# directory where solver query results are stored to be shared between runs,
+# empty to keep them in memory only
+QUERY_CACHE_DIR = ""
+
 # Use a public blockchain to speed up the symbolic execution
 USE_GLOBAL_BLOCKCHAIN = 0
 
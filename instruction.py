@@ -0,0 +1,23 @@
+from opcodes import get_opcode, get_opcode_name, PUSH1
+
+
+class Instruction(object):
+    __slots__ = ("pc", "opcode", "name", "push_value", "stack_in", "stack_out")
+
+    def __init__(self, pc, opcode, push_value=None):
+        self.pc = pc
+        self.opcode = opcode  # the opcode byte
+        self.name = get_opcode_name(opcode)
+        self.push_value = push_value  # immediate of a PUSHi, None otherwise
+        opcode_info = get_opcode(self.name)
+        self.stack_in = opcode_info[1]  # no. of items removed from stack
+        self.stack_out = opcode_info[2]  # no. of items added to stack
+
+    def __str__(self):
+        if self.push_value is None:
+            return self.name
+        size = self.opcode - PUSH1 + 1
+        return self.name + " 0x" + ("%x" % self.push_value).zfill(2 * size)
+
+    def __repr__(self):
+        return "%d %s" % (self.pc, str(self))
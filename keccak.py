@@ -0,0 +1,80 @@
+import struct
+
+# Keccak-256 as the EVM uses it, the Keccak submitted to the SHA-3
+# competition, whose padding differs from that of the standard SHA3-256
+
+ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+
+# rotation of the lane at x + 5 * y
+ROTATIONS = [
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14,
+]
+
+MASK = (1 << 64) - 1
+RATE = 136
+
+
+def rotate(lane, n):
+    return ((lane << n) | (lane >> (64 - n))) & MASK if n else lane
+
+
+def keccak_f(lanes):
+    for constant in ROUND_CONSTANTS:
+        # theta
+        parities = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        for x in range(5):
+            d = parities[(x - 1) % 5] ^ rotate(parities[(x + 1) % 5], 1)
+            for y in range(0, 25, 5):
+                lanes[x + y] ^= d
+        # rho and pi
+        moved = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                moved[y + 5 * ((2 * x + 3 * y) % 5)] = rotate(lanes[x + 5 * y], ROTATIONS[x + 5 * y])
+        # chi
+        for y in range(0, 25, 5):
+            for x in range(5):
+                lanes[x + y] = moved[x + y] ^ (~moved[(x + 1) % 5 + y] & moved[(x + 2) % 5 + y])
+        # iota
+        lanes[0] ^= constant
+    return lanes
+
+
+# The Keccak-256 digest of a byte string, as a byte string
+def keccak256(data):
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % RATE))
+    padded[-1] |= 0x80
+
+    lanes = [0] * 25
+    for start in range(0, len(padded), RATE):
+        block = struct.unpack("<17Q", bytes(padded[start:start + RATE]))
+        for i in range(17):
+            lanes[i] ^= block[i]
+        keccak_f(lanes)
+    return struct.pack("<4Q", *lanes[:4])
+
+
+# published digests, checked by running this module
+TEST_VECTORS = [
+    ("", "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"),
+    ("abc", "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"),
+]
+
+
+if __name__ == '__main__':
+    for data, digest in TEST_VECTORS:
+        assert keccak256(data).encode("hex") == digest, "Keccak-256 of %r is wrong" % data
+    print "Keccak-256 matches the %d test vectors" % len(TEST_VECTORS)
@@ -0,0 +1,101 @@
+from z3 import *
+
+
+# The memory of a path, a map from addresses to words. The words at concrete
+# addresses are kept in a dict, which is all there is until a word is stored
+# at a symbolic address. Those stores are logged in order, and `since` tells
+# for a concrete address how many of them were made before its word was
+# stored; the ones made after may have overwritten it. A read at a symbolic
+# address selects from a z3 array of all the stores, built when it is first
+# needed and extended with the stores made after.
+class Memory(object):
+    __slots__ = ("words", "since", "writes", "array")
+
+    # the memory before the first store of the transaction
+    BASE = Array("mem", BitVecSort(256), BitVecSort(256))
+
+    def __init__(self, words=None, since=None, writes=None, array=None):
+        self.words = words if words is not None else {}
+        self.since = since if since is not None else {}
+        self.writes = writes if writes is not None else []
+        self.array = array
+
+    def copy(self):
+        return Memory(dict(self.words), dict(self.since), list(self.writes), self.array)
+
+    # number of words in the memory
+    def __len__(self):
+        return len(self.words) + len(self.writes)
+
+    def __str__(self):
+        return "%s %s" % (self.words, self.writes)
+
+    def __contains__(self, address):
+        return address in self.words
+
+    def store(self, address, value):
+        if isinstance(address, (int, long)):
+            self.words[address] = value
+            if self.writes:
+                self.since[address] = len(self.writes)
+        else:
+            self.writes.append((address, value))
+        if self.array is not None:
+            self.array = Store(self.array, address, value)
+
+    # The word at a concrete address and the symbolic stores made after it,
+    # or None and all the symbolic stores when no word was stored there
+    def load(self, address):
+        value = self.words.get(address)
+        return value, self.writes[self.since.get(address, 0):]
+
+    # Record the word found at a concrete address by a load, which is what
+    # was there before the memory was written when there was no word
+    def set_loaded(self, address, value, initial=False):
+        self.words[address] = value
+        if initial:
+            self.since.pop(address, None)
+            # the array was built without it
+            self.array = None
+        elif self.writes:
+            self.since[address] = len(self.writes)
+
+    # Give new values from fresh() to the words that a copy of `size` bytes to
+    # `address` may overwrite: those from the word before `address` up to the
+    # end of the copy, or of the memory when the size is not known, and all of
+    # them when the address is not. The ones stored at symbolic addresses may
+    # be anywhere. A word that was not stored needs none, it is as unknown as
+    # one that was copied.
+    def clobber(self, address, size, fresh):
+        concrete_size = isinstance(size, (int, long))
+        if concrete_size and size == 0:
+            return
+        if isinstance(address, (int, long)):
+            end = address + size if concrete_size else None
+            words = [word for word in self.words if word > address - 32 and (end is None or word < end)]
+        else:
+            words = list(self.words)
+        for word in words:
+            self.words[word] = fresh()
+            if self.writes:
+                self.since[word] = len(self.writes)
+        self.writes = [(write, fresh()) for write, _ in self.writes]
+        self.array = None
+
+    # The word at a symbolic address
+    def select(self, address):
+        if self.array is None:
+            array = self.BASE
+            # the words are stored in the order they were, those stored before
+            # the first symbolic store first
+            addresses = sorted(self.words, key=lambda word: self.since.get(word, 0))
+            position = 0
+            for word in addresses:
+                while position < self.since.get(word, 0):
+                    array = Store(array, *self.writes[position])
+                    position += 1
+                array = Store(array, word, self.words[word])
+            for write in self.writes[position:]:
+                array = Store(array, *write)
+            self.array = array
+        return Select(self.array, address)
@@ -143,6 +143,34 @@ Whigh = ("JUMPI")
 
 Wext = ("EXTCODESIZE")
 
+PUSH1 = 0x60
+PUSH32 = 0x7f
+DUP1 = 0x80
+SWAP1 = 0x90
+LOG0 = 0xa0
+
+# opcodes in the table above that the public EVM does not define; the
+# disassembler decodes their byte values as INVALID
+NON_EVM_OPCODES = ("MCOPY", "SLOADEXT", "SSTOREEXT", "SLOADBYTESEXT", "SSTOREBYTESEXT",
+                   "BREAKPOINT", "RNGSEED", "SSIZEEXT", "SLOADBYTES", "SSTOREBYTES",
+                   "SSIZE", "STATEROOT", "TXEXECGAS", "CALLSTATIC", "---END---")
+
+# opcode_names[value] is the mnemonic of the opcode byte value
+opcode_names = {}
+for name, info in opcodes.items():
+    if name not in NON_EVM_OPCODES:
+        opcode_names[info[0]] = name
+for i in range(32):
+    opcode_names[0x60 + i] = "PUSH" + str(i + 1)
+for i in range(16):
+    opcode_names[0x80 + i] = "DUP" + str(i + 1)
+    opcode_names[0x90 + i] = "SWAP" + str(i + 1)
+
+
+def get_opcode_name(value):
+    return opcode_names.get(value, "INVALID")
+
+
 def get_opcode(opcode):
     if opcode in opcodes:
         return opcodes[opcode]
@@ -6,6 +6,7 @@ import argparse
 import logging
 import requests
 import symExec
+from explorer import SEARCH_STRATEGIES
 import global_params
 
 
@@ -24,16 +25,6 @@ def has_dependencies_installed():
         logging.critical("Z3 is not available. Please install z3 from https://github.com/Z3Prover/z3.")
         return False
 
-    if not cmd_exists("evm"):
-        logging.critical("Please install evm from go-ethereum and make sure it is in the path.")
-        return False
-    else:
-        cmd = subprocess.Popen(["evm", "--version"], stdout=subprocess.PIPE)
-        cmd_out = cmd.communicate()[0].strip()
-        version = re.findall(r"evm version (\d*.\d*.\d*)", cmd_out)[0]
-        if version != '1.6.1':
-            logging.warning("You are using evm version %s. The supported version is 1.6.1" % version)
-
     if not cmd_exists("solc"):
         logging.critical("solc is missing. Please install the solidity compiler and make sure solc is in the path.")
         return False
@@ -69,21 +60,9 @@ def compileContracts(contract):
 
     return contracts
 
-def analyze(processed_evm_file, disasm_file):
-    disasm_out = ""
-    try:
-        disasm_p = subprocess.Popen(
-            ["evm", "disasm", processed_evm_file], stdout=subprocess.PIPE)
-        disasm_out = disasm_p.communicate()[0]
-    except:
-        logging.critical("Disassembly failed.")
-        exit()
-
-    with open(disasm_file, 'w') as of:
-        of.write(disasm_out)
-
+def analyze(contract_name, evm):
     # Run symExec
-    symExec.main(disasm_file)
+    symExec.main(contract_name, removeSwarmHash(evm))
 
 def main():
     # TODO: Implement -o switch.
@@ -94,6 +73,8 @@ def main():
                        help="local source file name. Solidity by default. Use -b to process evm instead. Use stdin to read from stdin.")
     group.add_argument("-ru", "--remoteURL", type=str,
                        help="Get contract from remote URL. Solidity by default. Use -b to process evm instead.", dest="remote_URL")
+    group.add_argument("--server", type=int, metavar="PORT",
+                       help="Serve analyses as JSON over HTTP on this port of localhost.")
 
     parser.add_argument(
         "-b", "--bytecode", help="read bytecode in source instead of solidity file.", action="store_true")
@@ -121,8 +102,20 @@ def main():
         "-st", "--state", help="Get input state from state.json", action="store_true")
     parser.add_argument("-ll", "--looplimit", help="Limit a number of loop",
                         action="store", dest="loop_limit", type=int)
+    parser.add_argument("-ss", "--search", help="Order in which paths are explored",
+                        choices=sorted(SEARCH_STRATEGIES), dest="search_strategy")
+    parser.add_argument("-qs", "--querycachesize", help="Number of solver query results cached in memory, 0 to disable",
+                        action="store", dest="query_cache_size", type=int)
+    parser.add_argument("-qd", "--querycachedir", help="Store solver query results in this directory to share them between runs",
+                        action="store", dest="query_cache_dir", type=str)
+    parser.add_argument("--jobs", help="Number of processes exploring the paths of a contract",
+                        action="store", dest="jobs", type=int)
+    parser.add_argument("--workers", help="Number of processes serving analyses in server mode",
+                        action="store", dest="workers", type=int)
     parser.add_argument(
         "-w", "--web", help="Run Oyente for web service", action="store_true")
+    parser.add_argument("--profile", help="Write the time spent by stage, detector, opcode and solver query to <contract>.profile.json",
+                        action="store_true")
 
     args = parser.parse_args()
 
@@ -140,6 +133,7 @@ def main():
     global_params.INPUT_STATE = 1 if args.state else 0
     global_params.WEB = 1 if args.web else 0
     global_params.STORE_RESULT = 1 if args.json else 0
+    global_params.PROFILE = 1 if args.profile else 0
 
     if args.depth_limit:
         global_params.DEPTH_LIMIT = args.depth_limit
@@ -147,10 +141,23 @@ def main():
         global_params.GAS_LIMIT = args.gas_limit
     if args.loop_limit:
         global_params.LOOP_LIMIT = args.loop_limit
+    if args.search_strategy:
+        global_params.SEARCH_STRATEGY = args.search_strategy
+    if args.jobs:
+        global_params.JOBS = args.jobs
+    if args.query_cache_size is not None:
+        global_params.QUERY_CACHE_SIZE = args.query_cache_size
+    if args.query_cache_dir:
+        global_params.QUERY_CACHE_DIR = args.query_cache_dir
 
     if not has_dependencies_installed():
         return
 
+    if args.server:
+        import server
+        server.serve(args.server, args.workers)
+        return
+
     if args.remote_URL:
         r = requests.get(args.remote_URL)
         code = r.text
@@ -160,18 +167,10 @@ def main():
             f.write(code)
 
     if args.bytecode:
-        processed_evm_file = args.source + '.1'
-        disasm_file = args.source + '.disasm'
         with open(args.source) as f:
             evm = f.read()
 
-        with open(processed_evm_file, 'w') as f:
-            f.write(removeSwarmHash(evm))
-
-        analyze(processed_evm_file, disasm_file)
-
-        os.remove(disasm_file)
-        os.remove(processed_evm_file)
+        analyze(args.source, evm)
 
         if global_params.UNIT_TEST == 2 or global_params.UNIT_TEST == 3:
             exit_code = os.WEXITSTATUS(cmd)
@@ -183,18 +182,12 @@ def main():
         for (cname, bin_str) in contracts:
             logging.info("Contract %s:", cname)
             processed_evm_file = cname + '.evm'
-            disasm_file = cname + '.evm.disasm'
-
-            with open(processed_evm_file, 'w') as of:
-                of.write(removeSwarmHash(bin_str))
 
-            analyze(processed_evm_file, disasm_file)
+            analyze(processed_evm_file, bin_str)
 
             if args.evm:
                 with open(processed_evm_file, 'w') as of:
                     of.write(bin_str)
 
-            os.remove(disasm_file)
-
 if __name__ == '__main__':
     main()
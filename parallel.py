@@ -0,0 +1,177 @@
+import Queue
+import logging
+import multiprocessing
+import pickle
+import time
+import traceback
+from z3 import *
+
+log = logging.getLogger(__name__)
+
+
+# Stands for the expression at `index` of the expressions that were packed
+# along with a structure
+class PackedExpr(object):
+    def __init__(self, index):
+        self.index = index
+
+
+# z3 expressions cannot be pickled. The expressions of a structure made of
+# lists, tuples and dicts are replaced by PackedExpr and written together as
+# one SMT-LIB string, in which the subexpressions they share appear once.
+def pack(value):
+    exprs = []
+    structure = replace_exprs(value, exprs)
+    return pickle.dumps((structure, exprs_to_smt2(exprs)), pickle.HIGHEST_PROTOCOL)
+
+
+def unpack(data):
+    structure, smt2 = pickle.loads(data)
+    return restore_exprs(structure, exprs_from_smt2(smt2))
+
+
+def replace_exprs(value, exprs):
+    if isinstance(value, ExprRef):
+        exprs.append(value)
+        return PackedExpr(len(exprs) - 1)
+    if isinstance(value, list):
+        return [replace_exprs(element, exprs) for element in value]
+    if isinstance(value, tuple):
+        return tuple(replace_exprs(element, exprs) for element in value)
+    if isinstance(value, dict):
+        return dict((key, replace_exprs(element, exprs)) for key, element in value.items())
+    return value
+
+
+def restore_exprs(value, exprs):
+    if isinstance(value, PackedExpr):
+        return exprs[value.index]
+    if isinstance(value, list):
+        return [restore_exprs(element, exprs) for element in value]
+    if isinstance(value, tuple):
+        return tuple(restore_exprs(element, exprs) for element in value)
+    if isinstance(value, dict):
+        return dict((key, restore_exprs(element, exprs)) for key, element in value.items())
+    return value
+
+
+# Each expression is asserted equal to a constant named after its index, the
+# solver then prints the declarations and the assertions
+def exprs_to_smt2(exprs):
+    if not exprs:
+        return ""
+    solver = Solver()
+    for i, expr in enumerate(exprs):
+        solver.add(Const("packed_expr_" + str(i), expr.sort()) == expr)
+    return solver.sexpr()
+
+
+def exprs_from_smt2(smt2):
+    if not smt2:
+        return []
+    parsed = parse_smt2_string(smt2)
+    equalities = parsed.children() if is_and(parsed) else [parsed]
+    exprs = [None] * len(equalities)
+    for equality in equalities:
+        index = int(equality.arg(0).decl().name()[len("packed_expr_"):])
+        exprs[index] = equality.arg(1)
+    return exprs
+
+
+# Items of work shared by the `jobs` workers of run_workers, which take them
+# as they run out of work and may put more while they work. get() returns
+# None once every worker waits for an item and none is left.
+class WorkQueue(object):
+    # seconds between two looks at whether the work is over
+    POLL = 0.01
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.queue = multiprocessing.Queue()
+        self.lock = multiprocessing.Lock()
+        # the workers that wait for an item and the items not taken yet
+        self.idle = multiprocessing.Value("i", 0, lock=False)
+        self.pending = multiprocessing.Value("i", 0, lock=False)
+        # whether the worker of this process counts among the idle ones
+        self.waiting = False
+
+    def put(self, item):
+        with self.lock:
+            self.pending.value += 1
+        self.queue.put(item)
+
+    # Wait for an item, calling check() between two looks at the queue
+    def get(self, check=None):
+        self.stop()
+        while True:
+            with self.lock:
+                if self.idle.value == self.jobs and self.pending.value == 0:
+                    return None
+            if check is not None:
+                check()
+            try:
+                item = self.queue.get(timeout=self.POLL)
+            except Queue.Empty:
+                continue
+            with self.lock:
+                self.pending.value -= 1
+                self.idle.value -= 1
+            self.waiting = False
+            return item
+
+    # whether more workers wait than there are items for them, read without
+    # the lock as a hint
+    def wanted(self):
+        return self.idle.value > self.pending.value
+
+    # called by a worker that takes no more items
+    def stop(self):
+        if not self.waiting:
+            with self.lock:
+                self.idle.value += 1
+            self.waiting = True
+
+    # the number of items that no worker took
+    def left(self):
+        return self.pending.value
+
+
+# Run work(index) for every index below `jobs`, each in a forked process
+# which starts from a copy of the memory of this one, z3 context included.
+# Returns the values returned by the workers in the order of their indexes,
+# None for a worker that failed or did not answer within `timeout` seconds.
+def run_workers(jobs, work, timeout=None):
+    workers = []
+    for index in range(jobs):
+        receiver, sender = multiprocessing.Pipe(False)
+        process = multiprocessing.Process(target=run_worker, args=(work, index, sender))
+        process.start()
+        sender.close()
+        workers.append((process, receiver))
+
+    deadline = time.time() + timeout if timeout is not None else None
+    values = []
+    for index, (process, receiver) in enumerate(workers):
+        value = None
+        try:
+            if receiver.poll(max(0, deadline - time.time()) if deadline is not None else None):
+                value = unpack(receiver.recv())
+            else:
+                log.error("Worker %d did not finish in time", index)
+                process.terminate()
+        except EOFError:
+            log.error("Worker %d exited without a result", index)
+        receiver.close()
+        process.join()
+        values.append(value)
+    return values
+
+
+def run_worker(work, index, sender):
+    try:
+        data = pack(work(index))
+    except Exception:
+        traceback.print_exc()
+        data = pack(None)
+    sender.send(data)
+    sender.close()
@@ -0,0 +1,99 @@
+# A link of the chain of elements of a PersistentList. Cells are objects
+# rather than nested tuples: when Python 2 frees a long chain of tuples
+# holding z3 expressions, it can finalize the expressions twice.
+class Cell(object):
+    __slots__ = ("prev", "element")
+
+    def __init__(self, prev, element):
+        self.prev = prev
+        self.element = element
+
+
+# Append-only list whose copies share the elements they have in common.
+# The elements are kept in a chain of immutable cells, so copying a list
+# only copies a reference to its last cell and appending to a copy does not
+# change the list it was copied from.
+class PersistentList(object):
+    __slots__ = ("tail", "size")
+
+    def __init__(self, elements=()):
+        self.tail = None
+        self.size = 0
+        for element in elements:
+            self.append(element)
+
+    def append(self, element):
+        self.tail = Cell(self.tail, element)
+        self.size += 1
+
+    def copy(self):
+        copied = PersistentList()
+        copied.tail = self.tail
+        copied.size = self.size
+        return copied
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, PersistentList):
+            return self.size == other.size and (self.tail is other.tail or self.to_list() == other.to_list())
+        return self.to_list() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return str(self.to_list())
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def to_list(self):
+        elements = [None] * self.size
+        cell = self.tail
+        for i in xrange(self.size - 1, -1, -1):
+            elements[i] = cell.element
+            cell = cell.prev
+        return elements
+
+
+# The path condition of one path together with the symbolic variables created
+# so far, indexed by name. A variable always maps to BitVec(name, 256), so the
+# variables are shared by all the paths and only the path condition is copied.
+# `model` is the last model found for this path; it satisfies the first
+# `model_size` constraints of the path condition. `taint` is the set of the
+# labels of the constraints of the path condition, see TaintTracker.labels.
+class PathConditionsAndVars(object):
+    __slots__ = ("path_condition", "variables", "model", "model_size", "taint")
+
+    def __init__(self, path_condition=None, variables=None, model=None, model_size=0, taint=frozenset()):
+        self.path_condition = path_condition if path_condition is not None else PersistentList()
+        self.variables = variables if variables is not None else {}
+        self.model = model
+        self.model_size = model_size
+        self.taint = taint
+
+    def __getitem__(self, key):
+        if key == "path_condition":
+            return self.path_condition
+        return self.variables[key]
+
+    def __setitem__(self, key, value):
+        if key == "path_condition":
+            self.path_condition = value
+        else:
+            self.variables[key] = value
+
+    def __contains__(self, key):
+        return key == "path_condition" or key in self.variables
+
+    def copy(self):
+        return PathConditionsAndVars(self.path_condition.copy(), self.variables,
+                                     self.model, self.model_size, self.taint)
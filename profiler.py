@@ -0,0 +1,143 @@
+import json
+import time
+
+from z3 import sat, unsat
+
+
+# Where the time of an analysis goes, kept when PROFILE is set. The time and
+# the number of runs are recorded by section: the stages of the analysis,
+# the detectors and the opcodes executed. The solver queries are recorded by
+# the site that made them, with their outcomes and the number of constraints
+# they were about, and the blocks executed are counted.
+class Profile(object):
+    CATEGORIES = ("stages", "detectors", "opcodes")
+
+    def __init__(self):
+        # category -> name -> [count, seconds]
+        self.sections = dict((category, {}) for category in self.CATEGORIES)
+        # site -> [count, seconds, sat, unsat, unknown, constraints, max constraints]
+        self.queries = {}
+        # the site of the queries made now, set by the analysis as it goes
+        self.site = "other"
+        self.blocks = 0
+        self.start = time.time()
+
+    def add(self, category, name, seconds, count=1):
+        section = self.sections[category].get(name)
+        if section is None:
+            section = self.sections[category][name] = [0, 0.0]
+        section[0] += count
+        section[1] += seconds
+
+    def timed(self, category, name):
+        return Timer(self, category, name)
+
+    def add_query(self, site, result, seconds, size):
+        query = self.queries.get(site)
+        if query is None:
+            query = self.queries[site] = [0, 0.0, 0, 0, 0, 0, 0]
+        query[0] += 1
+        query[1] += seconds
+        if result == sat:
+            query[2] += 1
+        elif result == unsat:
+            query[3] += 1
+        else:
+            query[4] += 1
+        query[5] += size
+        query[6] = max(query[6], size)
+
+    def to_json(self):
+        profile = {"total_time": time.time() - self.start, "blocks": self.blocks}
+        for category in self.CATEGORIES:
+            profile[category] = dict((name, {"count": count, "time": seconds})
+                                     for name, (count, seconds) in self.sections[category].items())
+        profile["solver"] = dict((site, {"count": query[0], "time": query[1], "sat": query[2], "unsat": query[3],
+                                         "unknown": query[4], "constraints": query[5],
+                                         "max_constraints": query[6]})
+                                 for site, query in self.queries.items())
+        return profile
+
+    # Add the opcodes and queries of a profile returned by to_json, those of a
+    # worker process of the analysis
+    def merge(self, profile):
+        self.blocks += profile["blocks"]
+        for category in ("detectors", "opcodes"):
+            for name, section in profile[category].items():
+                self.add(category, name, section["time"], section["count"])
+        for site, other in profile["solver"].items():
+            query = self.queries.get(site)
+            if query is None:
+                query = self.queries[site] = [0, 0.0, 0, 0, 0, 0, 0]
+            for i, key in enumerate(("count", "time", "sat", "unsat", "unknown", "constraints")):
+                query[i] += other[key]
+            query[6] = max(query[6], other["max_constraints"])
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=1, sort_keys=True)
+
+
+class Timer(object):
+    def __init__(self, profile, category, name):
+        self.profile = profile
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc_info):
+        self.profile.add(self.category, self.name, time.time() - self.start)
+
+
+class NullTimer(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+null_timer = NullTimer()
+
+
+# Time a section of `profile`, or nothing when there is no profile
+def timed(profile, category, name):
+    if profile is None:
+        return null_timer
+    return profile.timed(category, name)
+
+
+# A solver whose queries are recorded in a profile, under `site` or else the
+# site of the profile when the query is made
+class ProfiledSolver(object):
+    def __init__(self, solver, profile, site=None):
+        self.solver = solver
+        self.profile = profile
+        self.site = site
+        self.scopes = []
+        self.size = 0
+
+    def push(self):
+        self.solver.push()
+        self.scopes.append(self.size)
+
+    def pop(self, num=1):
+        self.solver.pop(num)
+        self.size = self.scopes[-num]
+        del self.scopes[-num:]
+
+    def add(self, *constraints):
+        self.solver.add(*constraints)
+        for constraint in constraints:
+            self.size += len(constraint) if isinstance(constraint, (list, tuple)) else 1
+
+    def check(self):
+        start = time.time()
+        result = self.solver.check()
+        self.profile.add_query(self.site or self.profile.site, result, time.time() - start, self.size)
+        return result
+
+    def model(self):
+        return self.solver.model()
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from z3 import *
+
+import global_params
+from deadline import DeadlineSolver
+from profiler import ProfiledSolver
+
+log = logging.getLogger(__name__)
+
+
+# Results of satisfiability queries, indexed by the set of constraints that
+# were asserted. The most recently used entries are kept in memory. When a
+# directory is given, sat and unsat results are also stored there, one file
+# per query, so that they are shared by all the processes of a batch run.
+# Unknown results depend on the solver timeout and are never cached.
+class QueryCache(object):
+    def __init__(self, size, directory=None):
+        self.size = size
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.digests = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    # `key` is the frozenset of the ids of the constraints. Returns the
+    # cached entry, a list [result, model, constraints], or None.
+    def get(self, key, constraints):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.entries[key] = entry
+            self.hits += 1
+            return entry
+        if self.directory:
+            result = self.load(constraints)
+            if result is not None:
+                self.disk_hits += 1
+                return self.put(key, result, constraints, False)
+        self.misses += 1
+        return None
+
+    def put(self, key, result, constraints, store=True):
+        # the entry holds on to the constraints, so that their ids are not
+        # given to other expressions while the key is in use
+        entry = [result, None, constraints]
+        if self.size > 0:
+            self.entries[key] = entry
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        if store and self.directory:
+            self.store(constraints, result)
+        return entry
+
+    # a digest of the constraint set that does not depend on the process
+    def digest(self, constraints):
+        if len(self.digests) > 100000:
+            self.digests.clear()
+        digests = set()
+        for constraint in constraints:
+            pair = self.digests.get(constraint.get_id())
+            if pair is None:
+                pair = (constraint, hashlib.sha1(constraint.sexpr()).hexdigest())
+                self.digests[constraint.get_id()] = pair
+            digests.add(pair[1])
+        return hashlib.sha1("\n".join(sorted(digests))).hexdigest()
+
+    def load(self, constraints):
+        try:
+            with open(os.path.join(self.directory, self.digest(constraints))) as f:
+                value = f.read()
+        except IOError:
+            return None
+        if value == "sat":
+            return sat
+        if value == "unsat":
+            return unsat
+        return None
+
+    def store(self, constraints, result):
+        path = os.path.join(self.directory, self.digest(constraints))
+        try:
+            # write to a temporary file first, so that readers never see a
+            # partial result
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "w") as f:
+                f.write(str(result))
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            log.debug("Could not store query result: %s", e)
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "entries": len(self.entries)}
+
+
+# A z3 solver that looks up every check in a QueryCache before solving. It
+# keeps track of the asserted constraints and their scopes itself, so only
+# push, pop, add, check and model may be used on it.
+class CachedSolver(object):
+    def __init__(self, cache, timeout=None):
+        self.cache = cache
+        self.solver = Solver()
+        if timeout is not None:
+            self.solver.set("timeout", timeout)
+        self.constraints = []
+        self.ids = []
+        self.scopes = []
+        self.entry = None
+        self.solved = False
+
+    def push(self):
+        self.solver.push()
+        self.scopes.append(len(self.constraints))
+
+    def pop(self, num=1):
+        self.solver.pop(num)
+        size = self.scopes[-num]
+        del self.scopes[-num:]
+        del self.constraints[size:]
+        del self.ids[size:]
+
+    def add(self, *constraints):
+        for constraint in constraints:
+            if isinstance(constraint, (list, tuple)):
+                self.add(*constraint)
+                continue
+            if not is_expr(constraint):
+                constraint = BoolVal(constraint)
+            self.solver.add(constraint)
+            self.constraints.append(constraint)
+            self.ids.append(constraint.get_id())
+
+    def check(self):
+        key = frozenset(self.ids)
+        self.solved = False
+        self.entry = self.cache.get(key, self.constraints)
+        if self.entry is not None:
+            return self.entry[0]
+        result = self.solver.check()
+        self.solved = True
+        if result == sat or result == unsat:
+            self.entry = self.cache.put(key, result, list(self.constraints))
+        return result
+
+    def set(self, *args, **keys):
+        self.solver.set(*args, **keys)
+
+    # A model of the constraints after a sat check. A result that was read
+    # from the disk comes without a model, None is returned then.
+    def model(self):
+        if self.solved:
+            model = self.solver.model()
+            if self.entry is not None:
+                self.entry[1] = model
+            return model
+        return self.entry[1]
+
+
+shared_cache = None
+
+
+# The cache shared by all the solvers of this process, sized by
+# QUERY_CACHE_SIZE and stored in QUERY_CACHE_DIR if it is set
+def get_shared_cache():
+    global shared_cache
+    if shared_cache is None:
+        shared_cache = QueryCache(global_params.QUERY_CACHE_SIZE, global_params.QUERY_CACHE_DIR or None)
+    return shared_cache
+
+
+# Forget the results cached in memory, the next solver starts with an empty
+# cache
+def clear_shared_cache():
+    global shared_cache
+    shared_cache = None
+
+
+def cache_enabled():
+    return global_params.QUERY_CACHE_SIZE > 0 or bool(global_params.QUERY_CACHE_DIR)
+
+
+# A solver in front of the shared cache, or a plain z3 solver when the cache
+# is disabled. Its queries end at `deadline` when one is given, and are
+# recorded in `profile` under `site` when a profile is given.
+def make_solver(timeout=None, deadline=None, profile=None, site=None):
+    if cache_enabled():
+        solver = CachedSolver(get_shared_cache(), timeout)
+    else:
+        solver = Solver()
+        if timeout is not None:
+            solver.set("timeout", timeout)
+    if deadline is not None:
+        solver = DeadlineSolver(solver, deadline, timeout)
+    if profile is not None:
+        solver = ProfiledSolver(solver, profile, site)
+    return solver
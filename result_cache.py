@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import global_params
+from oyente import removeSwarmHash
+
+log = logging.getLogger(__name__)
+
+# the parameters that change the results of an analysis
+RESULT_PARAMETERS = ("LOOP_LIMIT", "DEPTH_LIMIT", "GAS_LIMIT", "TIMEOUT", "GLOBAL_TIMEOUT",
+                     "DETECTION_SHARE", "INPUT_STATE", "USE_GLOBAL_BLOCKCHAIN", "DATA_FLOW", "CHECK_CONCURRENCY_FP",
+                     "SEARCH_STRATEGY")
+
+
+# Results of analyses, stored in a directory with one JSON file per runtime
+# bytecode and analysis parameters. Contracts that are deployed many times
+# with the same code are analyzed once.
+class ResultCache(object):
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.directory, key + ".json")) as f:
+                result = json.load(f)
+        except (IOError, ValueError):
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        try:
+            # write to a temporary file first, so that readers never see a
+            # partial result
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump(result, f)
+            os.rename(tmp_path, os.path.join(self.directory, key + ".json"))
+        except (IOError, OSError) as e:
+            log.debug("Could not store result: %s", e)
+
+
+# The key of the results of the analysis of `evm` with the current
+# parameters. The swarm hash of the metadata is left out, it differs between
+# contracts compiled from the same code.
+def result_key(evm):
+    parameters = dict((name, getattr(global_params, name)) for name in RESULT_PARAMETERS)
+    if global_params.INPUT_STATE:
+        with open('state.json') as f:
+            parameters["state"] = f.read()
+    key = hashlib.sha256(removeSwarmHash(evm.strip()))
+    key.update(json.dumps(parameters, sort_keys=True))
+    return key.hexdigest()
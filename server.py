@@ -0,0 +1,143 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import traceback
+import urllib2
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+import global_params
+import oyente
+import symExec
+
+log = logging.getLogger(__name__)
+
+# request fields and the parameters they set, timeout is in ms like -t
+REQUEST_PARAMETERS = {
+    "timeout": "TIMEOUT",
+    "globaltimeout": "GLOBAL_TIMEOUT",
+    "depthlimit": "DEPTH_LIMIT",
+    "gaslimit": "GAS_LIMIT",
+    "looplimit": "LOOP_LIMIT",
+    "profile": "PROFILE",
+}
+
+
+# Each worker of the pool compiles in a directory of its own
+def init_worker(directory):
+    os.chdir(tempfile.mkdtemp(dir=directory))
+
+
+# Analyze the contracts of a request in a worker. The request has the source
+# of a Solidity file, or the runtime bytecode if "bytecode" is true, and may
+# change the parameters in REQUEST_PARAMETERS. Returns the results of every
+# contract by name.
+def analyze_request(request):
+    # the parameters the server was started with, changed by the request
+    params = symExec.Params(**dict((parameter, int(request[field]))
+                                   for field, parameter in REQUEST_PARAMETERS.items() if field in request))
+
+    if request.get("bytecode"):
+        contracts = [("contract", request["source"])]
+    else:
+        with open("contract.sol", "w") as f:
+            f.write(request["source"])
+        try:
+            contracts = oyente.compileContracts("contract.sol")
+        except SystemExit:
+            return {"error": "Solidity compilation failed"}
+
+    response = {"contracts": {}}
+    for name, evm in contracts:
+        result = {}
+        analyzer = symExec.Analyzer(oyente.removeSwarmHash(evm), params)
+        try:
+            analyzer.run()
+        except Exception as e:
+            # the results found until the analysis failed are still returned
+            result["error"] = str(e)
+            traceback.print_exc()
+        result.update(analyzer.results)
+        if analyzer.profile:
+            result["profile"] = analyzer.profile.to_json()
+        response["contracts"][name] = result
+    return response
+
+
+class AnalysisServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pool):
+        HTTPServer.__init__(self, address, AnalysisRequestHandler)
+        self.pool = pool
+
+
+# POST a JSON request to any path, the response is the JSON of the results
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        try:
+            length = int(self.headers.getheader("content-length", 0))
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            return self.send_json(400, {"error": "The request is not valid JSON"})
+        if not isinstance(request, dict) or not isinstance(request.get("source"), basestring):
+            return self.send_json(400, {"error": "The request has no source"})
+        for field in REQUEST_PARAMETERS:
+            try:
+                if field in request:
+                    int(request[field])
+            except (TypeError, ValueError):
+                return self.send_json(400, {"error": "The request field %s is not a number" % field})
+
+        # a worker is given up on if it is still busy long after the global
+        # timeout of the symbolic execution
+        global_timeout = int(request.get("globaltimeout", global_params.GLOBAL_TIMEOUT))
+        try:
+            response = self.server.pool.apply_async(analyze_request, (request,)).get(2 * global_timeout + 60)
+        except multiprocessing.TimeoutError:
+            return self.send_json(504, {"error": "The analysis did not finish in time"})
+        except Exception as e:
+            return self.send_json(500, {"error": str(e)})
+        self.send_json(400 if "error" in response else 200, response)
+
+    def send_json(self, status, value):
+        body = json.dumps(value)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.info("%s - " + format, self.address_string(), *args)
+
+
+# Serve analyses on `port` of localhost with a pool of `workers` processes,
+# which have imported z3 and the analysis already and are replaced after
+# `recycle` requests
+def serve(port, workers=None, recycle=100):
+    directory = tempfile.mkdtemp(prefix="oyente_server_")
+    pool = multiprocessing.Pool(workers, init_worker, (directory,), maxtasksperchild=recycle)
+    server = AnalysisServer(("127.0.0.1", port), pool)
+    log.info("Serving analyses on http://127.0.0.1:%d/", port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.terminate()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# Client of a server started by serve(), returns the response as a dict
+def request_analysis(port, source, bytecode=False, **parameters):
+    request = dict(parameters, source=source, bytecode=bytecode)
+    try:
+        response = urllib2.urlopen("http://127.0.0.1:%d/" % port, json.dumps(request))
+    except urllib2.HTTPError as e:
+        response = e
+    return json.loads(response.read())
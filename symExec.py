@@ -1,20 +1,31 @@
-import tokenize
-from tokenize import NUMBER, NAME, NEWLINE
+import bisect
 import math
 import sys
-import atexit
+import re
+import binascii
 import pickle
 import json
 import traceback
-import signal
+import threading
 import time
 import logging
 from collections import namedtuple
+from StringIO import StringIO
 from z3 import *
 
 from vargenerator import *
 from ethereum_data import *
 from basicblock import BasicBlock
+from explorer import Explorer, State, Share, trail_steps
+from persistent import PersistentList, PathConditionsAndVars
+from memory import Memory
+from keccak import keccak256
+from disassembler import disassemble
+from query_cache import make_solver, get_shared_cache, cache_enabled
+from deadline import Deadline, Timeout
+from profiler import Profile, timed
+from parallel import WorkQueue, run_workers
+from opcodes import PUSH1, DUP1, SWAP1, LOG0
 from analysis import *
 from arithmetic_utils import *
 import global_params
@@ -26,72 +37,19 @@ log = logging.getLogger(__name__)
 
 UNSIGNED_BOUND_NUMBER = 2**256 - 1
 CONSTANT_ONES_159 = BitVecVal((1 << 160) - 1, 256)
+# how far above a hash the storage addresses computed from it are
+HASHED_SLOT_RANGE = 2 ** 64
+# the blocks a parallel worker executes between two looks at whether another
+# one ran out of paths
+STEAL_INTERVAL = 16
 
+Edge = namedtuple("Edge", ["v1", "v2"]) # Factory Function for tuples is used as dictionary key
 
-def initGlobalVars():
-    global solver
-    # Z3 solver
-    solver = Solver()
-    solver.set("timeout", global_params.TIMEOUT)
+# z3 expressions of all the analyzers live in the same context, which must not
+# be used by two threads at once. Analyzers run in threads therefore run one
+# after the other, analyses run side by side only in separate processes.
+z3_lock = threading.RLock()
 
-    global results
-    results = {}
-
-    # capturing the last statement of each basic block
-    global end_ins_dict
-    end_ins_dict = {}
-
-    # capturing all the instructions, keys are corresponding addresses
-    global instructions
-    instructions = {}
-
-    # capturing the "jump type" of each basic block
-    global jump_type
-    jump_type = {}
-
-    global vertices
-    vertices = {}
-
-    global edges
-    edges = {}
-
-    global visited_edges
-    visited_edges = {}
-
-    global money_flow_all_paths
-    money_flow_all_paths = []
-
-    global reentrancy_all_paths
-    reentrancy_all_paths = []
-
-    global data_flow_all_paths
-    data_flow_all_paths = [[], []] # store all storage addresses
-
-    # store the path condition corresponding to each path in money_flow_all_paths
-    global path_conditions
-    path_conditions = []
-
-    # store global variables, e.g. storage, balance of all paths
-    global all_gs
-    all_gs = []
-
-    global total_no_of_paths
-    total_no_of_paths = 0
-
-    # to generate names for symbolic variables
-    global gen
-    gen = Generator()
-
-    global data_source
-    if global_params.USE_GLOBAL_BLOCKCHAIN:
-        data_source = EthereumData()
-
-    global log_file
-    log_file = open(c_name + '.log', "w")
-
-    global rfile
-    if global_params.REPORT_MODE:
-        rfile = open(c_name + '.report', 'w')
 
 def check_unit_test_file():
     if global_params.UNIT_TEST == 1:
@@ -107,1781 +65,2418 @@ def isSymbolic(value):
 def isReal(value):
     return isinstance(value, (int, long))
 
-def isTesting():
-    return global_params.UNIT_TEST != 0
-
 # A simple function to compare the end stack with the expected stack
 # configurations specified in a test file
 def compare_stack_unit_test(stack):
     try:
         size = int(result_file.readline())
         content = result_file.readline().strip('\n')
-        if size == len(stack) and str(stack) == content:
+        # the expected content lists the top of the stack first
+        if size == len(stack) and str(stack[::-1]) == content:
             log.debug("PASSED UNIT-TEST")
         else:
             log.warning("FAILED UNIT-TEST")
             log.warning("Expected size %d, Resulted size %d", size, len(stack))
-            log.warning("Expected content %s \nResulted content %s", content, str(stack))
+            log.warning("Expected content %s \nResulted content %s", content, str(stack[::-1]))
     except Exception as e:
         log.warning("FAILED UNIT-TEST")
         log.warning(e.message)
 
-def compare_storage_and_memory_unit_test(global_state, mem, analysis):
-    unit_test = pickle.load(open("current_test.pickle", "rb"))
-    test_status = unit_test.compare_with_symExec_result(global_state, mem, analysis)
+# Compare the final state with the EVM test `unit_test`, read from
+# current_test.pickle when it is not given, and exit with the verdict
+def compare_storage_and_memory_unit_test(global_state, mem, analysis, unit_test=None, mode=None):
+    if unit_test is None:
+        unit_test = pickle.load(open("current_test.pickle", "rb"))
+    test_status = unit_test.compare_with_symExec_result(global_state, mem, analysis, mode)
     exit(test_status)
 
-def handler(signum, frame):
-    if global_params.UNIT_TEST == 2 or global_params.UNIT_TEST == 3:
-        exit(TIME_OUT)
-    raise Exception("timeout")
-
-def main(contract):
-    global c_name
-    c_name = contract
-
-    check_unit_test_file()
-    initGlobalVars()
-    set_cur_file(c_name[4:] if len(c_name) > 5 else c_name)
-    start = time.time()
-    signal.signal(signal.SIGALRM, handler)
-    signal.alarm(global_params.GLOBAL_TIMEOUT)
-    atexit.register(closing_message)
-    if global_params.WEB:
-        atexit.register(results_for_web)
 
-    log.info("Running, please wait...")
-
-    global results
-
-    if not isTesting():
-        log.info("\t============ Results ===========")
+# The two states forked at a conditional jump share the stack, memory, global
+# state and analysis of their parent until they are executed. The first one
+# to run copies them, the other one takes them over.
+def unshare(state):
+    share = state.share
+    if share is None:
+        return
+    state.share = None
+    share.count -= 1
+    if share.count:
+        state.stack = list(state.stack)
+        state.mem = state.mem.copy()
+        state.global_state = my_copy_dict(state.global_state)
+        state.analysis = my_copy_dict(state.analysis)
+
+
+# A state with containers of its own that starts where `state` does, so that
+# its path can be explored while `state` is left as it is
+def copy_state(state):
+    state.group.pending += 1
+    copy = State(state.block, state.pre_block, state.depth, state.visited.copy(), list(state.stack),
+                 state.mem.copy(), my_copy_dict(state.global_state), state.path_conditions_and_vars.copy(),
+                 my_copy_dict(state.analysis), state.group)
+    copy.trail = state.trail
+    return copy
+
+# The model stored for a path, if it also satisfies the constraints that were
+# added to the path condition after it was found
+def get_path_model(path_conditions_and_vars):
+    model = path_conditions_and_vars.model
+    if model is None:
+        return None
+    path_condition = path_conditions_and_vars["path_condition"]
+    cell = path_condition.tail
+    for _ in xrange(path_condition.size - path_conditions_and_vars.model_size):
+        constraint = cell.element
+        if is_expr(constraint):
+            if not is_true(model.eval(constraint, model_completion=True)):
+                return None
+        elif not constraint:
+            return None
+        cell = cell.prev
+    path_conditions_and_vars.model_size = path_condition.size
+    return model
+
+def set_path_model(path_conditions_and_vars, model):
+    path_conditions_and_vars.model = model
+    path_conditions_and_vars.model_size = len(path_conditions_and_vars["path_condition"])
 
-    log.debug("Checking for Callstack attack...")
-    run_callstack_attack()
+def check_callstack_attack(disasm):
+    problematic_instructions = ['CALL', 'CALLCODE']
+    for i in xrange(0, len(disasm)):
+        instruction = disasm[i].name
+        if instruction in problematic_instructions:
+            error = True
+            for j in xrange(i+1, len(disasm)):
+                if disasm[j].name in problematic_instructions:
+                    break
+                if disasm[j].name == 'ISZERO':
+                    error = False
+                    break
+            if error:
+                return True
+    return False
 
-    try:
-        build_cfg_and_analyze()
-        log.debug("Done Symbolic execution")
-    except Exception as e:
-        if global_params.UNIT_TEST == 2 or global_params.UNIT_TEST == 3:
-            log.exception(e)
-            exit(EXCEPTION)
-        traceback.print_exc()
-        raise e
-    signal.alarm(0)
-
-    if global_params.REPORT_MODE:
-        rfile.write(str(total_no_of_paths) + "\n")
-    detect_money_concurrency()
-    detect_time_dependency()
-    stop = time.time()
-    if global_params.REPORT_MODE:
-        rfile.write(str(stop-start))
-        rfile.close()
-    if global_params.DATA_FLOW:
-        detect_data_concurrency()
-        detect_data_money_concurrency()
-    log.debug("Results for Reentrancy Bug: " + str(reentrancy_all_paths))
-    reentrancy_bug_found = any([v for sublist in reentrancy_all_paths for v in sublist])
-    if not isTesting():
-        log.info("\t  Reentrancy bug exists: %s", str(reentrancy_bug_found))
-    results['reentrancy'] = reentrancy_bug_found
-
-
-
-
-def results_for_web():
-    global results
-    if not results.has_key("callstack"):
-        results["callstack"] = False
-    if not results.has_key("time_dependency"):
-        results["time_dependency"] = False
-    if not results.has_key("reentrancy"):
-        results["reentrancy"] = False
-    if not results.has_key("concurrency"):
-        results["concurrency"] = False
+def print_state(stack, mem, global_state):
+    log.debug("STACK: " + str(stack[::-1]))
+    log.debug("MEM: " + str(mem))
+    log.debug("GLOBAL STATE: " + str(global_state))
 
-    print "Callstack Attack:", results['callstack']
-    print "Time Dependency:", results['time_dependency']
-    print "Reentrancy bug:", results['reentrancy']
-    print "Concurrency:", results['concurrency']
+def contains_only_concrete_values(stack):
+    for element in stack:
+        if isSymbolic(element):
+            return False
+    return True
 
+def to_symbolic(number):
+    if isReal(number):
+        return BitVecVal(number, 256)
+    return number
 
-def closing_message():
-    log.info("\t====== Analysis Completed ======")
-    if global_params.STORE_RESULT:
-        result_file = c_name + '.json'
-        with open(result_file, 'w') as of:
-            of.write(json.dumps(results, indent=1))
-        log.info("Wrote results to %s.", result_file)
+# The number of words of the memory in use after an access to the words
+# before `temp`, the number in use before is symbolic after a store at a
+# symbolic address
+def expand_memory(current_miu_i, temp):
+    if isReal(current_miu_i):
+        return max(current_miu_i, temp)
+    return If(current_miu_i < temp, temp, current_miu_i)
+
+# The word `word` with its byte `index`, counted from the most significant
+# one, replaced by `byte`
+def store_byte(word, index, byte):
+    if is_bv_value(word):
+        word = word.as_long()
+    shift = 8 * (31 - index)
+    return (word & (UNSIGNED_BOUND_NUMBER - (0xff << shift))) | (byte << shift)
+
+
+# The parameters of an analysis, named as in global_params. They have the
+# values of global_params at the time the object is made, except for those
+# that are given.
+class Params(object):
+    def __init__(self, **parameters):
+        for name in dir(global_params):
+            if name.isupper():
+                setattr(self, name, getattr(global_params, name))
+        for name, value in parameters.items():
+            if not hasattr(global_params, name):
+                raise AttributeError("Unknown parameter: " + name)
+            setattr(self, name, value)
+
+
+# The runtime bytecode as hex, from hex with or without 0x or from raw bytes
+def bytecode_to_hex(bytecode):
+    code = bytecode.strip()
+    if code[:2] in ("0x", "0X"):
+        code = code[2:]
+    if isinstance(bytecode, bytearray) or not re.match("^[0-9a-fA-F]*$", code):
+        return binascii.hexlify(bytecode)
+    return code
+
+
+# The symbolic execution of a contract and the bug detectors run on its paths.
+# An analyzer holds all the state of one analysis, so that any number of them
+# can be used in a process, and creates no file: the exceptions raised on
+# paths are written to `log_file` and the report of REPORT_MODE to
+# `report_file`, when they are given. Under UNIT_TEST 2 and 3, the final state
+# is compared with the EvmUnitTest `unit_test`.
+class Analyzer(object):
+    def __init__(self, bytecode, params=None, log_file=None, report_file=None, unit_test=None):
+        self.params = params if params is not None else Params()
+        self.unit_test = unit_test
+
+        # where the time of the analysis goes, recorded when PROFILE is set
+        self.profile = Profile() if self.params.PROFILE else None
+
+        self.evm = bytecode_to_hex(bytecode)
+        with timed(self.profile, "stages", "disasm"):
+            self.disasm = disassemble(self.evm)
+        self.log_file = log_file if log_file is not None else StringIO()
+        self.report_file = report_file
+
+        # the time of the analysis counts from run()
+        self.deadline = Deadline(self.params.GLOBAL_TIMEOUT)
+
+        # Z3 solver
+        self.solver = make_solver(self.params.TIMEOUT, self.deadline, self.profile)
+
+        self.results = {}
+
+        # capturing the last statement of each basic block
+        self.end_ins_dict = {}
+
+        # capturing all the instructions, keys are corresponding addresses
+        self.instructions = {}
+
+        # capturing the "jump type" of each basic block
+        self.jump_type = {}
+
+        self.vertices = {}
+        self.edges = {}
+        self.visited_edges = {}
+        # set while a worker of parallel_sym_exec finds again a path another
+        # one gave away
+        self.replaying = False
+        self.money_flow_all_paths = []
+        self.reentrancy_all_paths = []
+        self.data_flow_all_paths = [[], []] # store all storage addresses
+
+        # store the path condition corresponding to each path in money_flow_all_paths,
+        # or None when neither the false positives nor the paths are looked at
+        self.path_conditions = []
+        self.keep_path_conditions = self.params.CHECK_CONCURRENCY_FP or self.params.PRINT_PATHS
+
+        # store the taint of each path in money_flow_all_paths
+        self.path_taints = []
+
+        # store global variables, e.g. storage, balance of all paths
+        self.all_gs = []
+
+        # the trail steps of the paths in money_flow_all_paths found by the
+        # workers of parallel_sym_exec, None for the others
+        self.path_orders = []
+
+        self.total_no_of_paths = 0
+
+        # to generate names for symbolic variables
+        self.gen = Generator()
+
+        self.data_source = None
+        if self.params.USE_GLOBAL_BLOCKCHAIN:
+            self.data_source = EthereumData()
+
+        self.explorer = None
+        self.solver_path = None
+        self.reentrancy = None
+        self.taint = TaintTracker()
+        self.keys = ExprKeys()
+        # the hashes of concrete inputs of SHA3, and the functions that stand
+        # for the hash of symbolic ones by size
+        self.sha3_values = {}
+        self.sha3_functions = {}
+        # the hashes computed, in order
+        self.sha3_hashes = []
+
+        # the blocks executed on some path, and the paths left to explore
+        # when the exploration stopped
+        self.visited_blocks = set()
+        self.pending_paths = None
+        self.complete = True
+
+    # Analyze the contract and return the results by bug. When the time runs
+    # out, the bugs are looked for on the paths explored until then and the
+    # results have "complete" set to False. The "coverage" of the results
+    # tells how much of the contract was explored. An exception raised by the
+    # symbolic execution is passed on, with the results found so far left in
+    # self.results. The analyzers of a process share the z3 context and hold
+    # z3_lock while they run, so that analyzers started in several threads
+    # run one at a time; use processes, like the server and batch_run do, to
+    # analyze contracts in parallel.
+    def run(self):
+        with z3_lock:
+            self.deadline.start()
+            self.deadline.reserve(self.params.DETECTION_SHARE)
+            self.analyze()
+        return self.results
+
+    def analyze(self):
+        start = time.time()
+        log.info("Running, please wait...")
+
+        if not self.isTesting():
+            log.info("\t============ Results ===========")
+
+        log.debug("Checking for Callstack attack...")
+        with timed(self.profile, "detectors", "callstack"):
+            self.run_callstack_attack()
 
-def change_format():
-    with open(c_name) as disasm_file:
-        file_contents = disasm_file.readlines()
-        i = 0
-        firstLine = file_contents[0].strip('\n')
-        for line in file_contents:
-            line = line.replace('SELFDESTRUCT', 'SUICIDE')
-            line = line.replace('Missing opcode', 'INVALID')
-            line = line.replace(':', '')
-            lineParts = line.split(' ')
-            try: # removing initial zeroes
-                lineParts[0] = str(int(lineParts[0]))
-
-            except:
-                lineParts[0] = lineParts[0]
-            lineParts[-1] = lineParts[-1].strip('\n')
-            try: # adding arrow if last is a number
-                lastInt = lineParts[-1]
-                if(int(lastInt, 16) or int(lastInt, 16) == 0) and len(lineParts) > 2:
-                    lineParts[-1] = "=>"
-                    lineParts.append(lastInt)
-            except Exception:
-                pass
-            file_contents[i] = ' '.join(lineParts)
-            i = i + 1
-        file_contents[0] = firstLine
-        file_contents[-1] += '\n'
-
-    with open(c_name, 'w') as disasm_file:
-        disasm_file.write("\n".join(file_contents))
-
-
-def build_cfg_and_analyze():
-    change_format()
-    with open(c_name, 'r') as disasm_file:
-        disasm_file.readline()  # Remove first line
-        tokens = tokenize.generate_tokens(disasm_file.readline)
-        collect_vertices(tokens)
-        construct_bb()
-        construct_static_edges()
-        full_sym_exec()  # jump targets are constructed on the fly
-
-
-# Detect if a money flow depends on the timestamp
-def detect_time_dependency():
-    global results
-    TIMESTAMP_VAR = "IH_s"
-    is_dependant = False
-    index = 0
-    if global_params.PRINT_PATHS:
-        log.info("ALL PATH CONDITIONS")
-    for cond in path_conditions:
-        index += 1
-        if global_params.PRINT_PATHS:
-            log.info("PATH " + str(index) + ": " + str(cond))
-        list_vars = []
-        for expr in cond:
-            if is_expr(expr):
-                list_vars += get_vars(expr)
-        set_vars = set(i.decl().name() for i in list_vars)
-        if TIMESTAMP_VAR in set_vars:
-            is_dependant = True
-            break
-
-    if not isTesting():
-        log.info("\t  Time Dependency: \t %s", is_dependant)
-    results['time_dependency'] = is_dependant
-
-    if global_params.REPORT_MODE:
-        file_name = c_name.split("/")[len(c_name.split("/"))-1].split(".")[0]
-        report_file = file_name + '.report'
-        with open(report_file, 'w') as rfile:
-            if is_dependant:
-                rfile.write("yes\n")
+        try:
+            self.build_cfg_and_analyze()
+            log.debug("Done Symbolic execution")
+        except Timeout:
+            if self.params.UNIT_TEST == 2 or self.params.UNIT_TEST == 3:
+                exit(TIME_OUT)
+            log.info("\t  Timeout, the results are for the paths explored so far")
+            self.complete = False
+        except Exception as e:
+            if self.params.UNIT_TEST == 2 or self.params.UNIT_TEST == 3:
+                log.exception(e)
+                exit(EXCEPTION)
+            traceback.print_exc()
+            raise e
+        if self.pending_paths is None:
+            self.pending_paths = len(self.explorer.frontier) if self.explorer else 0
+
+        # the detectors get the time the exploration left and the share kept
+        # for them, so that they also report on the paths of an exploration
+        # that used up its time
+        self.deadline.release()
+        with timed(self.profile, "stages", "detection"):
+            self.detect_bugs(start)
+        log.debug("Results for Reentrancy Bug: " + str(self.reentrancy_all_paths))
+        reentrancy_bug_found = any([v for sublist in self.reentrancy_all_paths for v in sublist])
+        if not self.isTesting():
+            log.info("\t  Reentrancy bug exists: %s", str(reentrancy_bug_found))
+        self.results['reentrancy'] = reentrancy_bug_found
+        self.results['complete'] = self.complete
+        self.results['coverage'] = self.coverage()
+        if not self.isTesting():
+            if not self.complete:
+                log.info("\t  Explored %d of %d blocks, %d paths completed and %d left",
+                         len(self.visited_blocks), len(self.vertices), self.total_no_of_paths, self.pending_paths)
+            self.log_query_cache_stats()
+
+    def detect_bugs(self, start):
+        if self.report_file:
+            self.report_file.write(str(self.total_no_of_paths) + "\n")
+        with timed(self.profile, "detectors", "money concurrency"):
+            self.detect_money_concurrency()
+        with timed(self.profile, "detectors", "time dependency"):
+            self.detect_time_dependency()
+        stop = time.time()
+        if self.report_file:
+            self.report_file.write(str(stop-start))
+        if self.params.DATA_FLOW:
+            with timed(self.profile, "detectors", "data concurrency"):
+                self.detect_data_concurrency()
+            with timed(self.profile, "detectors", "data money concurrency"):
+                self.detect_data_money_concurrency()
+
+    def coverage(self):
+        return {
+            "blocks_visited": len(self.visited_blocks),
+            "blocks_total": len(self.vertices),
+            "paths_completed": self.total_no_of_paths,
+            "frontier_size": self.pending_paths,
+        }
+
+    def isTesting(self):
+        return self.params.UNIT_TEST != 0
+
+    def log_query_cache_stats(self):
+        if not cache_enabled():
+            return
+        stats = get_shared_cache().stats()
+        log.info("Solver query cache: %d hits, %d from disk, %d misses, %d entries",
+                 stats["hits"], stats["disk_hits"], stats["misses"], stats["entries"])
+
+    def build_cfg_and_analyze(self):
+        with timed(self.profile, "stages", "cfg"):
+            self.collect_vertices()
+            self.construct_bb()
+            self.construct_static_edges()
+        # jump targets are constructed on the fly
+        with timed(self.profile, "stages", "exploration"):
+            if self.params.JOBS > 1:
+                self.parallel_sym_exec(self.params.JOBS)
             else:
-                rfile.write("no\n")
-
-
-# detect if two paths send money to different people
-def detect_money_concurrency():
-    global results
-    n = len(money_flow_all_paths)
-    for i in range(n):
-        log.debug("Path " + str(i) + ": " + str(money_flow_all_paths[i]))
-        log.debug(all_gs[i])
-    i = 0
-    false_positive = []
-    concurrency_paths = []
-    for flow in money_flow_all_paths:
-        i += 1
-        if len(flow) == 1:
-            continue  # pass all flows which do not do anything with money
-        for j in range(i, n):
-            jflow = money_flow_all_paths[j]
-            if len(jflow) == 1:
-                continue
-            if is_diff(flow, jflow):
-                concurrency_paths.append([i-1, j])
-                if global_params.CHECK_CONCURRENCY_FP and \
-                        is_false_positive(i-1, j, all_gs, path_conditions) and \
-                        is_false_positive(j, i-1, all_gs, path_conditions):
-                    false_positive.append([i-1, j])
-
-    # if PRINT_MODE: print "All false positive cases: ", false_positive
-    log.debug("Concurrency in paths: ")
-    if len(concurrency_paths) > 0:
-        if not isTesting():
-            log.info("\t  Concurrency found in paths: %s", str(concurrency_paths))
-        results['concurrency'] = True
-    else:
-        if not isTesting():
-            log.info("\t  Concurrency Bug: \t False")
-        results['concurrency'] = False
-    if global_params.REPORT_MODE:
-        rfile.write("number of path: " + str(n) + "\n")
-        # number of FP detected
-        rfile.write(str(len(false_positive)) + "\n")
-        rfile.write(str(false_positive) + "\n")
-        # number of total races
-        rfile.write(str(len(concurrency_paths)) + "\n")
-        # all the races
-        rfile.write(str(concurrency_paths) + "\n")
-
-
-# Detect if there is data concurrency in two different flows.
-# e.g. if a flow modifies a value stored in the storage address and
-# the other one reads that value in its execution
-def detect_data_concurrency():
-    sload_flows = data_flow_all_paths[0]
-    sstore_flows = data_flow_all_paths[1]
-    concurrency_addr = []
-    for sflow in sstore_flows:
-        for addr in sflow:
-            for lflow in sload_flows:
-                if addr in lflow:
-                    if not addr in concurrency_addr:
-                        concurrency_addr.append(addr)
-                    break
-    log.debug("data conccureny in storage " + str(concurrency_addr))
-
-# Detect if any change in a storage address will result in a different
-# flow of money. Currently I implement this detection by
-# considering if a path condition contains
-# a variable which is a storage address.
-def detect_data_money_concurrency():
-    n = len(money_flow_all_paths)
-    sstore_flows = data_flow_all_paths[1]
-    concurrency_addr = []
-    for i in range(n):
-        cond = path_conditions[i]
-        list_vars = []
-        for expr in cond:
-            list_vars += get_vars(expr)
-        set_vars = set(i.decl().name() for i in list_vars)
+                self.full_sym_exec()
+
+    # Detect if a money flow depends on the timestamp
+    def detect_time_dependency(self):
+        is_dependant = False
+        index = 0
+        if self.params.PRINT_PATHS:
+            log.info("ALL PATH CONDITIONS")
+        for taint in self.path_taints:
+            if self.params.PRINT_PATHS:
+                log.info("PATH " + str(index + 1) + ": " + str(self.path_conditions[index]))
+            index += 1
+            if TIMESTAMP_TAINT in taint:
+                is_dependant = True
+                break
+
+        if not self.isTesting():
+            log.info("\t  Time Dependency: \t %s", is_dependant)
+        self.results['time_dependency'] = is_dependant
+
+    # detect if two paths send money to different people
+    def detect_money_concurrency(self):
+        n = len(self.money_flow_all_paths)
+        if log.isEnabledFor(logging.DEBUG):
+            for i in range(n):
+                log.debug("Path " + str(i) + ": " + str(self.money_flow_all_paths[i]))
+                log.debug(self.all_gs[i])
+        false_positive = []
+        concurrency_paths = []
+        # the flows with different signatures are different, those with the
+        # same one are compared by their amounts
+        comparator = FlowComparator(self.deadline, self.profile)
+        buckets = {}
+        signatures = [buckets.setdefault(flow_signature(flow), len(buckets)) for flow in self.money_flow_all_paths]
+        try:
+            for i in range(n):
+                flow = self.money_flow_all_paths[i]
+                if len(flow) == 1:
+                    continue  # pass all flows which do not do anything with money
+                for j in range(i + 1, n):
+                    jflow = self.money_flow_all_paths[j]
+                    if len(jflow) == 1:
+                        continue
+                    if signatures[i] != signatures[j] or comparator.is_diff(flow, jflow):
+                        concurrency_paths.append([i, j])
+                        if self.params.CHECK_CONCURRENCY_FP and \
+                                comparator.is_false_positive(i, j, self.all_gs, self.path_conditions) and \
+                                comparator.is_false_positive(j, i, self.all_gs, self.path_conditions):
+                            false_positive.append([i, j])
+        except Timeout:
+            # the pairs of paths that are left are not compared
+            self.complete = False
+
+        # if PRINT_MODE: print "All false positive cases: ", false_positive
+        log.debug("Concurrency in paths: ")
+        if len(concurrency_paths) > 0:
+            if not self.isTesting():
+                log.info("\t  Concurrency found in paths: %s", str(concurrency_paths))
+            self.results['concurrency'] = True
+        else:
+            if not self.isTesting():
+                log.info("\t  Concurrency Bug: \t False")
+            self.results['concurrency'] = False
+        if self.report_file:
+            self.report_file.write("number of path: " + str(n) + "\n")
+            # number of FP detected
+            self.report_file.write(str(len(false_positive)) + "\n")
+            self.report_file.write(str(false_positive) + "\n")
+            # number of total races
+            self.report_file.write(str(len(concurrency_paths)) + "\n")
+            # all the races
+            self.report_file.write(str(concurrency_paths) + "\n")
+
+    # Detect if there is data concurrency in two different flows.
+    # e.g. if a flow modifies a value stored in the storage address and
+    # the other one reads that value in its execution
+    def detect_data_concurrency(self):
+        sload_flows = self.data_flow_all_paths[0]
+        sstore_flows = self.data_flow_all_paths[1]
+        concurrency_addr = []
         for sflow in sstore_flows:
             for addr in sflow:
-                var_name = gen.gen_owner_store_var(addr)
-                if var_name in set_vars:
-                    concurrency_addr.append(var_name)
-    log.debug("Concurrency in data that affects money flow: " + str(set(concurrency_addr)))
-
-
-def print_cfg():
-    for block in vertices.values():
-        block.display()
-    log.debug(str(edges))
-
-
-# 1. Parse the disassembled file
-# 2. Then identify each basic block (i.e. one-in, one-out)
-# 3. Store them in vertices
-def collect_vertices(tokens):
-    global end_ins_dict
-    global instructions
-    global jump_type
-
-    current_ins_address = 0
-    last_ins_address = 0
-    is_new_line = True
-    current_block = 0
-    current_line_content = ""
-    wait_for_push = False
-    is_new_block = False
-
-    for tok_type, tok_string, (srow, scol), _, line_number in tokens:
-        if wait_for_push is True:
-            push_val = ""
-            for ptok_type, ptok_string, _, _, _ in tokens:
-                if ptok_type == NEWLINE:
-                    is_new_line = True
-                    current_line_content += push_val + ' '
-                    instructions[current_ins_address] = current_line_content
-                    log.debug(current_line_content)
-                    current_line_content = ""
-                    wait_for_push = False
-                    break
-                try:
-                    int(ptok_string, 16)
-                    push_val += ptok_string
-                except ValueError:
-                    pass
-
-            continue
-        elif is_new_line is True and tok_type == NUMBER:  # looking for a line number
+                for lflow in sload_flows:
+                    if addr in lflow:
+                        if not addr in concurrency_addr:
+                            concurrency_addr.append(addr)
+                        break
+        log.debug("data conccureny in storage " + str(concurrency_addr))
+
+    # Detect if any change in a storage address will result in a different
+    # flow of money. Currently I implement this detection by
+    # considering if a path condition contains
+    # a variable which is a storage address.
+    def detect_data_money_concurrency(self):
+        n = len(self.money_flow_all_paths)
+        sstore_flows = self.data_flow_all_paths[1]
+        concurrency_addr = []
+        for i in range(n):
+            taint = self.path_taints[i]
+            for sflow in sstore_flows:
+                for addr in sflow:
+                    var_name = self.gen.gen_owner_store_var(addr)
+                    if var_name in taint:
+                        concurrency_addr.append(var_name)
+        log.debug("Concurrency in data that affects money flow: " + str(set(concurrency_addr)))
+
+    def print_cfg(self):
+        for block in self.vertices.values():
+            block.display()
+        log.debug(str(self.edges))
+
+    # 1. Walk the disassembled instructions
+    # 2. Then identify each basic block (i.e. one-in, one-out)
+    # 3. Store them in vertices
+    def collect_vertices(self):
+
+        current_ins_address = 0
+        last_ins_address = 0
+        current_block = 0
+        is_new_block = False
+
+        for instruction in self.disasm:
             last_ins_address = current_ins_address
-            try:
-                current_ins_address = int(tok_string)
-            except ValueError:
-                log.critical("ERROR when parsing row %d col %d", srow, scol)
-                quit()
-            is_new_line = False
+            current_ins_address = instruction.pc
             if is_new_block:
                 current_block = current_ins_address
                 is_new_block = False
-            continue
-        elif tok_type == NEWLINE:
-            is_new_line = True
-            log.debug(current_line_content)
-            instructions[current_ins_address] = current_line_content
-            current_line_content = ""
-            continue
-        elif tok_type == NAME:
-            if tok_string == "JUMPDEST":
-                if last_ins_address not in end_ins_dict:
-                    end_ins_dict[current_block] = last_ins_address
+
+            self.instructions[current_ins_address] = instruction
+            log.debug(instruction)
+            opcode = instruction.name
+            if opcode == "JUMPDEST":
+                if last_ins_address not in self.end_ins_dict:
+                    self.end_ins_dict[current_block] = last_ins_address
                 current_block = current_ins_address
-                is_new_block = False
-            elif tok_string == "STOP" or tok_string == "RETURN" or tok_string == "SUICIDE":
-                jump_type[current_block] = "terminal"
-                end_ins_dict[current_block] = current_ins_address
-            elif tok_string == "JUMP":
-                jump_type[current_block] = "unconditional"
-                end_ins_dict[current_block] = current_ins_address
+            elif opcode == "STOP" or opcode == "RETURN" or opcode == "SUICIDE":
+                self.jump_type[current_block] = "terminal"
+                self.end_ins_dict[current_block] = current_ins_address
+            elif opcode == "JUMP":
+                self.jump_type[current_block] = "unconditional"
+                self.end_ins_dict[current_block] = current_ins_address
                 is_new_block = True
-            elif tok_string == "JUMPI":
-                jump_type[current_block] = "conditional"
-                end_ins_dict[current_block] = current_ins_address
+            elif opcode == "JUMPI":
+                self.jump_type[current_block] = "conditional"
+                self.end_ins_dict[current_block] = current_ins_address
                 is_new_block = True
-            elif tok_string.startswith('PUSH', 0):
-                wait_for_push = True
-            is_new_line = False
-        if tok_string != "=" and tok_string != ">":
-            current_line_content += tok_string + " "
-
-    if current_block not in end_ins_dict:
-        log.debug("current block: %d", current_block)
-        log.debug("last line: %d", current_ins_address)
-        end_ins_dict[current_block] = current_ins_address
-
-    if current_block not in jump_type:
-        jump_type[current_block] = "terminal"
-
-    for key in end_ins_dict:
-        if key not in jump_type:
-            jump_type[key] = "falls_to"
-
-
-def construct_bb():
-    global vertices
-    global edges
-    sorted_addresses = sorted(instructions.keys())
-    size = len(sorted_addresses)
-    for key in end_ins_dict:
-        end_address = end_ins_dict[key]
-        block = BasicBlock(key, end_address)
-        if key not in instructions:
-            continue
-        block.add_instruction(instructions[key])
-        i = sorted_addresses.index(key) + 1
-        while i < size and sorted_addresses[i] <= end_address:
-            block.add_instruction(instructions[sorted_addresses[i]])
-            i += 1
-        block.set_block_type(jump_type[key])
-        vertices[key] = block
-        edges[key] = []
-
-
-def construct_static_edges():
-    add_falls_to()  # these edges are static
-
-
-def add_falls_to():
-    global vertices
-    global edges
-    key_list = sorted(jump_type.keys())
-    length = len(key_list)
-    for i, key in enumerate(key_list):
-        if jump_type[key] != "terminal" and jump_type[key] != "unconditional" and i+1 < length:
-            target = key_list[i+1]
-            edges[key].append(target)
-            vertices[key].set_falls_to(target)
-
-
-def get_init_global_state(path_conditions_and_vars):
-    global_state = {"balance" : {}, "pc": 0}
-    init_is = init_ia = deposited_value = sender_address = receiver_address = gas_price = origin = currentCoinbase = currentTimestamp = currentNumber = currentDifficulty = currentGasLimit = callData = None
-
-    if global_params.INPUT_STATE:
-        with open('state.json') as f:
-            state = json.loads(f.read())
-            if state["Is"]["balance"]:
-                init_is = int(state["Is"]["balance"], 16)
-            if state["Ia"]["balance"]:
-                init_ia = int(state["Ia"]["balance"], 16)
-            if state["exec"]["value"]:
-                deposited_value = int(state["exec"]["value"], 16)
-            if state["Is"]["address"]:
-                sender_address = int(state["Is"]["address"], 16)
-            if state["Ia"]["address"]:
-                receiver_address = int(state["Ia"]["address"], 16)
-            if state["exec"]["gasPrice"]:
-                gas_price = int(state["exec"]["gasPrice"], 16)
-            if state["exec"]["origin"]:
-                origin = int(state["exec"]["origin"], 16)
-            if state["env"]["currentCoinbase"]:
-                currentCoinbase = int(state["env"]["currentCoinbase"], 16)
-            if state["env"]["currentTimestamp"]:
-                currentTimestamp = int(state["env"]["currentTimestamp"], 16)
-            if state["env"]["currentNumber"]:
-                currentNumber = int(state["env"]["currentNumber"], 16)
-            if state["env"]["currentDifficulty"]:
-                currentDifficulty = int(state["env"]["currentDifficulty"], 16)
-            if state["env"]["currentGasLimit"]:
-                currentGasLimit = int(state["env"]["currentGasLimit"], 16)
-            if state["exec"]["data"]:
-                callData = state["exec"]["data"]
-                if callData[:2] == "0x":
-                    callData = callData[2:]
-            if state["Ia"]["storage"]:
-                storage_dict = state["Ia"]["storage"]
-                global_state["Ia"] = {}
-                for key in storage_dict:
-                    global_state["Ia"][int(key, 16)] = int(storage_dict[key], 16)
-
-    # for some weird reason these 3 vars are stored in path_conditions insteaad of global_state
-    if not sender_address:
-        sender_address = BitVec("Is", 256)
-    path_conditions_and_vars["Is"] = sender_address
-
-    if not receiver_address:
-        receiver_address = BitVec("Ia", 256)
-    path_conditions_and_vars["Ia"] = receiver_address
-
-    if not deposited_value:
-        deposited_value = BitVec("Iv", 256)
-    path_conditions_and_vars["Iv"] = deposited_value
-
-    if not init_is:
-        init_is = BitVec("init_Is", 256)
-    if not init_ia:
-        init_ia = BitVec("init_Ia", 256)
-
-    constraint = (deposited_value >= BitVecVal(0, 256))
-    path_conditions_and_vars["path_condition"].append(constraint)
-    constraint = (init_is >= deposited_value)
-    path_conditions_and_vars["path_condition"].append(constraint)
-    constraint = (init_ia >= BitVecVal(0, 256))
-    path_conditions_and_vars["path_condition"].append(constraint)
-
-    # update the balances of the "caller" and "callee"
-
-    global_state["balance"]["Is"] = (init_is - deposited_value)
-    global_state["balance"]["Ia"] = (init_ia + deposited_value)
-
-    if not gas_price:
-        new_var_name = gen.gen_gas_price_var()
-        gas_price = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = gas_price
-
-    if not origin:
-        new_var_name = gen.gen_origin_var()
-        origin = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = origin
-
-    if not currentCoinbase:
-        new_var_name = "IH_c"
-        currentCoinbase = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = currentCoinbase
-
-    if not currentTimestamp:
-        new_var_name = "IH_s"
-        currentTimestamp = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = currentTimestamp
-
-    if not currentNumber:
-        new_var_name = "IH_i"
-        currentNumber = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = currentNumber
-
-    if not currentDifficulty:
-        new_var_name = "IH_d"
-        currentDifficulty = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = currentDifficulty
-
-    if not currentGasLimit:
-        new_var_name = "IH_l"
-        currentGasLimit = BitVec(new_var_name, 256)
-        path_conditions_and_vars[new_var_name] = currentGasLimit
-
-    # the state of the current current contract
-    if "Ia" not in global_state:
-        global_state["Ia"] = {}
-    global_state["miu_i"] = 0
-    global_state["value"] = deposited_value
-    global_state["sender_address"] = sender_address
-    global_state["receiver_address"] = receiver_address
-    global_state["gas_price"] = gas_price
-    global_state["origin"] = origin
-    global_state["currentCoinbase"] = currentCoinbase
-    global_state["currentTimestamp"] = currentTimestamp
-    global_state["currentNumber"] = currentNumber
-    global_state["currentDifficulty"] = currentDifficulty
-    global_state["currentGasLimit"] = currentGasLimit
-    global_state["callData"] = callData
-
-    return global_state
-
-
-def full_sym_exec():
-    # executing, starting from beginning
-    stack = []
-    path_conditions_and_vars = {"path_condition" : []}
-    visited, depth = [], 0
-    mem = {}
-    # this is init global state for this particular execution
-    global_state = get_init_global_state(path_conditions_and_vars)
-    analysis = init_analysis()
-    return sym_exec_block(0, 0, visited, depth, stack, mem, global_state, path_conditions_and_vars, analysis)
-
-
-# Symbolically executing a block from the start address
-def sym_exec_block(block, pre_block, visited, depth, stack, mem, global_state, path_conditions_and_vars, analysis):
-    global solver
-    global visited_edges
-    global money_flow_all_paths
-    global data_flow_all_paths
-    global path_conditions
-    global all_gs
-    Edge = namedtuple("Edge", ["v1", "v2"]) # Factory Function for tuples is used as dictionary key
-    if block < 0:
-        log.debug("UNKNOWN JUMP ADDRESS. TERMINATING THIS PATH")
-        return ["ERROR"]
-
-    log.debug("Reach block address %d \n", block)
-    log.debug("STACK: " + str(stack))
-
-    current_edge = Edge(pre_block, block)
-    if visited_edges.has_key(current_edge):
-        updated_count_number = visited_edges[current_edge] + 1
-        visited_edges.update({current_edge: updated_count_number})
-    else:
-        visited_edges.update({current_edge: 1})
-
-    if visited_edges[current_edge] > global_params.LOOP_LIMIT:
-        log.debug("Overcome a number of loop limit. Terminating this path ...")
-        return stack
-
-    current_gas_used = analysis["gas"]
-    if  current_gas_used > global_params.GAS_LIMIT:
-        log.debug("Run out of gas. Terminating this path ... ")
-        return stack
-
-    # Execute every instruction, one at a time
-    try:
-        block_ins = vertices[block].get_instructions()
-    except KeyError:
-        log.debug("This path results in an exception, possibly an invalid jump address")
-        return ["ERROR"]
-
-    for instr in block_ins:
-        sym_exec_ins(block, instr, stack, mem, global_state, path_conditions_and_vars, analysis)
-
-    # Mark that this basic block in the visited blocks
-    visited.append(block)
-    depth += 1
-
-    # Go to next Basic Block(s)
-    if jump_type[block] == "terminal" or depth > global_params.DEPTH_LIMIT:
-        log.debug("TERMINATING A PATH ...")
-        display_analysis(analysis)
-        global total_no_of_paths
-        total_no_of_paths += 1
-        reentrancy_all_paths.append(analysis["reentrancy_bug"])
-        if analysis["money_flow"] not in money_flow_all_paths:
-            money_flow_all_paths.append(analysis["money_flow"])
-            path_conditions.append(path_conditions_and_vars["path_condition"])
-            all_gs.append(copy_global_values(global_state))
-        if global_params.DATA_FLOW:
-            if analysis["sload"] not in data_flow_all_paths[0]:
-                data_flow_all_paths[0].append(analysis["sload"])
-            if analysis["sstore"] not in data_flow_all_paths[1]:
-                data_flow_all_paths[1].append(analysis["sstore"])
-        if global_params.UNIT_TEST == 1:
-            compare_stack_unit_test(stack)
-        if global_params.UNIT_TEST == 2 or global_params.UNIT_TEST == 3:
-            compare_storage_and_memory_unit_test(global_state, mem, analysis)
-
-    elif jump_type[block] == "unconditional":  # executing "JUMP"
-        successor = vertices[block].get_jump_target()
-        stack1 = list(stack)
-        mem1 = dict(mem)
-        global_state1 = my_copy_dict(global_state)
-        global_state1["pc"] = successor
-        visited1 = list(visited)
-        path_conditions_and_vars1 = my_copy_dict(path_conditions_and_vars)
-        analysis1 = my_copy_dict(analysis)
-        sym_exec_block(successor, block, visited1, depth, stack1, mem1, global_state1, path_conditions_and_vars1, analysis1)
-    elif jump_type[block] == "falls_to":  # just follow to the next basic block
-        successor = vertices[block].get_falls_to()
-        stack1 = list(stack)
-        mem1 = dict(mem)
-        global_state1 = my_copy_dict(global_state)
-        global_state1["pc"] = successor
-        visited1 = list(visited)
-        path_conditions_and_vars1 = my_copy_dict(path_conditions_and_vars)
-        analysis1 = my_copy_dict(analysis)
-        sym_exec_block(successor, block, visited1, depth, stack1, mem1, global_state1, path_conditions_and_vars1, analysis1)
-    elif jump_type[block] == "conditional":  # executing "JUMPI"
-
-        # A choice point, we proceed with depth first search
-
-        branch_expression = vertices[block].get_branch_expression()
-
-        log.debug("Branch expression: " + str(branch_expression))
-
-        solver.push()  # SET A BOUNDARY FOR SOLVER
-        solver.add(branch_expression)
 
+        if current_block not in self.end_ins_dict:
+            log.debug("current block: %d", current_block)
+            log.debug("last line: %d", current_ins_address)
+            self.end_ins_dict[current_block] = current_ins_address
+
+        if current_block not in self.jump_type:
+            self.jump_type[current_block] = "terminal"
+
+        for key in self.end_ins_dict:
+            if key not in self.jump_type:
+                self.jump_type[key] = "falls_to"
+
+    def construct_bb(self):
+        sorted_addresses = sorted(self.instructions.keys())
+        size = len(sorted_addresses)
+        for key in self.end_ins_dict:
+            end_address = self.end_ins_dict[key]
+            block = BasicBlock(key, end_address)
+            if key not in self.instructions:
+                continue
+            block.add_instruction(self.instructions[key])
+            i = sorted_addresses.index(key) + 1
+            while i < size and sorted_addresses[i] <= end_address:
+                block.add_instruction(self.instructions[sorted_addresses[i]])
+                i += 1
+            block.set_block_type(self.jump_type[key])
+            self.vertices[key] = block
+            self.edges[key] = []
+
+    def construct_static_edges(self):
+        self.add_falls_to()  # these edges are static
+
+    def add_falls_to(self):
+        key_list = sorted(self.jump_type.keys())
+        length = len(key_list)
+        for i, key in enumerate(key_list):
+            if self.jump_type[key] != "terminal" and self.jump_type[key] != "unconditional" and i+1 < length:
+                target = key_list[i+1]
+                self.edges[key].append(target)
+                self.vertices[key].set_falls_to(target)
+
+    def get_init_global_state(self, path_conditions_and_vars):
+        global_state = {"balance" : {}, "pc": 0}
+        init_is = init_ia = deposited_value = sender_address = receiver_address = gas_price = origin = currentCoinbase = currentTimestamp = currentNumber = currentDifficulty = currentGasLimit = callData = None
+
+        if self.params.INPUT_STATE:
+            with open('state.json') as f:
+                state = json.loads(f.read())
+                if state["Is"]["balance"]:
+                    init_is = int(state["Is"]["balance"], 16)
+                if state["Ia"]["balance"]:
+                    init_ia = int(state["Ia"]["balance"], 16)
+                if state["exec"]["value"]:
+                    deposited_value = int(state["exec"]["value"], 16)
+                if state["Is"]["address"]:
+                    sender_address = int(state["Is"]["address"], 16)
+                if state["Ia"]["address"]:
+                    receiver_address = int(state["Ia"]["address"], 16)
+                if state["exec"]["gasPrice"]:
+                    gas_price = int(state["exec"]["gasPrice"], 16)
+                if state["exec"]["origin"]:
+                    origin = int(state["exec"]["origin"], 16)
+                if state["env"]["currentCoinbase"]:
+                    currentCoinbase = int(state["env"]["currentCoinbase"], 16)
+                if state["env"]["currentTimestamp"]:
+                    currentTimestamp = int(state["env"]["currentTimestamp"], 16)
+                if state["env"]["currentNumber"]:
+                    currentNumber = int(state["env"]["currentNumber"], 16)
+                if state["env"]["currentDifficulty"]:
+                    currentDifficulty = int(state["env"]["currentDifficulty"], 16)
+                if state["env"]["currentGasLimit"]:
+                    currentGasLimit = int(state["env"]["currentGasLimit"], 16)
+                if state["exec"]["data"]:
+                    callData = state["exec"]["data"]
+                    if callData[:2] == "0x":
+                        callData = callData[2:]
+                if state["Ia"]["storage"]:
+                    storage_dict = state["Ia"]["storage"]
+                    global_state["Ia"] = {}
+                    for key in storage_dict:
+                        global_state["Ia"][int(key, 16)] = int(storage_dict[key], 16)
+
+        # for some weird reason these 3 vars are stored in path_conditions insteaad of global_state
+        if not sender_address:
+            sender_address = BitVec("Is", 256)
+        path_conditions_and_vars["Is"] = sender_address
+
+        if not receiver_address:
+            receiver_address = BitVec("Ia", 256)
+        path_conditions_and_vars["Ia"] = receiver_address
+
+        if not deposited_value:
+            deposited_value = BitVec("Iv", 256)
+        path_conditions_and_vars["Iv"] = deposited_value
+
+        if not init_is:
+            init_is = BitVec("init_Is", 256)
+        if not init_ia:
+            init_ia = BitVec("init_Ia", 256)
+
+        constraint = (deposited_value >= BitVecVal(0, 256))
+        self.taint.add_constraint(path_conditions_and_vars, constraint)
+        constraint = (init_is >= deposited_value)
+        self.taint.add_constraint(path_conditions_and_vars, constraint)
+        constraint = (init_ia >= BitVecVal(0, 256))
+        self.taint.add_constraint(path_conditions_and_vars, constraint)
+
+        # update the balances of the "caller" and "callee"
+
+        global_state["balance"]["Is"] = (init_is - deposited_value)
+        global_state["balance"]["Ia"] = (init_ia + deposited_value)
+
+        if not gas_price:
+            new_var_name = self.gen.gen_gas_price_var()
+            gas_price = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = gas_price
+
+        if not origin:
+            new_var_name = self.gen.gen_origin_var()
+            origin = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = origin
+
+        if not currentCoinbase:
+            new_var_name = "IH_c"
+            currentCoinbase = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = currentCoinbase
+
+        if not currentTimestamp:
+            new_var_name = "IH_s"
+            currentTimestamp = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = currentTimestamp
+
+        if not currentNumber:
+            new_var_name = "IH_i"
+            currentNumber = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = currentNumber
+
+        if not currentDifficulty:
+            new_var_name = "IH_d"
+            currentDifficulty = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = currentDifficulty
+
+        if not currentGasLimit:
+            new_var_name = "IH_l"
+            currentGasLimit = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = currentGasLimit
+
+        # the state of the current current contract
+        if "Ia" not in global_state:
+            global_state["Ia"] = {}
+        # the stores at symbolic addresses of the storage in order, and for an
+        # address of Ia the number of them made before its word was stored
+        global_state["storage_writes"] = []
+        global_state["storage_since"] = {}
+        global_state["miu_i"] = 0
+        global_state["value"] = deposited_value
+        global_state["sender_address"] = sender_address
+        global_state["receiver_address"] = receiver_address
+        global_state["gas_price"] = gas_price
+        global_state["origin"] = origin
+        global_state["currentCoinbase"] = currentCoinbase
+        global_state["currentTimestamp"] = currentTimestamp
+        global_state["currentNumber"] = currentNumber
+        global_state["currentDifficulty"] = currentDifficulty
+        global_state["currentGasLimit"] = currentGasLimit
+        global_state["callData"] = callData
+
+        return global_state
+
+    def full_sym_exec(self, budget=None):
+        # executing, starting from beginning
+        path_conditions_and_vars = PathConditionsAndVars()
+        # this is init global state for this particular execution
+        global_state = self.get_init_global_state(path_conditions_and_vars)
+        # the constraints on the initial state are kept out of the solver
+        self.solver_path = path_conditions_and_vars["path_condition"].copy()
+        self.reentrancy = ReentrancyChecker(self.solver, self.solver_path.to_list(), self.profile)
+        analysis = init_analysis()
+        self.explorer = Explorer(self.explore_block, self.params.SEARCH_STRATEGY, self.deadline)
+        self.explorer.add(State(0, 0, 0, PersistentList(), [], Memory(), global_state, path_conditions_and_vars, analysis))
+        return self.explorer.run(budget)
+
+    # Continue an exploration that stopped after executing its budget of blocks
+    def resume_sym_exec(self, budget=None):
+        return self.explorer.run(budget)
+
+    # Explore the paths in `jobs` processes. The exploration starts in this
+    # process until there is a pending path for every worker. The pending paths
+    # are then put in a queue from which the workers take them, and a worker
+    # that runs out of paths gets one that another worker gives away. Each
+    # worker sends back the paths it terminated, which are merged here.
+    def parallel_sym_exec(self, jobs):
+        self.full_sym_exec(0)
+        while not self.explorer.is_done() and len(self.explorer.frontier) < jobs:
+            self.explorer.run(1)
+        if self.explorer.is_done():
+            return
+        work = WorkQueue(jobs)
+        for index in range(len(self.explorer.frontier)):
+            work.put([index])
+
+        # the workers share the deadline, they are waited for a little longer
+        # to let them send their results
+        remaining = self.deadline.remaining()
+        counts = (self.total_no_of_paths, len(self.reentrancy_all_paths), len(self.money_flow_all_paths),
+                  len(self.data_flow_all_paths[0]), len(self.data_flow_all_paths[1]))
+        self.log_file.flush()
+        log.info("Exploring the paths in %d processes", jobs)
+        worker_results = run_workers(jobs, lambda index: self.explore_share(index, work, counts),
+                                     remaining + 10 if remaining is not None else None)
+
+        # the paths of a worker that failed are lost
+        timed_out = False
+        self.pending_paths = work.left()
+        for worker_result in worker_results:
+            if worker_result is None:
+                self.complete = False
+                continue
+            self.merge_worker_result(worker_result)
+            timed_out = timed_out or worker_result["timeout"]
+        if timed_out:
+            raise Timeout()
+
+    # Run by the worker `index` of parallel_sym_exec: explore the paths taken
+    # from `work` and return the paths terminated since the fork. The items of
+    # `work` are the steps of the trails of pending paths, which are all found
+    # from the frontier at the fork, the same in every worker. Several of them
+    # may start from the same state of that frontier, which is therefore kept
+    # as it is and copied for each.
+    def explore_share(self, index, work, counts):
+        roots = []
+        while not self.explorer.is_done():
+            state = self.explorer.frontier.pop()
+            state.trail = (len(roots), None)
+            roots.append(state)
+
+        # fresh variables must not get the same names in two workers
+        self.gen.prefix = "w%d_" % index
+
+        timed_out = False
+        lost = 0
         try:
-            if solver.check() == unsat:
-                log.debug("INFEASIBLE PATH DETECTED")
-            else:
-                left_branch = vertices[block].get_jump_target()
-                stack1 = list(stack)
-                mem1 = dict(mem)
-                global_state1 = my_copy_dict(global_state)
-                global_state1["pc"] = left_branch
-                visited1 = list(visited)
-                path_conditions_and_vars1 = my_copy_dict(path_conditions_and_vars)
-                path_conditions_and_vars1["path_condition"].append(branch_expression)
-                analysis1 = my_copy_dict(analysis)
-                sym_exec_block(left_branch, block, visited1, depth, stack1, mem1, global_state1, path_conditions_and_vars1, analysis1)
+            while True:
+                steps = work.get(self.deadline.check)
+                if steps is None:
+                    break
+                self.replaying = True
+                try:
+                    found = self.explorer.replay(copy_state(roots[steps[0]]), steps[1:])
+                finally:
+                    self.replaying = False
+                if not found:
+                    log.debug("Worker %d could not find the path %s again", index, steps)
+                    lost += 1
+                while not self.explorer.run(STEAL_INTERVAL):
+                    if work.wanted() and len(self.explorer.frontier) > 1:
+                        work.put(self.explorer.give_away())
+        except Timeout:
+            timed_out = True
+        finally:
+            work.stop()
+        self.log_file.flush()
+
+        paths, reentrancy, flows, sloads, sstores = counts
+        return {
+            "timeout": timed_out,
+            "lost": lost,
+            "paths": self.total_no_of_paths - paths,
+            "reentrancy": self.reentrancy_all_paths[reentrancy:],
+            "money_flow": self.money_flow_all_paths[flows:],
+            "path_conditions": self.path_conditions[flows:],
+            "path_taints": self.path_taints[flows:],
+            "all_gs": self.all_gs[flows:],
+            "path_orders": self.path_orders[flows:],
+            "sload": self.data_flow_all_paths[0][sloads:],
+            "sstore": self.data_flow_all_paths[1][sstores:],
+            "edges": self.edges,
+            "jump_targets": dict((block, self.vertices[block].get_jump_target()) for block in self.vertices),
+            "visited_blocks": list(self.visited_blocks),
+            "frontier": len(self.explorer.frontier),
+            "profile": self.profile.to_json() if self.profile else None,
+        }
+
+    # Only the first path found of every money flow is kept for the detectors.
+    # The paths of the workers of parallel_sym_exec are found in an order that
+    # depends on the timing of the workers, they are ordered by their trail
+    # steps instead, which is the order of a depth first search, and come
+    # after the paths found before the workers were started.
+    def is_first_money_flow(self, money_flow, order):
+        if money_flow not in self.money_flow_all_paths:
+            return True
+        other = self.path_orders[self.money_flow_all_paths.index(money_flow)]
+        return order is not None and other is not None and order < other
+
+    def add_money_flow(self, money_flow, path_condition, taint, gs, order):
+        if money_flow in self.money_flow_all_paths:
+            i = self.money_flow_all_paths.index(money_flow)
+            self.path_conditions[i] = path_condition
+            self.path_taints[i] = taint
+            self.all_gs[i] = gs
+            self.path_orders[i] = order
+        else:
+            self.money_flow_all_paths.append(money_flow)
+            self.path_conditions.append(path_condition)
+            self.path_taints.append(taint)
+            self.all_gs.append(gs)
+            self.path_orders.append(order)
+
+    def merge_worker_result(self, worker_result):
+        if worker_result["lost"]:
+            self.complete = False
+        self.total_no_of_paths += worker_result["paths"]
+        self.reentrancy_all_paths.extend(worker_result["reentrancy"])
+        for money_flow, path_condition, taint, gs, order in zip(worker_result["money_flow"],
+                                                                worker_result["path_conditions"],
+                                                                worker_result["path_taints"],
+                                                                worker_result["all_gs"],
+                                                                worker_result["path_orders"]):
+            if self.is_first_money_flow(money_flow, order):
+                self.add_money_flow(money_flow, path_condition, taint, gs, order)
+        for sload in worker_result["sload"]:
+            if sload not in self.data_flow_all_paths[0]:
+                self.data_flow_all_paths[0].append(sload)
+        for sstore in worker_result["sstore"]:
+            if sstore not in self.data_flow_all_paths[1]:
+                self.data_flow_all_paths[1].append(sstore)
+        for block, targets in worker_result["edges"].items():
+            for target in targets:
+                if target not in self.edges[block]:
+                    self.edges[block].append(target)
+        for block, target in worker_result["jump_targets"].items():
+            if target and not self.vertices[block].get_jump_target():
+                self.vertices[block].set_jump_target(target)
+        self.visited_blocks.update(worker_result["visited_blocks"])
+        self.pending_paths += worker_result["frontier"]
+        if self.profile:
+            self.profile.merge(worker_result["profile"])
+
+    # Explore the block of a state and give up on its path if an exception is
+    # raised. An exception before the first conditional jump aborts the whole
+    # execution.
+    def explore_block(self, state):
+        try:
+            return self.sym_exec_block(state)
         except Exception as e:
-            log_file.write(str(e))
+            if state.group.parent is None or isinstance(e, Timeout):
+                raise
+            self.log_file.write(str(e))
             traceback.print_exc()
-            if not global_params.IGNORE_EXCEPTIONS:
-                if str(e) == "timeout":
-                    raise e
-
-        solver.pop()  # POP SOLVER CONTEXT
+            return []
+
+    # Symbolically executing a block from the start address, returns the states
+    # at the start of the successor blocks
+    def sym_exec_block(self, state):
+        block = state.block
+        path_conditions_and_vars = state.path_conditions_and_vars
+        if block < 0:
+            log.debug("UNKNOWN JUMP ADDRESS. TERMINATING THIS PATH")
+            return []
+
+        log.debug("Reach block address %d \n", block)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("STACK: " + str(state.stack[::-1]))
+
+        current_edge = Edge(state.pre_block, block)
+        if self.visited_edges.has_key(current_edge):
+            updated_count_number = self.visited_edges[current_edge] + 1
+            self.visited_edges.update({current_edge: updated_count_number})
+        else:
+            self.visited_edges.update({current_edge: 1})
 
-        solver.push()  # SET A BOUNDARY FOR SOLVER
-        negated_branch_expression = Not(branch_expression)
-        solver.add(negated_branch_expression)
+        # the blocks of a path that is found again passed the check in the
+        # worker that gave it away, whose counts of the edges differ
+        if self.visited_edges[current_edge] > self.params.LOOP_LIMIT and not self.replaying:
+            log.debug("Overcome a number of loop limit. Terminating this path ...")
+            return []
 
-        log.debug("Negated branch expression: " + str(negated_branch_expression))
+        current_gas_used = state.analysis["gas"]
+        if  current_gas_used > self.params.GAS_LIMIT:
+            log.debug("Run out of gas. Terminating this path ... ")
+            return []
 
+        # Execute every instruction, one at a time
+        try:
+            block_ins = self.vertices[block].get_instructions()
+        except KeyError:
+            log.debug("This path results in an exception, possibly an invalid jump address")
+            return []
+        self.visited_blocks.add(block)
+        if self.profile is not None:
+            self.profile.blocks += 1
+
+        unshare(state)
+        stack = state.stack
+        mem = state.mem
+        global_state = state.global_state
+        analysis = state.analysis
+        global_state["pc"] = block
+
+        self.sync_solver(path_conditions_and_vars["path_condition"])
+        self.solver.push()  # constraints added by the instructions are dropped with this scope
         try:
-            if solver.check() == unsat:
-                # Note that this check can be optimized. I.e. if the previous check succeeds,
-                # no need to check for the negated condition, but we can immediately go into
-                # the else branch
-                log.debug("INFEASIBLE PATH DETECTED")
+            for instr in block_ins:
+                self.sym_exec_ins(block, instr, stack, mem, global_state, path_conditions_and_vars, analysis)
+        finally:
+            self.solver.pop()
+        # the constraints the instructions added to the path condition are put
+        # back in their own scopes
+        self.sync_solver(path_conditions_and_vars["path_condition"])
+        return self.get_successors(state, current_edge)
+
+    # Make the solver hold the constraints collected along a path, one scope per
+    # constraint. Only the scopes past the prefix shared with the previous path
+    # are popped, so going from one branch to its sibling costs a single scope.
+    def sync_solver(self, path_condition):
+        held, held_size = self.solver_path.tail, self.solver_path.size
+        target, target_size = path_condition.tail, path_condition.size
+        added = []
+        while target_size > held_size:
+            added.append(target.element)
+            target = target.prev
+            target_size -= 1
+        popped = 0
+        while held_size > target_size:
+            held = held.prev
+            held_size -= 1
+            popped += 1
+        # all the paths extend the initial path condition, so the search stops
+        # at the latest there
+        while held is not target:
+            held = held.prev
+            popped += 1
+            added.append(target.element)
+            target = target.prev
+        if popped:
+            self.solver.pop(popped)
+        for constraint in reversed(added):
+            self.solver.push()
+            self.solver.add(constraint)
+        self.solver_path = path_condition.copy()
+
+    # A path that leaves a block with a single successor hands its containers
+    # over to it, the branches of a conditional jump share them
+    def get_successors(self, state, current_edge):
+        block = state.block
+        stack = state.stack
+        mem = state.mem
+        global_state = state.global_state
+        path_conditions_and_vars = state.path_conditions_and_vars
+        analysis = state.analysis
+
+        # Mark that this basic block in the visited blocks
+        state.visited.append(block)
+        state.depth += 1
+
+        # Go to next Basic Block(s)
+        if self.jump_type[block] == "terminal" or state.depth > self.params.DEPTH_LIMIT:
+            log.debug("TERMINATING A PATH ...")
+            display_analysis(analysis)
+            self.total_no_of_paths += 1
+            self.reentrancy_all_paths.append(analysis["reentrancy_bug"])
+            order = trail_steps(state.trail) if state.trail is not None else None
+            if self.is_first_money_flow(analysis["money_flow"], order):
+                if self.keep_path_conditions:
+                    path_condition = path_conditions_and_vars["path_condition"].to_list()
+                else:
+                    path_condition = None
+                self.add_money_flow(analysis["money_flow"], path_condition, path_conditions_and_vars.taint,
+                                    copy_global_values(global_state), order)
+            if self.params.DATA_FLOW:
+                if analysis["sload"] not in self.data_flow_all_paths[0]:
+                    self.data_flow_all_paths[0].append(analysis["sload"])
+                if analysis["sstore"] not in self.data_flow_all_paths[1]:
+                    self.data_flow_all_paths[1].append(analysis["sstore"])
+            if self.params.UNIT_TEST == 1:
+                compare_stack_unit_test(stack)
+            if self.params.UNIT_TEST == 2 or self.params.UNIT_TEST == 3:
+                compare_storage_and_memory_unit_test(global_state, mem, analysis, self.unit_test, self.params.UNIT_TEST)
+            return []
+
+        elif self.jump_type[block] == "unconditional":  # executing "JUMP"
+            successor = self.vertices[block].get_jump_target()
+            return [state.successor(successor, stack, mem, global_state, path_conditions_and_vars, analysis, state.visited)]
+        elif self.jump_type[block] == "falls_to":  # just follow to the next basic block
+            successor = self.vertices[block].get_falls_to()
+            return [state.successor(successor, stack, mem, global_state, path_conditions_and_vars, analysis, state.visited)]
+        elif self.jump_type[block] == "conditional":  # executing "JUMPI"
+
+            # A choice point, the count of the edge into this block is given back
+            # once both branches have been explored
+            state.fork(lambda: self.release_edge(current_edge))
+            successors = []
+
+            branch_expression = self.vertices[block].get_branch_expression()
+
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Branch expression: " + str(branch_expression))
+
+            if isinstance(branch_expression, bool):
+                # A concrete condition leaves a single side to explore and adds
+                # nothing to the path condition
+                if branch_expression:
+                    successor = self.vertices[block].get_jump_target()
+                else:
+                    successor = self.vertices[block].get_falls_to()
+                return [state.successor(successor, stack, mem, global_state, path_conditions_and_vars, analysis, state.visited)]
+
+            negated_branch_expression = Not(branch_expression)
+            # both sides depend on the sources of the condition
+            taint = self.taint.labels(branch_expression)
+
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Negated branch expression: " + str(negated_branch_expression))
+
+            # A model of the path satisfies one of the two sides, which is then
+            # known to be feasible without asking the solver
+            left_model = right_model = None
+            model = get_path_model(path_conditions_and_vars)
+            if model is not None:
+                if is_true(model.eval(branch_expression, model_completion=True)):
+                    left_model = model
+                else:
+                    right_model = model
+
+            # The negated branch is checked first, so that the branch expression
+            # is still in the solver when the jump target is explored next
+            if self.profile:
+                self.profile.site = "branch"
+            right_feasible = right_model is not None
+            if not right_feasible:
+                self.solver.push()  # SET A BOUNDARY FOR SOLVER
+                self.solver.add(negated_branch_expression)
+                right_feasible, right_model = self.check_sat()
+                self.solver.pop()  # POP SOLVER CONTEXT
+
+            path_conditions_and_vars1 = path_conditions_and_vars.copy()
+            self.taint.add_constraint(path_conditions_and_vars1, branch_expression, taint)
+            parent_path = self.solver_path
+            self.solver.push()  # SET A BOUNDARY FOR SOLVER
+            self.solver.add(branch_expression)
+            self.solver_path = path_conditions_and_vars1["path_condition"].copy()
+
+            left_feasible = left_model is not None
+            if not left_feasible:
+                left_feasible, left_model = self.check_sat()
+
+            if left_feasible:
+                set_path_model(path_conditions_and_vars1, left_model)
+                left_branch = self.vertices[block].get_jump_target()
+                successors.append(state.successor(left_branch, stack, mem, global_state, path_conditions_and_vars1, analysis, state.visited.copy()))
             else:
-                right_branch = vertices[block].get_falls_to()
-                stack1 = list(stack)
-                mem1 = dict(mem)
-                global_state1 = my_copy_dict(global_state)
-                global_state1["pc"] = right_branch
-                visited1 = list(visited)
-                path_conditions_and_vars1 = my_copy_dict(path_conditions_and_vars)
-                path_conditions_and_vars1["path_condition"].append(negated_branch_expression)
-                analysis1 = my_copy_dict(analysis)
-                sym_exec_block(right_branch, block, visited1, depth, stack1, mem1, global_state1, path_conditions_and_vars1, analysis1)
-        except Exception as e:
-            log_file.write(str(e))
-            if str(e) == "timeout":
-                raise e
-        solver.pop()  # POP SOLVER CONTEXT
-        updated_count_number = visited_edges[current_edge] - 1
-        visited_edges.update({current_edge: updated_count_number})
-    else:
-        updated_count_number = visited_edges[current_edge] - 1
-        visited_edges.update({current_edge: updated_count_number})
-        raise Exception('Unknown Jump-Type')
-
-
-# Symbolically executing an instruction
-def sym_exec_ins(start, instr, stack, mem, global_state, path_conditions_and_vars, analysis):
-    global solver
-    global vertices
-    global edges
-    instr_parts = str.split(instr, ' ')
-
-    if instr_parts[0] == "INVALID":
-        return
+                self.solver.pop()  # POP SOLVER CONTEXT
+                self.solver_path = parent_path
+
+            if right_feasible:
+                right_branch = self.vertices[block].get_falls_to()
+                self.taint.add_constraint(path_conditions_and_vars, negated_branch_expression, taint)
+                set_path_model(path_conditions_and_vars, right_model)
+                successors.append(state.successor(right_branch, stack, mem, global_state, path_conditions_and_vars, analysis, state.visited))
+
+            if len(successors) == 2:
+                share = Share(2)
+                for successor in successors:
+                    successor.share = share
+            return successors
+        else:
+            self.release_edge(current_edge)
+            raise Exception('Unknown Jump-Type')
 
-    # collecting the analysis result by calling this skeletal function
-    # this should be done before symbolically executing the instruction,
-    # since SE will modify the stack and mem
-    update_analysis(analysis, instr_parts[0], stack, mem, global_state, path_conditions_and_vars, solver)
+    # Check the constraints in the solver. Returns whether they may be
+    # satisfiable, and a model of them when the solver found one.
+    def check_sat(self):
+        try:
+            result = self.solver.check()
+        except Exception as e:
+            if isinstance(e, Timeout):
+                raise
+            self.log_file.write(str(e))
+            return False, None
+        if result == unsat:
+            log.debug("INFEASIBLE PATH DETECTED")
+            return False, None
+        if result == sat:
+            return True, self.solver.model()
+        return True, None
+
+    def release_edge(self, edge):
+        updated_count_number = self.visited_edges[edge] - 1
+        self.visited_edges.update({edge: updated_count_number})
+
+    # Symbolically executing an instruction
+    def sym_exec_ins(self, start, instr, stack, mem, global_state, path_conditions_and_vars, analysis):
+        if instr.name == "INVALID":
+            return
+
+        handler = sym_exec_handlers.get(instr.name)
+        if handler is None:
+            log.debug("UNKNOWN INSTRUCTION: " + instr.name)
+            if self.params.UNIT_TEST == 2 or self.params.UNIT_TEST == 3:
+                log.critical("Unkown instruction: %s" % instr.name)
+                exit(UNKOWN_INSTRUCTION)
+            raise Exception('UNKNOWN INSTRUCTION: ' + instr.name)
+
+        if len(stack) < instr.stack_in:
+            raise ValueError('STACK underflow')
 
-    log.debug("==============================")
-    log.debug("EXECUTING: " + instr)
+        # z3 numerals are folded back into Python integers, so that the operands
+        # of the instruction take the concrete paths of the analysis and handlers
+        for i in xrange(len(stack) - instr.stack_in, len(stack)):
+            if isinstance(stack[i], BitVecNumRef):
+                stack[i] = stack[i].as_long()
+
+        # the queries are recorded under the part of the instruction that
+        # makes them
+        profile = self.profile
+        if profile is not None:
+            started = time.time()
+            profile.site = "gas " + instr.name
+
+        # collecting the analysis result by calling this skeletal function
+        # this should be done before symbolically executing the instruction,
+        # since SE will modify the stack and mem
+        update_analysis(analysis, instr.name, stack, mem, global_state, path_conditions_and_vars, self.solver,
+                        self.params.DATA_FLOW, self.reentrancy, self.keys)
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("==============================")
+            log.debug("EXECUTING: " + str(instr))
+
+        if profile is not None:
+            profile.site = instr.name
+        handler(self, start, instr, stack, mem, global_state, path_conditions_and_vars)
+        if profile is not None:
+            profile.add("opcodes", instr.name, time.time() - started)
+
+        if log.isEnabledFor(logging.DEBUG):
+            print_state(stack, mem, global_state)
 
     #
     #  0s: Stop and Arithmetic Operations
     #
-    if instr_parts[0] == "STOP":
+
+    def sym_exec_stop(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        return
-    elif instr_parts[0] == "ADD":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            # Type conversion is needed when they are mismatched
-            if isReal(first) and isSymbolic(second):
-                first = BitVecVal(first, 256)
-                computed = first + second
-            elif isSymbolic(first) and isReal(second):
-                second = BitVecVal(second, 256)
-                computed = first + second
-            else:
-                # both are real and we need to manually modulus with 2 ** 256
-                # if both are symbolic z3 takes care of modulus automatically
-                computed = (first + second) % (2 ** 256)
-            stack.insert(0, computed)
+
+    def sym_exec_add(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        # Type conversion is needed when they are mismatched
+        if isReal(first) and isSymbolic(second):
+            first = BitVecVal(first, 256)
+            computed = first + second
+        elif isSymbolic(first) and isReal(second):
+            second = BitVecVal(second, 256)
+            computed = first + second
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MUL":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if isReal(first) and isSymbolic(second):
-                first = BitVecVal(first, 256)
-            elif isSymbolic(first) and isReal(second):
-                second = BitVecVal(second, 256)
-            computed = first * second & UNSIGNED_BOUND_NUMBER
-            stack.insert(0, computed)
+            # both are real and we need to manually modulus with 2 ** 256
+            # if both are symbolic z3 takes care of modulus automatically
+            computed = (first + second) % (2 ** 256)
+        stack.append(computed)
+
+    def sym_exec_mul(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if isReal(first) and isSymbolic(second):
+            first = BitVecVal(first, 256)
+        elif isSymbolic(first) and isReal(second):
+            second = BitVecVal(second, 256)
+        computed = first * second & UNSIGNED_BOUND_NUMBER
+        stack.append(computed)
+
+    def sym_exec_sub(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if isReal(first) and isSymbolic(second):
+            first = BitVecVal(first, 256)
+            computed = first - second
+        elif isSymbolic(first) and isReal(second):
+            second = BitVecVal(second, 256)
+            computed = first - second
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SUB":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if isReal(first) and isSymbolic(second):
-                first = BitVecVal(first, 256)
-                computed = first - second
-            elif isSymbolic(first) and isReal(second):
-                second = BitVecVal(second, 256)
-                computed = first - second
+            computed = (first - second) % (2 ** 256)
+        stack.append(computed)
+
+    def sym_exec_div(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            if second == 0:
+                computed = 0
             else:
-                computed = (first - second) % (2 ** 256)
-            stack.insert(0, computed)
+                first = to_unsigned(first)
+                second = to_unsigned(second)
+                computed = first / second
+        elif isReal(second):
+            # only the divisor needs to be checked against zero
+            computed = 0 if second == 0 else UDiv(first, BitVecVal(second, 256))
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "DIV":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                if second == 0:
-                    computed = 0
-                else:
-                    first = to_unsigned(first)
-                    second = to_unsigned(second)
-                    computed = first / second
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add( Not (second == 0) )
+            if self.solver.check() == unsat:
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add( Not (second == 0) )
-                if solver.check() == unsat:
-                    computed = 0
-                else:
-                    computed = UDiv(first, second)
-                solver.pop()
-            stack.insert(0, computed)
+                computed = UDiv(first, second)
+            self.solver.pop()
+        stack.append(computed)
+
+    def sym_exec_sdiv(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            first = to_signed(first)
+            second = to_signed(second)
+            if second == 0:
+                computed = 0
+            elif first == -2**255 and second == -1:
+                computed = -2**255
+            else:
+                sign = -1 if (first / second) < 0 else 1
+                computed = sign * ( abs(first) / abs(second) )
+        elif isReal(second) and second == 0:
+            computed = 0
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SDIV":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                first = to_signed(first)
-                second = to_signed(second)
-                if second == 0:
-                    computed = 0
-                elif first == -2**255 and second == -1:
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add(Not(second == 0))
+            if self.solver.check() == unsat:
+                computed = 0
+            else:
+                self.solver.push()
+                self.solver.add( Not( And(first == -2**255, second == -1 ) ))
+                if self.solver.check() == unsat:
                     computed = -2**255
                 else:
-                    sign = -1 if (first / second) < 0 else 1
-                    computed = sign * ( abs(first) / abs(second) )
+                    self.solver.push()
+                    self.solver.add(first / second < 0)
+                    sign = -1 if self.solver.check() == sat else 1
+                    z3_abs = lambda x: If(x >= 0, x, -x)
+                    first = z3_abs(first)
+                    second = z3_abs(second)
+                    computed = sign * (first / second)
+                    self.solver.pop()
+                self.solver.pop()
+            self.solver.pop()
+        stack.append(computed)
+
+    def sym_exec_mod(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            if second == 0:
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add(Not(second == 0))
-                if solver.check() == unsat:
-                    computed = 0
-                else:
-                    solver.push()
-                    solver.add( Not( And(first == -2**255, second == -1 ) ))
-                    if solver.check() == unsat:
-                        computed = -2**255
-                    else:
-                        solver.push()
-                        solver.add(first / second < 0)
-                        sign = -1 if solver.check() == sat else 1
-                        z3_abs = lambda x: If(x >= 0, x, -x)
-                        first = z3_abs(first)
-                        second = z3_abs(second)
-                        computed = sign * (first / second)
-                        solver.pop()
-                    solver.pop()
-                solver.pop()
-            stack.insert(0, computed)
+                first = to_unsigned(first)
+                second = to_unsigned(second)
+                computed = first % second & UNSIGNED_BOUND_NUMBER
+        elif isReal(second):
+            computed = 0 if second == 0 else URem(first, BitVecVal(second, 256))
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MOD":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                if second == 0:
-                    computed = 0
-                else:
-                    first = to_unsigned(first)
-                    second = to_unsigned(second)
-                    computed = first % second & UNSIGNED_BOUND_NUMBER
-
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+
+            self.solver.push()
+            self.solver.add(Not(second == 0))
+            if self.solver.check() == unsat:
+                # it is provable that second is indeed equal to zero
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-
-                solver.push()
-                solver.add(Not(second == 0))
-                if solver.check() == unsat:
-                    # it is provable that second is indeed equal to zero
-                    computed = 0
-                else:
-                    computed = URem(first, second)
-                solver.pop()
+                computed = URem(first, second)
+            self.solver.pop()
+
+        stack.append(computed)
 
-            stack.insert(0, computed)
+    def sym_exec_smod(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            if second == 0:
+                computed = 0
+            else:
+                first = to_signed(first)
+                second = to_signed(second)
+                sign = -1 if first < 0 else 1
+                computed = sign * (abs(first) % abs(second))
+        elif isReal(second) and second == 0:
+            computed = 0
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SMOD":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                if second == 0:
-                    computed = 0
-                else:
-                    first = to_signed(first)
-                    second = to_signed(second)
-                    sign = -1 if first < 0 else 1
-                    computed = sign * (abs(first) % abs(second))
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+
+            self.solver.push()
+            self.solver.add(Not(second == 0))
+            if self.solver.check() == unsat:
+                # it is provable that second is indeed equal to zero
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-
-                solver.push()
-                solver.add(Not(second == 0))
-                if solver.check() == unsat:
-                    # it is provable that second is indeed equal to zero
-                    computed = 0
-                else:
 
-                    solver.push()
-                    solver.add(first < 0) # check sign of first element
-                    sign = BitVecVal(-1, 256) if solver.check() == sat \
-                        else BitVecVal(1, 256)
-                    solver.pop()
+                self.solver.push()
+                self.solver.add(first < 0) # check sign of first element
+                sign = BitVecVal(-1, 256) if self.solver.check() == sat \
+                    else BitVecVal(1, 256)
+                self.solver.pop()
 
-                    z3_abs = lambda x: If(x >= 0, x, -x)
-                    first = z3_abs(first)
-                    second = z3_abs(second)
+                z3_abs = lambda x: If(x >= 0, x, -x)
+                first = z3_abs(first)
+                second = z3_abs(second)
 
-                    computed = sign * (first % second)
-                solver.pop()
+                computed = sign * (first % second)
+            self.solver.pop()
 
-            stack.insert(0, computed)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "ADDMOD":
-        if len(stack) > 2:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            third = stack.pop(0)
-
-            if contains_only_concrete_values([first, second, third]):
-                if third == 0:
-                    computed = 0
-                else:
-                    computed = (first + second) % third
+        stack.append(computed)
+
+    def sym_exec_addmod(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        third = stack.pop()
+
+        if contains_only_concrete_values([first, second, third]):
+            if third == 0:
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add( Not(third == 0) )
-                if solver.check() == unsat:
-                    computed = 0
-                else:
-                    first = ZeroExt(256, first)
-                    second = ZeroExt(256, second)
-                    third = ZeroExt(256, third)
-                    computed = (first + second) % third
-                    computed = Extract(255, 0, computed)
-                solver.pop()
-            stack.insert(0, computed)
+                computed = (first + second) % third
+        elif isReal(third):
+            # only the modulus needs to be checked against zero
+            if third == 0:
+                computed = 0
+            else:
+                first = ZeroExt(256, to_symbolic(first))
+                second = ZeroExt(256, to_symbolic(second))
+                third = ZeroExt(256, BitVecVal(third, 256))
+                computed = (first + second) % third
+                computed = Extract(255, 0, computed)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MULMOD":
-        if len(stack) > 2:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            third = stack.pop(0)
-
-            if contains_only_concrete_values([first, second, third]):
-                if third == 0:
-                    computed = 0
-                else:
-                    computed = (first * second) % third
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add( Not(third == 0) )
+            if self.solver.check() == unsat:
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add( Not(third == 0) )
-                if solver.check() == unsat:
-                    computed = 0
-                else:
-                    first = ZeroExt(256, first)
-                    second = ZeroExt(256, second)
-                    third = ZeroExt(256, third)
-                    computed = URem(first * second, third)
-                    computed = Extract(255, 0, computed)
-                solver.pop()
-            stack.insert(0, computed)
+                first = ZeroExt(256, first)
+                second = ZeroExt(256, second)
+                third = ZeroExt(256, third)
+                computed = (first + second) % third
+                computed = Extract(255, 0, computed)
+            self.solver.pop()
+        stack.append(computed)
+
+    def sym_exec_mulmod(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        third = stack.pop()
+
+        if contains_only_concrete_values([first, second, third]):
+            if third == 0:
+                computed = 0
+            else:
+                computed = (first * second) % third
+        elif isReal(third):
+            if third == 0:
+                computed = 0
+            else:
+                first = ZeroExt(256, to_symbolic(first))
+                second = ZeroExt(256, to_symbolic(second))
+                third = ZeroExt(256, BitVecVal(third, 256))
+                computed = URem(first * second, third)
+                computed = Extract(255, 0, computed)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "EXP":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            base = stack.pop(0)
-            exponent = stack.pop(0)
-            # Type conversion is needed when they are mismatched
-            if contains_only_concrete_values([base, exponent]):
-                computed = pow(base, exponent, 2**256)
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add( Not(third == 0) )
+            if self.solver.check() == unsat:
+                computed = 0
             else:
-                # The computed value is unknown, this is because power is
-                # not supported in bit-vector theory
-                new_var_name = gen.gen_arbitrary_var()
-                computed = BitVec(new_var_name, 256)
-            stack.insert(0, computed)
+                first = ZeroExt(256, first)
+                second = ZeroExt(256, second)
+                third = ZeroExt(256, third)
+                computed = URem(first * second, third)
+                computed = Extract(255, 0, computed)
+            self.solver.pop()
+        stack.append(computed)
+
+    def sym_exec_exp(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        base = stack.pop()
+        exponent = stack.pop()
+        # Type conversion is needed when they are mismatched
+        if contains_only_concrete_values([base, exponent]):
+            computed = pow(base, exponent, 2**256)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SIGNEXTEND":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                if first >= 32 or first < 0:
-                    computed = second
-                else:
-                    signbit_index_from_right = 8 * first + 7
-                    if second & (1 << signbit_index_from_right):
-                        computed = second | (2 ** 256 - (1 << signbit_index_from_right))
-                    else:
-                        computed = second & ((1 << signbit_index_from_right) - 1 )
+            # The computed value is unknown, this is because power is
+            # not supported in bit-vector theory
+            new_var_name = self.gen.gen_arbitrary_var()
+            computed = BitVec(new_var_name, 256)
+        stack.append(computed)
+
+    def sym_exec_signextend(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            if first >= 32 or first < 0:
+                computed = second
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add( Not( Or(first >= 32, first < 0 ) ) )
-                if solver.check() == unsat:
-                    computed = second
+                signbit_index_from_right = 8 * first + 7
+                if second & (1 << signbit_index_from_right):
+                    computed = second | (2 ** 256 - (1 << signbit_index_from_right))
                 else:
-                    signbit_index_from_right = 8 * first + 7
-                    solver.push()
-                    solver.add(second & (1 << signbit_index_from_right) == 0)
-                    if solver.check() == unsat:
-                        computed = second | (2 ** 256 - (1 << signbit_index_from_right))
-                    else:
-                        computed = second & ((1 << signbit_index_from_right) - 1)
-                    solver.pop()
-                solver.pop()
-            stack.insert(0, computed)
+                    computed = second & ((1 << signbit_index_from_right) - 1 )
+        elif isReal(first) and (first >= 32 or first < 0):
+            computed = second
         else:
-            raise ValueError('STACK underflow')
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add( Not( Or(first >= 32, first < 0 ) ) )
+            if self.solver.check() == unsat:
+                computed = second
+            else:
+                signbit_index_from_right = 8 * first + 7
+                self.solver.push()
+                self.solver.add(second & (1 << signbit_index_from_right) == 0)
+                if self.solver.check() == unsat:
+                    computed = second | (2 ** 256 - (1 << signbit_index_from_right))
+                else:
+                    computed = second & ((1 << signbit_index_from_right) - 1)
+                self.solver.pop()
+            self.solver.pop()
+        stack.append(computed)
+
     #
     #  10s: Comparison and Bitwise Logic Operations
     #
-    elif instr_parts[0] == "LT":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                first = to_unsigned(first)
-                second = to_unsigned(second)
-                if first < second:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+
+    def sym_exec_lt(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            first = to_unsigned(first)
+            second = to_unsigned(second)
+            if first < second:
+                stack.append(1)
             else:
-                sym_expression = If(ULT(first, second), BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "GT":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                first = to_unsigned(first)
-                second = to_unsigned(second)
-                if first > second:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+            sym_expression = If(ULT(first, second), BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
+
+    def sym_exec_gt(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            first = to_unsigned(first)
+            second = to_unsigned(second)
+            if first > second:
+                stack.append(1)
             else:
-                sym_expression = If(UGT(first, second), BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SLT":  # Not fully faithful to signed comparison
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                first = to_signed(first)
-                second = to_signed(second)
-                if first < second:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+            sym_expression = If(UGT(first, second), BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
+
+    # Not fully faithful to signed comparison
+    def sym_exec_slt(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            first = to_signed(first)
+            second = to_signed(second)
+            if first < second:
+                stack.append(1)
             else:
-                sym_expression = If(first < second, BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SGT":  # Not fully faithful to signed comparison
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                first = to_signed(first)
-                second = to_signed(second)
-                if first > second:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+            sym_expression = If(first < second, BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
+
+    # Not fully faithful to signed comparison
+    def sym_exec_sgt(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            first = to_signed(first)
+            second = to_signed(second)
+            if first > second:
+                stack.append(1)
             else:
-                sym_expression = If(first > second, BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "EQ":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            if contains_only_concrete_values([first, second]):
-                if first == second:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+            sym_expression = If(first > second, BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
+
+    def sym_exec_eq(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        if contains_only_concrete_values([first, second]):
+            if first == second:
+                stack.append(1)
             else:
-                sym_expression = If(first == second, BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "ISZERO":
+            sym_expression = If(first == second, BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
+
+    def sym_exec_iszero(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # Tricky: this instruction works on both boolean and integer,
         # when we have a symbolic expression, type error might occur
         # Currently handled by try and catch
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            if isReal(first):
-                if first == 0:
-                    stack.insert(0, 1)
-                else:
-                    stack.insert(0, 0)
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        if isReal(first):
+            if first == 0:
+                stack.append(1)
             else:
-                sym_expression = If(first == 0, BitVecVal(1, 256), BitVecVal(0, 256))
-                stack.insert(0, sym_expression)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "AND":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
-            computed = first & second
-            stack.insert(0, computed)
+                stack.append(0)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "OR":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
+            sym_expression = If(first == 0, BitVecVal(1, 256), BitVecVal(0, 256))
+            stack.append(sym_expression)
 
-            computed = first | second
-            stack.insert(0, computed)
+    def sym_exec_and(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+        computed = first & second
+        stack.append(computed)
 
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "XOR":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            second = stack.pop(0)
+    def sym_exec_or(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
 
-            computed = first ^ second
-            stack.insert(0, computed)
+        computed = first | second
+        stack.append(computed)
 
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "NOT":
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            computed = (~first) & UNSIGNED_BOUND_NUMBER
-            stack.insert(0, computed)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "BYTE":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            first = stack.pop(0)
-            byte_index = 32 - first - 1
-            second = stack.pop(0)
-
-            if contains_only_concrete_values([first, second]):
-                if first >= 32 or first < 0:
-                    computed = 0
-                else:
-                    computed = second & (255 << (8 * byte_index))
-                    computed = computed >> (8 * byte_index)
+    def sym_exec_xor(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        second = stack.pop()
+
+        computed = first ^ second
+        stack.append(computed)
+
+    def sym_exec_not(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        computed = (~first) & UNSIGNED_BOUND_NUMBER
+        stack.append(computed)
+
+    def sym_exec_byte(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        first = stack.pop()
+        byte_index = 32 - first - 1
+        second = stack.pop()
+
+        if contains_only_concrete_values([first, second]):
+            if first >= 32 or first < 0:
+                computed = 0
             else:
-                first = to_symbolic(first)
-                second = to_symbolic(second)
-                solver.push()
-                solver.add( Not (Or( first >= 32, first < 0 ) ) )
-                if solver.check() == unsat:
-                    computed = 0
-                else:
-                    computed = second & (255 << (8 * byte_index))
-                    computed = computed >> (8 * byte_index)
-            stack.insert(0, computed)
+                computed = second & (255 << (8 * byte_index))
+                computed = computed >> (8 * byte_index)
+        elif isReal(first):
+            if first >= 32 or first < 0:
+                computed = 0
+            else:
+                computed = second & (255 << (8 * byte_index))
+                computed = computed >> (8 * byte_index)
         else:
-            raise ValueError('STACK underflow')
+            first = to_symbolic(first)
+            second = to_symbolic(second)
+            self.solver.push()
+            self.solver.add( Not (Or( first >= 32, first < 0 ) ) )
+            if self.solver.check() == unsat:
+                computed = 0
+            else:
+                computed = second & (255 << (8 * byte_index))
+                computed = computed >> (8 * byte_index)
+            self.solver.pop()
+        stack.append(computed)
+
     #
     # 20s: SHA3
     #
-    elif instr_parts[0] == "SHA3":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
-            stack.pop(0)
+
+    # The hash of words of the memory is computed when they are all concrete.
+    # Otherwise it is the application of an uninterpreted function, one per
+    # size of input, to the words, so that the same words have the same hash.
+    def sym_exec_sha3(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        offset = stack.pop()
+        size = stack.pop()
+        words = self.get_sha3_input(mem, offset, size, path_conditions_and_vars)
+        if words is None:
             # push into the execution a fresh symbolic variable
-            new_var_name = gen.gen_arbitrary_var()
+            new_var_name = self.gen.gen_arbitrary_var()
             new_var = BitVec(new_var_name, 256)
             path_conditions_and_vars[new_var_name] = new_var
-            stack.insert(0, new_var)
+            stack.append(new_var)
+        elif all(isReal(word) for word in words):
+            key = (size, tuple(words))
+            value = self.sha3_values.get(key)
+            if value is None:
+                data = "".join(binascii.unhexlify("%064x" % (word % 2 ** 256)) for word in words)[:size]
+                value = self.sha3_values[key] = long(binascii.hexlify(keccak256(data)), 16)
+                bisect.insort(self.sha3_hashes, value)
+            stack.append(value)
         else:
-            raise ValueError('STACK underflow')
+            function = self.sha3_functions.get(size)
+            if function is None:
+                sorts = [BitVecSort(256)] * (len(words) + 1)
+                function = self.sha3_functions[size] = Function("sha3_%d" % size, *sorts)
+            if size % 32:
+                # only the first bytes of the last word are hashed
+                words[-1] = LShR(to_symbolic(words[-1]), 8 * (32 - size % 32))
+            stack.append(function(*words))
+
+    # The words of the memory that `size` bytes at `offset` are made of, or
+    # None when they are not known: the region is symbolic, a word of it was
+    # not stored, or a word was stored across two of its words
+    def get_sha3_input(self, mem, offset, size, path_conditions_and_vars):
+        if not isReal(offset) or not isReal(size) or size > 32 * 1024:
+            return None
+        end = offset + size
+        for address in mem.words:
+            if offset - 32 < address < end and (address - offset) % 32:
+                return None
+        words = []
+        for address in xrange(offset, end, 32):
+            if address not in mem:
+                return None
+            word = self.load_word(mem, address, path_conditions_and_vars)
+            if is_bv_value(word):
+                word = word.as_long()
+            words.append(word)
+        return words
+
     #
     # 30s: Environment Information
     #
-    elif instr_parts[0] == "ADDRESS":  # get address of currently executing account
+
+    # get address of currently executing account
+    def sym_exec_address(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, path_conditions_and_vars["Ia"])
-    elif instr_parts[0] == "BALANCE":
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            address = stack.pop(0)
-            if isReal(address) and global_params.USE_GLOBAL_BLOCKCHAIN:
-                new_var = data_source.getBalance(address)
-            else:
-                new_var_name = gen.gen_balance_var()
-                if new_var_name in path_conditions_and_vars:
-                    new_var = path_conditions_and_vars[new_var_name]
-                else:
-                    new_var = BitVec(new_var_name, 256)
-                    path_conditions_and_vars[new_var_name] = new_var
-            if isReal(address):
-                hashed_address = "concrete_address_" + str(address)
+        stack.append(path_conditions_and_vars["Ia"])
+
+    def sym_exec_balance(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        address = stack.pop()
+        if isReal(address) and self.params.USE_GLOBAL_BLOCKCHAIN:
+            new_var = self.data_source.getBalance(address)
+        else:
+            new_var_name = self.gen.gen_balance_var()
+            if new_var_name in path_conditions_and_vars:
+                new_var = path_conditions_and_vars[new_var_name]
             else:
-                hashed_address = str(address)
-            global_state["balance"][hashed_address] = new_var
-            stack.insert(0, new_var)
+                new_var = BitVec(new_var_name, 256)
+                path_conditions_and_vars[new_var_name] = new_var
+        if isReal(address):
+            hashed_address = "concrete_address_" + str(address)
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "CALLER":  # get caller address
+            hashed_address = self.keys.key(address)
+        global_state["balance"][hashed_address] = new_var
+        stack.append(new_var)
+
+    # get caller address
+    def sym_exec_caller(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # that is directly responsible for this execution
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["sender_address"])
-    elif instr_parts[0] == "ORIGIN":  # get execution origination address
+        stack.append(global_state["sender_address"])
+
+    # get execution origination address
+    def sym_exec_origin(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["origin"])
-    elif instr_parts[0] == "CALLVALUE":  # get value of this transaction
+        stack.append(global_state["origin"])
+
+    # get value of this transaction
+    def sym_exec_callvalue(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["value"])
-    elif instr_parts[0] == "CALLDATALOAD":  # from input data from environment
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            position = stack.pop(0)
-            if global_params.INPUT_STATE and global_state["callData"]:
-                callData = global_state["callData"]
-                start = position * 2
-                end = start + 64
-                while end > len(callData):
-                    # append with zeros if insufficient length
-                    callData = callData + "0"
-                stack.insert(0, int(callData[start:end], 16))
-            else:
-                new_var_name = gen.gen_data_var(position)
-                if new_var_name in path_conditions_and_vars:
-                    new_var = path_conditions_and_vars[new_var_name]
-                else:
-                    new_var = BitVec(new_var_name, 256)
-                    path_conditions_and_vars[new_var_name] = new_var
-                stack.insert(0, new_var)
+        stack.append(global_state["value"])
+
+    # from input data from environment
+    def sym_exec_calldataload(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        position = stack.pop()
+        if self.params.INPUT_STATE and global_state["callData"]:
+            callData = global_state["callData"]
+            start = position * 2
+            end = start + 64
+            while end > len(callData):
+                # append with zeros if insufficient length
+                callData = callData + "0"
+            stack.append(int(callData[start:end], 16))
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "CALLDATASIZE":
+            new_var_name = self.gen.gen_data_var(position)
+            if new_var_name in path_conditions_and_vars:
+                new_var = path_conditions_and_vars[new_var_name]
+            else:
+                new_var = BitVec(new_var_name, 256)
+                path_conditions_and_vars[new_var_name] = new_var
+            stack.append(new_var)
+
+    def sym_exec_calldatasize(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        if global_params.INPUT_STATE and global_state["callData"]:
-            stack.insert(0, len(global_state["callData"])/2)
+        if self.params.INPUT_STATE and global_state["callData"]:
+            stack.append(len(global_state["callData"])/2)
         else:
-            new_var_name = gen.gen_data_size()
+            new_var_name = self.gen.gen_data_size()
             if new_var_name in path_conditions_and_vars:
                 new_var = path_conditions_and_vars[new_var_name]
             else:
                 new_var = BitVec(new_var_name, 256)
                 path_conditions_and_vars[new_var_name] = new_var
-            stack.insert(0, new_var)
-    elif instr_parts[0] == "CALLDATACOPY":  # Copy input data to memory
+            stack.append(new_var)
+
+    # The words of the memory a copy of `size` bytes to `address` writes are
+    # not known, the bytes copied are not modelled
+    def clobber_memory(self, mem, address, size, path_conditions_and_vars):
+        def fresh():
+            new_var_name = self.gen.gen_arbitrary_var()
+            new_var = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = new_var
+            return new_var
+        mem.clobber(address, size, fresh)
+
+    # Copy input data to memory
+    def sym_exec_calldatacopy(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         #  TODO: Don't know how to simulate this yet
-        if len(stack) > 2:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
-            stack.pop(0)
-            stack.pop(0)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "CODESIZE":
-        if c_name.endswith('.disasm'):
-            evm_file_name = c_name[:-7]
-        else:
-            evm_file_name = c_name
-        with open(evm_file_name, 'r') as evm_file:
-            evm = evm_file.read()[:-1]
-            code_size = len(evm)/2
-            stack.insert(0, code_size)
-    elif instr_parts[0] == "CODECOPY":  # Copy code running in current env to memory
+        global_state["pc"] = global_state["pc"] + 1
+        mem_address = stack.pop()
+        stack.pop()
+        size = stack.pop()
+        self.clobber_memory(mem, mem_address, size, path_conditions_and_vars)
+
+    def sym_exec_codesize(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        code_size = len(self.evm.strip())/2
+        stack.append(code_size)
+
+    # Copy code running in current env to memory
+    def sym_exec_codecopy(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         #  TODO: Don't know how to simulate this yet
         # Need an example to test
-        if len(stack) > 2:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
-            stack.pop(0)
-            stack.pop(0)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "GASPRICE":
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["gas_price"])
-    elif instr_parts[0] == "EXTCODESIZE":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            address = stack.pop(0)
-            if isReal(address) and global_params.USE_GLOBAL_BLOCKCHAIN:
-                code = data_source.getCode(address)
-                stack.insert(0, len(code)/2)
-            else:
-                #not handled yet
-                stack.insert(0, 0)
+        mem_address = stack.pop()
+        stack.pop()
+        size = stack.pop()
+        self.clobber_memory(mem, mem_address, size, path_conditions_and_vars)
+
+    def sym_exec_gasprice(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stack.append(global_state["gas_price"])
+
+    def sym_exec_extcodesize(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        address = stack.pop()
+        if isReal(address) and self.params.USE_GLOBAL_BLOCKCHAIN:
+            code = self.data_source.getCode(address)
+            stack.append(len(code)/2)
         else:
-            raise ValueError('STACK underflow')
+            #not handled yet
+            stack.append(0)
+
+    # Copy the code of an account to memory
+    def sym_exec_extcodecopy(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stack.pop()
+        mem_address = stack.pop()
+        stack.pop()
+        size = stack.pop()
+        self.clobber_memory(mem, mem_address, size, path_conditions_and_vars)
+
     #
     #  40s: Block Information
     #
-    elif instr_parts[0] == "BLOCKHASH":  # information from block header
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
-            new_var_name = "IH_blockhash"
-            if new_var_name in path_conditions_and_vars:
-                new_var = path_conditions_and_vars[new_var_name]
-            else:
-                new_var = BitVec(new_var_name, 256)
-                path_conditions_and_vars[new_var_name] = new_var
-            stack.insert(0, new_var)
+
+    # information from block header
+    def sym_exec_blockhash(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stack.pop()
+        new_var_name = "IH_blockhash"
+        if new_var_name in path_conditions_and_vars:
+            new_var = path_conditions_and_vars[new_var_name]
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "COINBASE":  # information from block header
+            new_var = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = new_var
+        stack.append(new_var)
+
+    # information from block header
+    def sym_exec_coinbase(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["currentCoinbase"])
-    elif instr_parts[0] == "TIMESTAMP":  # information from block header
+        stack.append(global_state["currentCoinbase"])
+
+    # information from block header
+    def sym_exec_timestamp(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["currentTimestamp"])
-    elif instr_parts[0] == "NUMBER":  # information from block header
+        stack.append(global_state["currentTimestamp"])
+
+    # information from block header
+    def sym_exec_number(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["currentNumber"])
-    elif instr_parts[0] == "DIFFICULTY":  # information from block header
+        stack.append(global_state["currentNumber"])
+
+    # information from block header
+    def sym_exec_difficulty(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["currentDifficulty"])
-    elif instr_parts[0] == "GASLIMIT":  # information from block header
+        stack.append(global_state["currentDifficulty"])
+
+    # information from block header
+    def sym_exec_gaslimit(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        stack.insert(0, global_state["currentGasLimit"])
+        stack.append(global_state["currentGasLimit"])
+
     #
     #  50s: Stack, Memory, Storage, and Flow Information
     #
-    elif instr_parts[0] == "POP":
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
+
+    def sym_exec_pop(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stack.pop()
+
+    def sym_exec_mload(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        address = stack.pop()
+        current_miu_i = global_state["miu_i"]
+        if isReal(address) and address in mem:
+            temp = long(math.ceil((address + 32) / float(32)))
+            current_miu_i = expand_memory(current_miu_i, temp)
+            value = self.load_word(mem, address, path_conditions_and_vars)
+            stack.append(value)
+            log.debug("temp: " + str(temp))
+            log.debug("current_miu_i: " + str(current_miu_i))
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MLOAD":
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            address = stack.pop(0)
-            current_miu_i = global_state["miu_i"]
-            if isReal(address) and address in mem:
-                temp = long(math.ceil((address + 32) / float(32)))
-                if temp > current_miu_i:
+            temp = ((address + 31) / 32) + 1
+            if isReal(current_miu_i):
+                current_miu_i = BitVecVal(current_miu_i, 256)
+            expression = current_miu_i < temp
+            self.solver.push()
+            self.solver.add(expression)
+            if self.solver.check() != unsat:
+                # this means that it is possibly that current_miu_i < temp
+                if expression == True:
                     current_miu_i = temp
-                value = mem[address]
-                stack.insert(0, value)
-                log.debug("temp: " + str(temp))
-                log.debug("current_miu_i: " + str(current_miu_i))
-            else:
-                temp = ((address + 31) / 32) + 1
-                if isReal(current_miu_i):
-                    current_miu_i = BitVecVal(current_miu_i, 256)
-                expression = current_miu_i < temp
-                solver.push()
-                solver.add(expression)
-                if solver.check() != unsat:
-                    # this means that it is possibly that current_miu_i < temp
-                    if expression == True:
-                        current_miu_i = temp
-                    else:
-                        current_miu_i = If(expression,temp,current_miu_i)
-                solver.pop()
-                new_var_name = gen.gen_mem_var(address)
-                if new_var_name in path_conditions_and_vars:
-                    new_var = path_conditions_and_vars[new_var_name]
-                else:
-                    new_var = BitVec(new_var_name, 256)
-                    path_conditions_and_vars[new_var_name] = new_var
-                stack.insert(0, new_var)
-                if isReal(address):
-                    mem[address] = new_var
                 else:
-                    mem[str(address)] = new_var
-                log.debug("temp: " + str(temp))
-                log.debug("current_miu_i: " + str(current_miu_i))
-            global_state["miu_i"] = current_miu_i
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MSTORE":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            stored_address = stack.pop(0)
-            stored_value = stack.pop(0)
-            current_miu_i = global_state["miu_i"]
-            if isReal(stored_address):
-                temp = long(math.ceil((stored_address + 32) / float(32)))
-                if temp > current_miu_i:
-                    current_miu_i = temp
-                mem[stored_address] = stored_value  # note that the stored_value could be symbolic
-                log.debug("temp: " + str(temp))
-                log.debug("current_miu_i: " + str(current_miu_i))
+                    current_miu_i = If(expression,temp,current_miu_i)
+            self.solver.pop()
+            if isReal(address):
+                stack.append(self.load_initial_word(mem, address, path_conditions_and_vars))
             else:
-                log.debug("temp: " + str(stored_address))
-                temp = ((stored_address + 31) / 32) + 1
-                if isReal(current_miu_i):
-                    current_miu_i = BitVecVal(current_miu_i, 256)
-                log.debug("current_miu_i: " + str(current_miu_i))
-                expression = current_miu_i < temp
-                log.debug("Expression: " + str(expression))
-                solver.push()
-                solver.add(expression)
-                if solver.check() != unsat:
-                    # this means that it is possibly that current_miu_i < temp
-                    if expression:
-                        current_miu_i = temp
-                    else:
-                        current_miu_i = If(expression,temp,current_miu_i)
-                solver.pop()
-                mem.clear()  # very conservative
-                mem[str(stored_address)] = stored_value
-                log.debug("temp: " + str(temp))
-                log.debug("current_miu_i: " + str(current_miu_i))
-            global_state["miu_i"] = current_miu_i
+                stack.append(mem.select(address))
+            log.debug("temp: %s", temp)
+            log.debug("current_miu_i: %s", current_miu_i)
+        global_state["miu_i"] = current_miu_i
+
+    # The value at `address` once the stores at symbolic addresses in `writes`
+    # were made over `value`. A store overwrites it when its address may be the
+    # same, which is decided by the addresses themselves when they can tell,
+    # and by the solver or the model of the path otherwise.
+    def apply_writes(self, value, address, writes, path_conditions_and_vars):
+        model = None
+        for stored_address, stored_value in writes:
+            if isReal(stored_address) and isReal(address):
+                if stored_address == address:
+                    value = stored_value
+                continue
+            if is_expr(address) and is_expr(stored_address) and stored_address.eq(address):
+                value = stored_value
+                continue
+            same = simplify(stored_address == address)
+            if is_false(same):
+                continue
+            if is_true(same):
+                value = stored_value
+                continue
+            if model is None:
+                model = get_path_model(path_conditions_and_vars) or False
+            if model is False or not is_true(model.eval(same, model_completion=True)):
+                self.solver.push()
+                self.solver.add(same)
+                may_alias = self.solver.check() != unsat
+                self.solver.pop()
+                if not may_alias:
+                    continue
+            value = If(same, to_symbolic(stored_value), to_symbolic(value))
+        return value
+
+    # The word at a concrete address of the memory
+    def load_word(self, mem, address, path_conditions_and_vars):
+        value, writes = mem.load(address)
+        if not writes:
+            return value
+        value = self.apply_writes(value, address, writes, path_conditions_and_vars)
+        mem.set_loaded(address, value)
+        return value
+
+    # The word at a concrete address where no word was stored, which is the
+    # one that was there before the memory was written
+    def load_initial_word(self, mem, address, path_conditions_and_vars):
+        new_var_name = self.gen.gen_mem_var(address)
+        if new_var_name in path_conditions_and_vars:
+            new_var = path_conditions_and_vars[new_var_name]
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "MSTORE8":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            stored_address = stack.pop(0)
-            temp_value = stack.pop(0)
-            stored_value = temp_value % 256  # get the least byte
-            current_miu_i = global_state["miu_i"]
-            if isReal(stored_address):
-                temp = long(math.ceil((stored_address + 1) / float(32)))
-                if temp > current_miu_i:
-                    current_miu_i = temp
-                mem[stored_address] = stored_value  # note that the stored_value could be symbolic
-            else:
-                temp = (stored_address / 32) + 1
-                if isReal(current_miu_i):
-                    current_miu_i = BitVecVal(current_miu_i, 256)
-                expression = current_miu_i < temp
-                solver.push()
-                solver.add(expression)
-                if solver.check() != unsat:
-                    # this means that it is possibly that current_miu_i < temp
-                    if expression:
-                        current_miu_i = temp
-                    else:
-                        current_miu_i = If(expression,temp,current_miu_i)
-                solver.pop()
-                mem.clear()  # very conservative
-                mem[str(stored_address)] = stored_value
-            global_state["miu_i"] = current_miu_i
+            new_var = BitVec(new_var_name, 256)
+            path_conditions_and_vars[new_var_name] = new_var
+        mem.set_loaded(address, new_var, initial=True)
+        return self.load_word(mem, address, path_conditions_and_vars)
+
+    def sym_exec_mstore(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stored_address = stack.pop()
+        stored_value = stack.pop()
+        current_miu_i = global_state["miu_i"]
+        if isReal(stored_address):
+            temp = long(math.ceil((stored_address + 32) / float(32)))
+            current_miu_i = expand_memory(current_miu_i, temp)
+            mem.store(stored_address, stored_value)  # note that the stored_value could be symbolic
+            log.debug("temp: " + str(temp))
+            log.debug("current_miu_i: " + str(current_miu_i))
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SLOAD":
-        if len(stack) > 0:
-            global_state["pc"] = global_state["pc"] + 1
-            address = stack.pop(0)
-            if isReal(address):
-                if address in global_state["Ia"]:
-                    value = global_state["Ia"][address]
-                    stack.insert(0, value)
-                else:
-                    stack.insert(0, 0)
-            else:
-                new_var_name = gen.gen_owner_store_var(address)
-                if new_var_name in path_conditions_and_vars:
-                    new_var = path_conditions_and_vars[new_var_name]
+            log.debug("temp: %s", stored_address)
+            temp = ((stored_address + 31) / 32) + 1
+            if isReal(current_miu_i):
+                current_miu_i = BitVecVal(current_miu_i, 256)
+            log.debug("current_miu_i: %s", current_miu_i)
+            expression = current_miu_i < temp
+            log.debug("Expression: %s", expression)
+            self.solver.push()
+            self.solver.add(expression)
+            if self.solver.check() != unsat:
+                # this means that it is possibly that current_miu_i < temp
+                if is_true(expression):
+                    current_miu_i = temp
                 else:
-                    new_var = BitVec(new_var_name, 256)
-                    path_conditions_and_vars[new_var_name] = new_var
-                stack.insert(0, new_var)
-                if isReal(address):
-                    global_state["Ia"][address] = new_var
+                    current_miu_i = If(expression,temp,current_miu_i)
+            self.solver.pop()
+            mem.store(stored_address, stored_value)
+            log.debug("temp: %s", temp)
+            log.debug("current_miu_i: %s", current_miu_i)
+        global_state["miu_i"] = current_miu_i
+
+    def sym_exec_mstore8(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stored_address = stack.pop()
+        temp_value = stack.pop()
+        stored_value = temp_value & 0xff  # get the least byte
+        current_miu_i = global_state["miu_i"]
+        if isReal(stored_address):
+            temp = long(math.ceil((stored_address + 1) / float(32)))
+            current_miu_i = expand_memory(current_miu_i, temp)
+            # the byte replaces one of every word stored over it. When there
+            # is none, it is the first one of a word of zeros, as the memory is
+            # before it is written, unless words were stored over the others.
+            words = [address for address in mem.words if stored_address - 32 < address <= stored_address]
+            if not words and any(stored_address < address < stored_address + 32 for address in mem.words):
+                self.load_initial_word(mem, stored_address, path_conditions_and_vars)
+                words = [stored_address]
+            elif not words:
+                mem.set_loaded(stored_address, 0, initial=True)
+                words = [stored_address]
+            for address in words:
+                word = self.load_word(mem, address, path_conditions_and_vars)
+                mem.store(address, store_byte(word, stored_address - address, stored_value))
+        else:
+            temp = (stored_address / 32) + 1
+            if isReal(current_miu_i):
+                current_miu_i = BitVecVal(current_miu_i, 256)
+            expression = current_miu_i < temp
+            self.solver.push()
+            self.solver.add(expression)
+            if self.solver.check() != unsat:
+                # this means that it is possibly that current_miu_i < temp
+                if is_true(expression):
+                    current_miu_i = temp
                 else:
-                    global_state["Ia"][str(address)] = new_var
+                    current_miu_i = If(expression,temp,current_miu_i)
+            self.solver.pop()
+            mem.store(stored_address, store_byte(mem.select(stored_address), 0, stored_value))
+        global_state["miu_i"] = current_miu_i
+
+    # The storage keeps the words at the addresses that were stored or loaded,
+    # and every store is logged in storage_writes. A load takes the word at its
+    # address and folds in the stores made after it that may be at the same
+    # address: those at symbolic addresses, and for a load at a symbolic
+    # address those at concrete ones as well.
+    # Whether a concrete storage address was computed from a hash, as those of
+    # the entries of a mapping and the elements of a dynamic array are: it is
+    # a hash computed by SHA3 or a little above one
+    def is_hashed_slot(self, address):
+        i = bisect.bisect_right(self.sha3_hashes, address)
+        return i > 0 and address - self.sha3_hashes[i - 1] < HASHED_SLOT_RANGE
+
+    def sym_exec_sload(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        address = stack.pop()
+        storage = global_state["Ia"]
+        if isReal(address):
+            key = address
+            value = storage.get(address)
+            # a word that was not stored is 0, but for the words of mappings
+            # and arrays which are as unknown as those at symbolic addresses
+            if value is None and not self.is_hashed_slot(address):
+                value = 0
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SSTORE":
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            stored_address = stack.pop(0)
-            stored_value = stack.pop(0)
-            if isReal(stored_address):
-                # note that the stored_value could be unknown
-                global_state["Ia"][stored_address] = stored_value
+            key = self.keys.key(address)
+            value = storage.get(key)
+        if value is None:
+            new_var_name = self.gen.gen_owner_store_var(key)
+            if new_var_name in path_conditions_and_vars:
+                value = path_conditions_and_vars[new_var_name]
             else:
-                global_state["Ia"].clear()  # very conservative
-                # note that the stored_value could be unknown
-                global_state["Ia"][str(stored_address)] = stored_value
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "JUMP":
-        if len(stack) > 0:
-            target_address = stack.pop(0)
-            if isSymbolic(target_address):
-                target_address = int(str(simplify(target_address)))
-            vertices[start].set_jump_target(target_address)
-            if target_address not in edges[start]:
-                edges[start].append(target_address)
+                value = BitVec(new_var_name, 256)
+                path_conditions_and_vars[new_var_name] = value
+            # the word that was there before the storage was written
+            storage[key] = value
+            global_state["storage_since"].pop(key, None)
+        writes = global_state["storage_writes"]
+        since = global_state["storage_since"].get(key, 0)
+        if since < len(writes):
+            value = self.apply_writes(value, address, writes[since:], path_conditions_and_vars)
+            storage[key] = value
+            global_state["storage_since"][key] = len(writes)
+        stack.append(value)
+
+    def sym_exec_sstore(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        stored_address = stack.pop()
+        stored_value = stack.pop()
+        writes = global_state["storage_writes"]
+        writes.append((stored_address, stored_value))
+        if isReal(stored_address):
+            key = stored_address
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "JUMPI":
+            key = self.keys.key(stored_address)
+        # note that the stored_value could be unknown
+        global_state["Ia"][key] = stored_value
+        global_state["storage_since"][key] = len(writes)
+
+    def sym_exec_jump(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        target_address = stack.pop()
+        if isSymbolic(target_address):
+            target_address = int(str(simplify(target_address)))
+        self.vertices[start].set_jump_target(target_address)
+        if target_address not in self.edges[start]:
+            self.edges[start].append(target_address)
+
+    def sym_exec_jumpi(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # We need to prepare two branches
-        if len(stack) > 1:
-            target_address = stack.pop(0)
-            if isSymbolic(target_address):
-                target_address = int(str(simplify(target_address)))
-            vertices[start].set_jump_target(target_address)
-            flag = stack.pop(0)
-            branch_expression = (BitVecVal(0, 1) == BitVecVal(1, 1))
-            if isReal(flag):
-                if flag != 0:
-                    branch_expression = True
-            else:
-                branch_expression = (flag != 0)
-            vertices[start].set_branch_expression(branch_expression)
-            if target_address not in edges[start]:
-                edges[start].append(target_address)
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "PC":
-        stack.insert(0, global_state["pc"])
+        target_address = stack.pop()
+        if isSymbolic(target_address):
+            target_address = int(str(simplify(target_address)))
+        self.vertices[start].set_jump_target(target_address)
+        flag = stack.pop()
+        # a concrete flag gives a Python bool, decided without the solver
+        branch_expression = (flag != 0)
+        self.vertices[start].set_branch_expression(branch_expression)
+        if target_address not in self.edges[start]:
+            self.edges[start].append(target_address)
+
+    def sym_exec_pc(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        stack.append(global_state["pc"])
         global_state["pc"] = global_state["pc"] + 1
-    elif instr_parts[0] == "MSIZE":
+
+    def sym_exec_msize(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
         msize = 32 * global_state["miu_i"]
-        stack.insert(0, msize)
-    elif instr_parts[0] == "GAS":
+        stack.append(msize)
+
+    def sym_exec_gas(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # In general, we do not have this precisely. It depends on both
         # the initial gas and the amount has been depleted
         # we need o think about this in the future, in case precise gas
         # can be tracked
         global_state["pc"] = global_state["pc"] + 1
-        new_var_name = gen.gen_gas_var()
+        new_var_name = self.gen.gen_gas_var()
         new_var = BitVec(new_var_name, 256)
         path_conditions_and_vars[new_var_name] = new_var
-        stack.insert(0, new_var)
-    elif instr_parts[0] == "JUMPDEST":
+        stack.append(new_var)
+
+    def sym_exec_jumpdest(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # Literally do nothing
         global_state["pc"] = global_state["pc"] + 1
+
     #
     #  60s & 70s: Push Operations
     #
-    elif instr_parts[0].startswith('PUSH', 0):  # this is a push instruction
-        position = int(instr_parts[0][4:], 10)
+
+    def sym_exec_push(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        position = instr.opcode - PUSH1 + 1
         global_state["pc"] = global_state["pc"] + 1 + position
-        pushed_value = int(instr_parts[1], 16)
-        stack.insert(0, pushed_value)
-        if global_params.UNIT_TEST == 3: # test evm symbolic
-            stack[0] = BitVecVal(stack[0], 256)
+        stack.append(instr.push_value)
+        if self.params.UNIT_TEST == 3: # test evm symbolic
+            stack[-1] = BitVecVal(stack[-1], 256)
+
     #
     #  80s: Duplication Operations
     #
-    elif instr_parts[0].startswith("DUP", 0):
+
+    def sym_exec_dup(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        position = int(instr_parts[0][3:], 10) - 1
-        if len(stack) > position:
-            duplicate = stack[position]
-            stack.insert(0, duplicate)
-        else:
-            raise ValueError('STACK underflow')
+        position = instr.opcode - DUP1
+        duplicate = stack[-position - 1]
+        stack.append(duplicate)
 
     #
     #  90s: Swap Operations
     #
-    elif instr_parts[0].startswith("SWAP", 0):
+
+    def sym_exec_swap(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
-        position = int(instr_parts[0][4:], 10)
-        if len(stack) > position:
-            temp = stack[position]
-            stack[position] = stack[0]
-            stack[0] = temp
-        else:
-            raise ValueError('STACK underflow')
+        position = instr.opcode - SWAP1 + 1
+        temp = stack[-position - 1]
+        stack[-position - 1] = stack[-1]
+        stack[-1] = temp
 
     #
     #  a0s: Logging Operations
     #
-    elif instr_parts[0] in ("LOG0", "LOG1", "LOG2", "LOG3", "LOG4"):
+
+    def sym_exec_log(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         global_state["pc"] = global_state["pc"] + 1
         # We do not simulate these log operations
-        num_of_pops = 2 + int(instr_parts[0][3:])
+        num_of_pops = 2 + instr.opcode - LOG0
         while num_of_pops > 0:
-            stack.pop(0)
+            stack.pop()
             num_of_pops -= 1
 
     #
     #  f0s: System Operations
     #
-    elif instr_parts[0] == "CALL":
+
+    def sym_exec_call(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # TODO: Need to handle miu_i
-        if len(stack) > 6:
-            global_state["pc"] = global_state["pc"] + 1
-            outgas = stack.pop(0)
-            recipient = stack.pop(0)
-            transfer_amount = stack.pop(0)
-            start_data_input = stack.pop(0)
-            size_data_input = stack.pop(0)
-            start_data_output = stack.pop(0)
-            size_data_ouput = stack.pop(0)
-            # in the paper, it is shaky when the size of data output is
-            # min of stack[6] and the | o |
-
-            if isReal(transfer_amount):
-                if transfer_amount == 0:
-                    stack.insert(0, 1)   # x = 0
-                    return
-
-            # Let us ignore the call depth
-            balance_ia = global_state["balance"]["Ia"]
-            is_enough_fund = (balance_ia < transfer_amount)
-            solver.push()
-            solver.add(is_enough_fund)
-
-            if solver.check() == unsat:
-                # this means not enough fund, thus the execution will result in exception
-                solver.pop()
-                stack.insert(0, 0)   # x = 0
+        global_state["pc"] = global_state["pc"] + 1
+        outgas = stack.pop()
+        recipient = stack.pop()
+        transfer_amount = stack.pop()
+        start_data_input = stack.pop()
+        size_data_input = stack.pop()
+        start_data_output = stack.pop()
+        size_data_ouput = stack.pop()
+        # in the paper, it is shaky when the size of data output is
+        # min of stack[6] and the | o |
+        self.clobber_memory(mem, start_data_output, size_data_ouput, path_conditions_and_vars)
+
+        if isReal(transfer_amount):
+            if transfer_amount == 0:
+                stack.append(1)   # x = 0
+                return
+
+        # Let us ignore the call depth
+        balance_ia = global_state["balance"]["Ia"]
+        is_enough_fund = (balance_ia < transfer_amount)
+        self.solver.push()
+        self.solver.add(is_enough_fund)
+
+        if self.solver.check() == unsat:
+            # this means not enough fund, thus the execution will result in exception
+            self.solver.pop()
+            stack.append(0)   # x = 0
+        else:
+            # the execution is possibly okay
+            stack.append(1)   # x = 1
+            self.solver.pop()
+            self.solver.add(is_enough_fund)
+            self.taint.add_constraint(path_conditions_and_vars, is_enough_fund)
+            new_balance_ia = (balance_ia - transfer_amount)
+            global_state["balance"]["Ia"] = new_balance_ia
+            address_is = path_conditions_and_vars["Is"]
+            address_is = (address_is & CONSTANT_ONES_159)
+            boolean_expression = (recipient != address_is)
+            self.solver.push()
+            self.solver.add(boolean_expression)
+            if self.solver.check() == unsat:
+                self.solver.pop()
+                new_balance_is = (global_state["balance"]["Is"] + transfer_amount)
+                global_state["balance"]["Is"] = new_balance_is
             else:
-                # the execution is possibly okay
-                stack.insert(0, 1)   # x = 1
-                solver.pop()
-                solver.add(is_enough_fund)
-                path_conditions_and_vars["path_condition"].append(is_enough_fund)
-                new_balance_ia = (balance_ia - transfer_amount)
-                global_state["balance"]["Ia"] = new_balance_ia
-                address_is = path_conditions_and_vars["Is"]
-                address_is = (address_is & CONSTANT_ONES_159)
-                boolean_expression = (recipient != address_is)
-                solver.push()
-                solver.add(boolean_expression)
-                if solver.check() == unsat:
-                    solver.pop()
-                    new_balance_is = (global_state["balance"]["Is"] + transfer_amount)
-                    global_state["balance"]["Is"] = new_balance_is
+                self.solver.pop()
+                if isReal(recipient):
+                    new_address_name = "concrete_address_" + str(recipient)
                 else:
-                    solver.pop()
-                    if isReal(recipient):
-                        new_address_name = "concrete_address_" + str(recipient)
-                    else:
-                        new_address_name = gen.gen_arbitrary_address_var()
-                    old_balance_name = gen.gen_arbitrary_var()
-                    old_balance = BitVec(old_balance_name, 256)
-                    path_conditions_and_vars[old_balance_name] = old_balance
-                    constraint = (old_balance >= 0)
-                    solver.add(constraint)
-                    path_conditions_and_vars["path_condition"].append(constraint)
-                    new_balance = (old_balance + transfer_amount)
-                    global_state["balance"][new_address_name] = new_balance
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "CALLCODE":
+                    new_address_name = self.gen.gen_arbitrary_address_var()
+                old_balance_name = self.gen.gen_arbitrary_var()
+                old_balance = BitVec(old_balance_name, 256)
+                path_conditions_and_vars[old_balance_name] = old_balance
+                constraint = (old_balance >= 0)
+                self.solver.add(constraint)
+                self.taint.add_constraint(path_conditions_and_vars, constraint)
+                new_balance = (old_balance + transfer_amount)
+                global_state["balance"][new_address_name] = new_balance
+
+    def sym_exec_callcode(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # TODO: Need to handle miu_i
-        if len(stack) > 6:
-            global_state["pc"] = global_state["pc"] + 1
-            outgas = stack.pop(0)
-            stack.pop(0) # this is not used as recipient
-            transfer_amount = stack.pop(0)
-            start_data_input = stack.pop(0)
-            size_data_input = stack.pop(0)
-            start_data_output = stack.pop(0)
-            size_data_ouput = stack.pop(0)
-            # in the paper, it is shaky when the size of data output is
-            # min of stack[6] and the | o |
-
-            if isReal(transfer_amount):
-                if transfer_amount == 0:
-                    stack.insert(0, 1)   # x = 0
-                    return
-
-            # Let us ignore the call depth
-            balance_ia = global_state["balance"]["Ia"]
-            is_enough_fund = (balance_ia < transfer_amount)
-            solver.push()
-            solver.add(is_enough_fund)
-
-            if solver.check() == unsat:
-                # this means not enough fund, thus the execution will result in exception
-                solver.pop()
-                stack.insert(0, 0)   # x = 0
-            else:
-                # the execution is possibly okay
-                stack.insert(0, 1)   # x = 1
-                solver.pop()
-                solver.add(is_enough_fund)
-                path_conditions_and_vars["path_condition"].append(is_enough_fund)
+        global_state["pc"] = global_state["pc"] + 1
+        outgas = stack.pop()
+        stack.pop() # this is not used as recipient
+        transfer_amount = stack.pop()
+        start_data_input = stack.pop()
+        size_data_input = stack.pop()
+        start_data_output = stack.pop()
+        size_data_ouput = stack.pop()
+        # in the paper, it is shaky when the size of data output is
+        # min of stack[6] and the | o |
+        self.clobber_memory(mem, start_data_output, size_data_ouput, path_conditions_and_vars)
+
+        if isReal(transfer_amount):
+            if transfer_amount == 0:
+                stack.append(1)   # x = 0
+                return
+
+        # Let us ignore the call depth
+        balance_ia = global_state["balance"]["Ia"]
+        is_enough_fund = (balance_ia < transfer_amount)
+        self.solver.push()
+        self.solver.add(is_enough_fund)
+
+        if self.solver.check() == unsat:
+            # this means not enough fund, thus the execution will result in exception
+            self.solver.pop()
+            stack.append(0)   # x = 0
         else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "RETURN":
+            # the execution is possibly okay
+            stack.append(1)   # x = 1
+            self.solver.pop()
+            self.solver.add(is_enough_fund)
+            self.taint.add_constraint(path_conditions_and_vars, is_enough_fund)
+
+    def sym_exec_return(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
         # TODO: Need to handle miu_i
-        if len(stack) > 1:
-            global_state["pc"] = global_state["pc"] + 1
-            stack.pop(0)
-            stack.pop(0)
-            # TODO
-            pass
-        else:
-            raise ValueError('STACK underflow')
-    elif instr_parts[0] == "SUICIDE":
         global_state["pc"] = global_state["pc"] + 1
-        recipient = stack.pop(0)
+        stack.pop()
+        stack.pop()
+        # TODO
+        pass
+
+    def sym_exec_suicide(self, start, instr, stack, mem, global_state, path_conditions_and_vars):
+        global_state["pc"] = global_state["pc"] + 1
+        recipient = stack.pop()
         transfer_amount = global_state["balance"]["Ia"]
         global_state["balance"]["Ia"] = 0
         if isReal(recipient):
             new_address_name = "concrete_address_" + str(recipient)
         else:
-            new_address_name = gen.gen_arbitrary_address_var()
-        old_balance_name = gen.gen_arbitrary_var()
+            new_address_name = self.gen.gen_arbitrary_address_var()
+        old_balance_name = self.gen.gen_arbitrary_var()
         old_balance = BitVec(old_balance_name, 256)
         path_conditions_and_vars[old_balance_name] = old_balance
         constraint = (old_balance >= 0)
-        solver.add(constraint)
-        path_conditions_and_vars["path_condition"].append(constraint)
+        self.solver.add(constraint)
+        self.taint.add_constraint(path_conditions_and_vars, constraint)
         new_balance = (old_balance + transfer_amount)
         global_state["balance"][new_address_name] = new_balance
-        # TODO
-        return
 
-    else:
-        log.debug("UNKNOWN INSTRUCTION: " + instr_parts[0])
-        if global_params.UNIT_TEST == 2 or global_params.UNIT_TEST == 3:
-            log.critical("Unkown instruction: %s" % instr_parts[0])
-            exit(UNKOWN_INSTRUCTION)
-        raise Exception('UNKNOWN INSTRUCTION: ' + instr_parts[0])
+    def run_callstack_attack(self):
+        result = check_callstack_attack(self.disasm)
+
+        if not self.isTesting():
+            log.info("\t  CallStack Attack: \t %s", result)
+        self.results['callstack'] = result
+
+
+# sym_exec_handlers[name] is the method of Analyzer that symbolically executes the opcode
+sym_exec_handlers = {
+    "STOP": Analyzer.sym_exec_stop,
+    "ADD": Analyzer.sym_exec_add,
+    "MUL": Analyzer.sym_exec_mul,
+    "SUB": Analyzer.sym_exec_sub,
+    "DIV": Analyzer.sym_exec_div,
+    "SDIV": Analyzer.sym_exec_sdiv,
+    "MOD": Analyzer.sym_exec_mod,
+    "SMOD": Analyzer.sym_exec_smod,
+    "ADDMOD": Analyzer.sym_exec_addmod,
+    "MULMOD": Analyzer.sym_exec_mulmod,
+    "EXP": Analyzer.sym_exec_exp,
+    "SIGNEXTEND": Analyzer.sym_exec_signextend,
+    "LT": Analyzer.sym_exec_lt,
+    "GT": Analyzer.sym_exec_gt,
+    "SLT": Analyzer.sym_exec_slt,
+    "SGT": Analyzer.sym_exec_sgt,
+    "EQ": Analyzer.sym_exec_eq,
+    "ISZERO": Analyzer.sym_exec_iszero,
+    "AND": Analyzer.sym_exec_and,
+    "OR": Analyzer.sym_exec_or,
+    "XOR": Analyzer.sym_exec_xor,
+    "NOT": Analyzer.sym_exec_not,
+    "BYTE": Analyzer.sym_exec_byte,
+    "SHA3": Analyzer.sym_exec_sha3,
+    "ADDRESS": Analyzer.sym_exec_address,
+    "BALANCE": Analyzer.sym_exec_balance,
+    "CALLER": Analyzer.sym_exec_caller,
+    "ORIGIN": Analyzer.sym_exec_origin,
+    "CALLVALUE": Analyzer.sym_exec_callvalue,
+    "CALLDATALOAD": Analyzer.sym_exec_calldataload,
+    "CALLDATASIZE": Analyzer.sym_exec_calldatasize,
+    "CALLDATACOPY": Analyzer.sym_exec_calldatacopy,
+    "CODESIZE": Analyzer.sym_exec_codesize,
+    "CODECOPY": Analyzer.sym_exec_codecopy,
+    "GASPRICE": Analyzer.sym_exec_gasprice,
+    "EXTCODESIZE": Analyzer.sym_exec_extcodesize,
+    "EXTCODECOPY": Analyzer.sym_exec_extcodecopy,
+    "BLOCKHASH": Analyzer.sym_exec_blockhash,
+    "COINBASE": Analyzer.sym_exec_coinbase,
+    "TIMESTAMP": Analyzer.sym_exec_timestamp,
+    "NUMBER": Analyzer.sym_exec_number,
+    "DIFFICULTY": Analyzer.sym_exec_difficulty,
+    "GASLIMIT": Analyzer.sym_exec_gaslimit,
+    "POP": Analyzer.sym_exec_pop,
+    "MLOAD": Analyzer.sym_exec_mload,
+    "MSTORE": Analyzer.sym_exec_mstore,
+    "MSTORE8": Analyzer.sym_exec_mstore8,
+    "SLOAD": Analyzer.sym_exec_sload,
+    "SSTORE": Analyzer.sym_exec_sstore,
+    "JUMP": Analyzer.sym_exec_jump,
+    "JUMPI": Analyzer.sym_exec_jumpi,
+    "PC": Analyzer.sym_exec_pc,
+    "MSIZE": Analyzer.sym_exec_msize,
+    "GAS": Analyzer.sym_exec_gas,
+    "JUMPDEST": Analyzer.sym_exec_jumpdest,
+    "LOG0": Analyzer.sym_exec_log,
+    "LOG1": Analyzer.sym_exec_log,
+    "LOG2": Analyzer.sym_exec_log,
+    "LOG3": Analyzer.sym_exec_log,
+    "LOG4": Analyzer.sym_exec_log,
+    "CALL": Analyzer.sym_exec_call,
+    "CALLCODE": Analyzer.sym_exec_callcode,
+    "RETURN": Analyzer.sym_exec_return,
+    "SUICIDE": Analyzer.sym_exec_suicide
+}
+for i in range(32):
+    sym_exec_handlers["PUSH" + str(i + 1)] = Analyzer.sym_exec_push
+for i in range(16):
+    sym_exec_handlers["DUP" + str(i + 1)] = Analyzer.sym_exec_dup
+    sym_exec_handlers["SWAP" + str(i + 1)] = Analyzer.sym_exec_swap
+
+
+# Analyze the contract `contract` from the command line, with the parameters
+# in global_params. The exceptions raised on paths are logged to
+# <contract>.log, the report of REPORT_MODE written to <contract>.report and
+# the profile of PROFILE to <contract>.profile.json.
+def main(contract, bytecode):
+    check_unit_test_file()
+    params = Params()
+    log_file = open(contract + '.log', "w")
+    report_file = open(contract + '.report', 'w') if params.REPORT_MODE else None
+    analyzer = Analyzer(bytecode, params, log_file, report_file)
+    try:
+        analyzer.run()
+        if params.REPORT_MODE:
+            report_time_dependency(contract, analyzer.results)
+    finally:
+        log_file.close()
+        if report_file:
+            report_file.close()
+        report_reentrancy_check(contract, analyzer.reentrancy_all_paths)
+        if analyzer.profile:
+            analyzer.profile.write(contract + '.profile.json')
+        closing_message(contract, analyzer.results)
+        if params.WEB:
+            results_for_web(analyzer.results)
+    return analyzer.results
+
+
+def report_time_dependency(c_name, results):
+    file_name = c_name.split("/")[len(c_name.split("/"))-1].split(".")[0]
+    report_file = file_name + '.report'
+    with open(report_file, 'w') as rfile:
+        if results['time_dependency']:
+            rfile.write("yes\n")
+        else:
+            rfile.write("no\n")
 
-    print_state(stack, mem, global_state)
 
-def check_callstack_attack(disasm):
-    problematic_instructions = ['CALL', 'CALLCODE']
-    for i in xrange(0, len(disasm)):
-        instruction = disasm[i]
-        if instruction[1] in problematic_instructions:
-            error = True
-            for j in xrange(i+1, len(disasm)):
-                if disasm[j][1] in problematic_instructions:
-                    break
-                if disasm[j][1] == 'ISZERO':
-                    error = False
-                    break
-            if error:
-                return True
-    return False
+# The contracts in which a call was checked for reentrancy are listed in
+# re_report.report
+def report_reentrancy_check(c_name, reentrancy_all_paths):
+    if any(reentrancy_all_paths):
+        with open('re_report.report', 'a') as r_report:
+            r_report.write('\n' + (c_name[4:] if len(c_name) > 5 else c_name))
 
-def run_callstack_attack():
-    global results
-    disasm_data = open(c_name).read()
-    instr_pattern = r"([\d]+): ([A-Z]+)([\d]?)(?: 0x)?(\S+)?"
-    instr = re.findall(instr_pattern, disasm_data)
-    result = check_callstack_attack(instr)
 
-    if not isTesting():
-        log.info("\t  CallStack Attack: \t %s", result)
-    results['callstack'] = result
-
-def print_state(stack, mem, global_state):
-    log.debug("STACK: " + str(stack))
-    log.debug("MEM: " + str(mem))
-    log.debug("GLOBAL STATE: " + str(global_state))
+def results_for_web(results):
+    if not results.has_key("callstack"):
+        results["callstack"] = False
+    if not results.has_key("time_dependency"):
+        results["time_dependency"] = False
+    if not results.has_key("reentrancy"):
+        results["reentrancy"] = False
+    if not results.has_key("concurrency"):
+        results["concurrency"] = False
 
-def contains_only_concrete_values(stack):
-    for element in stack:
-        if isSymbolic(element):
-            return False
-    return True
+    print "Callstack Attack:", results['callstack']
+    print "Time Dependency:", results['time_dependency']
+    print "Reentrancy bug:", results['reentrancy']
+    print "Concurrency:", results['concurrency']
+    if not results.get("complete", True):
+        coverage = results["coverage"]
+        print "Timeout: the results are for the %d of %d blocks explored" % (coverage["blocks_visited"], coverage["blocks_total"])
 
-def to_symbolic(number):
-    if isReal(number):
-        return BitVecVal(number, 256)
-    return number
+def closing_message(c_name, results):
+    log.info("\t====== Analysis Completed ======")
+    if global_params.STORE_RESULT:
+        result_file = c_name + '.json'
+        with open(result_file, 'w') as of:
+            of.write(json.dumps(results, indent=1))
+        log.info("Wrote results to %s.", result_file)
 
 if __name__ == '__main__':
-    main(sys.argv[1])
+    with open(sys.argv[1]) as evm_file:
+        main(sys.argv[1], evm_file.read())
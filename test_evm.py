@@ -1,7 +1,9 @@
 import json
 import glob
-import os
-import pickle
+import argparse
+import logging
+import multiprocessing
+import global_params
 from test_evm.global_test_params import *
 from test_evm.evm_unit_test import EvmUnitTest
 
@@ -20,9 +22,33 @@ def status(exit_code):
     if exit_code == 109: return "Incorrect gas tracked"
 
 
+# Run a test in a worker of the pool, the analysis runs in the worker itself
+def run_test(task):
+    testname, testdata, mode, timeout = task
+    current_test = EvmUnitTest(testname, testdata)
+    exit_code = current_test.run_in_process(mode, timeout)
+    # Special case when symExec run into exception but it is correct result
+    if exit_code == EXCEPTION and current_test.is_exception_case():
+        exit_code = PASS
+    return testname, exit_code
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-f", "--files", default="*.json",
+                        help="Pattern of the test files in test_evm/test_data")
+    parser.add_argument("-m", "--mode", type=int, choices=[2, 3], default=2,
+                        help="2 to compare the real values, 3 to compare the symbolic values")
+    parser.add_argument("-j", "--jobs", type=int, default=multiprocessing.cpu_count(),
+                        help="Number of tests run at the same time")
+    parser.add_argument("-t", "--timeout", type=int, default=global_params.GLOBAL_TIMEOUT,
+                        help="Timeout of a test, in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
     test_dir = 'test_evm/test_data'
-    files = glob.glob(test_dir+'/vmArithmeticTest.json')
+    files = sorted(glob.glob(test_dir + '/' + args.files))
     test_cases = {}
 
     num_tests = num_passes =  num_fails = num_nyh_ops = \
@@ -39,19 +65,28 @@ def main():
     print "*****************************************************"
     print "                  *************                      "
     print "                      Start                          "
-    for testname, testdata in list(test_cases.items()):
+
+    # The tests are analyzed by a pool of processes, which import z3 and the
+    # analysis once. A test that runs past its timeout ends by itself with
+    # TIME_OUT. When no test finishes for much longer, a worker is stuck and
+    # the tests that are left are given TIME_OUT.
+    tasks = [(testname, testdata, args.mode, args.timeout) for testname, testdata in test_cases.items()]
+    exit_codes = dict((testname, TIME_OUT) for testname in test_cases)
+    pool = multiprocessing.Pool(args.jobs)
+    try:
+        results = pool.imap_unordered(run_test, tasks)
+        for _ in tasks:
+            testname, exit_code = results.next(args.timeout + 30)
+            exit_codes[testname] = exit_code
+    except multiprocessing.TimeoutError:
+        pass
+    finally:
+        pool.terminate()
+
+    for testname, exit_code in sorted(exit_codes.items()):
         print
         print
         print "===============Loading: %s====================" % testname
-
-        current_test = EvmUnitTest(testname, testdata)
-        pickle.dump(current_test, open("current_test.pickle", "wb"))
-
-        exit_code = current_test.run_test()
-        # Special case when symExec run into exception but it is correct result
-        if exit_code == EXCEPTION and current_test.is_exception_case():
-            exit_code = PASS
-
         print "===============%s!====================" % status(exit_code).upper()
 
         testname = testname.encode('utf8')
@@ -119,12 +154,5 @@ def main():
     print
     print "Incorrect gas tracked", num_incorrect_gas, incorrect_gas
 
-    remove_temporary_files()
-
-
-def remove_temporary_files():
-    if os.path.isfile("./bytecode"): os.system("rm bytecode")
-    if os.path.isfile("./current_test.pickle"): os.system("rm current_test.pickle")
-
 if __name__ == '__main__':
     main()
@@ -32,6 +32,20 @@ class EvmUnitTest(object):
     def run_test(self):
         return self._execute_vm(self.bytecode())
 
+    # Run the test in this process with UNIT_TEST set to `mode` and return
+    # its status, which the analysis gives by exiting as it does when
+    # oyente.py is run
+    def run_in_process(self, mode=2, timeout=None):
+        import symExec
+        params = symExec.Params(UNIT_TEST=mode, GLOBAL_TIMEOUT=timeout or GLOBAL_TIMEOUT)
+        try:
+            symExec.Analyzer(self.bytecode(), params, unit_test=self).run()
+        except SystemExit as e:
+            return e.code or CANT_EVALUATE
+        except Exception:
+            return ERR_EXECUTION
+        return CANT_EVALUATE
+
     def _execute_vm(self, bytecode):
         self._create_bytecode_file(bytecode)
         cmd = os.system('python oyente.py -b -s bytecode')
@@ -44,9 +58,10 @@ class EvmUnitTest(object):
             code_file.write('\n')
             code_file.close()
 
-    def compare_with_symExec_result(self, global_state, mem, analysis):
-        if UNIT_TEST == 2: return self.compare_real_value(global_state, mem, analysis)
-        if UNIT_TEST == 3: return self.compare_symbolic(global_state)
+    def compare_with_symExec_result(self, global_state, mem, analysis, mode=None):
+        mode = UNIT_TEST if mode is None else mode
+        if mode == 2: return self.compare_real_value(global_state, mem, analysis)
+        if mode == 3: return self.compare_symbolic(global_state)
 
     def compare_real_value(self, global_state, mem, analysis):
         storage_status = self._compare_storage_value(global_state)
@@ -71,8 +86,11 @@ class EvmUnitTest(object):
         return PASS
 
     def _compare_memory_value(self, mem):
-        memory = 0 if not mem else mem.values()[0]
-        memory = to_unsigned(long(memory))
+        memory = 0 if not mem.words else mem.words.values()[0]
+        try:
+            memory = to_unsigned(long(memory))
+        except:
+            return EMPTY_RESULT
 
         if memory != long(self.mem(), 0):
             return FAIL
@@ -25,6 +25,26 @@ def my_copy_dict(input):
     return output
 
 
+# The keys of the symbolic addresses in the memory, storage and balance maps.
+# The key of an address is its string, which the names of the variables read
+# from the maps are made of as well. It is made once per address: z3 shares the
+# AST of structurally equal expressions, so the id of an address finds its key
+# whatever the size of the expression. The addresses are kept so that their ids
+# are not reused.
+class ExprKeys(object):
+    def __init__(self):
+        # id of an address -> the address and its key
+        self.keys = {}
+
+    def key(self, address):
+        if not is_expr(address):
+            return str(address)
+        entry = self.keys.get(address.get_id())
+        if entry is None:
+            entry = self.keys[address.get_id()] = (address, str(address))
+        return entry[1]
+
+
 # class Timeout():
 #     """Timeout class using ALARM signal."""
 #
@@ -50,13 +70,24 @@ def is_storage_var(var):
     #     return isinstance(var, str) and var.startswith("Ia_store_")
 
 
+# check if the word stored at a concrete address of the storage is still the
+# current one, a store at a symbolic address made after it may have
+# overwritten it
+def is_current_storage(global_state, key):
+    writes = global_state["storage_writes"]
+    for address, _ in writes[global_state["storage_since"].get(key, 0):]:
+        if not isinstance(address, (int, long)):
+            return False
+    return True
+
+
 # copy only storage values/ variables from a given global state
 # TODO: add balance in the future
 def copy_global_values(global_state):
     new_gstate = {}
 
     for var in global_state["Ia"]:
-        if is_storage_var(var):
+        if is_storage_var(var) and is_current_storage(global_state, var):
             new_gstate[var] = global_state["Ia"][var]
     return new_gstate
 
@@ -106,7 +137,7 @@ def rename_vars(pcs, global_states):
                     continue
             # otherwise, change the name of the variable
             new_var_name = var_name + '_old'
-            new_var = BitVec(new_var_name, 256)
+            new_var = Const(new_var_name, var.sort())
             vars_mapping[var] = new_var
             expr = substitute(expr, (var, vars_mapping[var]))
         ret_pcs.append(expr)
@@ -131,7 +162,7 @@ def rename_vars(pcs, global_states):
                         continue
                 # otherwise, change the name of the variable
                 new_var_name = var_name + '_old'
-                new_var = BitVec(new_var_name, 256)
+                new_var = Const(new_var_name, var.sort())
                 vars_mapping[var] = new_var
                 expr = substitute(expr, (var, vars_mapping[var]))
         ret_gs[storage_addr] = expr
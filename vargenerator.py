@@ -1,8 +1,11 @@
 class Generator:
-    def __init__(self):
+    def __init__(self, prefix=""):
         self.countstack = 0
         self.countdata = 0
         self.count = 0
+        # put in the names of the fresh variables, so that those made by two
+        # generators with different prefixes do not clash
+        self.prefix = prefix
 
     def gen_stack_var(self):
         self.countstack += 1
@@ -24,18 +27,18 @@ class Generator:
 
     def gen_arbitrary_var(self):
         self.count += 1
-        return "some_var_" + str(self.count)
+        return "some_var_" + self.prefix + str(self.count)
 
     def gen_arbitrary_address_var(self):
         self.count += 1
-        return "some_address_" + str(self.count)
+        return "some_address_" + self.prefix + str(self.count)
 
     def gen_owner_store_var(self, position):
         return "Ia_store_" + str(position)
 
     def gen_gas_var(self):
         self.count += 1
-        return "gas_" + str(self.count)
+        return "gas_" + self.prefix + str(self.count)
 
     def gen_gas_price_var(self):
         return "Ip"
@@ -51,7 +54,7 @@ class Generator:
 
     def gen_balance_var(self):
         self.count += 1
-        return "balance_" + str(self.count)
+        return "balance_" + self.prefix + str(self.count)
 
 
 
@@ -1,8 +1,15 @@
+require 'net/http'
+
 class HomeController < ApplicationController
   def index
   end
 
   def analyze
+    if ENV['OYENTE_SERVER']
+      @output = analyze_with_server
+      return
+    end
+
     upload_path = Rails.root.join('public', 'uploads')
     filepath = upload_path.join('tmp.sol')
 
@@ -33,6 +40,35 @@ class HomeController < ApplicationController
     return opts
   end
 
+  # Analyze with a server started by `oyente.py --server PORT`, OYENTE_SERVER
+  # is the port
+  def analyze_with_server
+    request = { source: oyente_params[:source] }
+    oyente_params.each do |opt, val|
+      unless opt == "source"
+        request[opt] = opt == "timeout" ? seconds_to_milliseconds(val) : val.to_i
+      end
+    end
+
+    http = Net::HTTP.new('127.0.0.1', ENV['OYENTE_SERVER'].to_i)
+    http.read_timeout = 600
+    response = JSON.parse(http.post('/', request.to_json, 'Content-Type' => 'application/json').body)
+    return response["error"] if response["error"]
+
+    response["contracts"].map do |name, results|
+      lines = ["Contract #{name}:",
+               "Callstack Attack: #{results['callstack'] || false}",
+               "Time Dependency: #{results['time_dependency'] || false}",
+               "Reentrancy bug: #{results['reentrancy'] || false}",
+               "Concurrency: #{results['concurrency'] || false}"]
+      if results["complete"] == false
+        coverage = results["coverage"]
+        lines << "Timeout: the results are for the #{coverage['blocks_visited']} of #{coverage['blocks_total']} blocks explored"
+      end
+      lines.join("\n")
+    end.join("\n\n")
+  end
+
   def seconds_to_milliseconds second
     ( second.to_f * 1000 ).to_i
   end